@@ -0,0 +1,84 @@
+"""
+Micro-benchmark del costo de validar un payload completo de save_backgrounds.
+
+Compara, por request:
+  - esquemas precompilados (api/validation.py, construidos una vez al importar)
+  - construir el esquema desde los metadatos de las columnas en cada request
+  - el recorrido anterior con hasattr/setattr sobre instancias nuevas (sin conversión de tipos)
+
+    $ pipenv run python benchmarks/background_validation.py --iterations 20000
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from api.models import BACKGROUND_SECTIONS  # noqa: E402
+from api.validation import BACKGROUND_SCHEMAS, BackgroundSchema  # noqa: E402
+
+PAYLOAD = {
+    "non_pathological_background": {
+        "sex": "female", "nationality": "Mexicana", "ethnic_group": "Mestiza", "languages": "Español, Inglés",
+        "blood_type": "O+", "civil_status": "single", "address": "Av. Siempre Viva 742", "housing_type": "rented",
+        "cohabitants": "2", "dependents": "0", "education_institution": "UNAM", "academic_degree": "Licenciatura",
+        "career": "Medicina", "economic_activity": "Estudiante", "is_employer": "false",
+        "has_medical_insurance": "yes", "insurance_institution": "IMSS", "diet_quality": "regular",
+        "meals_per_day": "3", "daily_liquid_intake_liters": "2.5", "hygiene_quality": "good",
+        "exercise_quality": "bad", "sleep_quality": "regular", "has_piercings": "no", "has_tattoos": "yes",
+        "alcohol_use": "Social", "tobacco_use": "No", "hobbies": "Leer",
+    },
+    "pathological_background": {
+        "visual_disability": False, "hearing_disability": False, "motor_disability": "false",
+        "intellectual_disability": False, "chronic_diseases": "Asma", "current_medications": "Salbutamol",
+        "allergies": "Penicilina", "surgeries": "",
+    },
+    "family_background": {
+        "hypertension": True, "diabetes": "true", "cancer": False, "mental_illnesses": False,
+        "congenital_diseases": False, "heart_diseases": True, "liver_diseases": False, "kidney_diseases": False,
+    },
+    "gynecological_background": {
+        "menarche_age": "12", "pregnancies": 1, "births": 1, "c_sections": 0, "abortions": 0,
+        "contraceptive_methods": "Ninguno",
+    },
+}
+
+MODELS = dict(BACKGROUND_SECTIONS)
+
+
+def precompiled():
+    for section, section_data in PAYLOAD.items():
+        BACKGROUND_SCHEMAS[section].validate(section_data)
+
+
+def per_request_schema():
+    for section, section_data in PAYLOAD.items():
+        BackgroundSchema(MODELS[section]).validate(section_data)
+
+
+def hasattr_setattr():
+    for section, section_data in PAYLOAD.items():
+        background = MODELS[section]()
+        for key, value in section_data.items():
+            if hasattr(background, key):
+                setattr(background, key, value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    fields = sum(len(section_data) for section_data in PAYLOAD.values())
+    print(f"Payload: {len(PAYLOAD)} secciones, {fields} campos, {args.iterations} iteraciones\n")
+    print(f"{'estrategia':<34}{'µs/request':>12}")
+    for name, fn in (("esquema precompilado", precompiled),
+                     ("esquema construido por request", per_request_schema),
+                     ("hasattr/setattr (anterior)", hasattr_setattr)):
+        seconds = min(timeit.repeat(fn, number=args.iterations, repeat=3))
+        print(f"{name:<34}{seconds / args.iterations * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Comparación de throughput de la API bajo cada modo de worker de gunicorn.
+
+Para cada modo (sync, gthread, gevent) levanta gunicorn con gunicorn.conf.py,
+y durante --duration segundos lanza --concurrency clientes en paralelo contra
+POST /api/login y GET /api/professional/review_files. Reporta requests/s,
+latencia p50/p95 y errores por modo y endpoint.
+
+Necesita un profesional existente en la base configurada en DATABASE_URL:
+
+    $ pipenv run python benchmarks/gunicorn_modes.py --email prof@demo.com --password 123456
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--email", required=True, help="Email de un profesional aprobado")
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--modes", nargs="+", default=["sync", "gthread", "gevent"])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=32, help="Clientes simultáneos")
+    parser.add_argument("--duration", type=float, default=15.0, help="Segundos por endpoint")
+    parser.add_argument("--port", type=int, default=3099)
+    return parser.parse_args()
+
+
+def request(url, body=None, token=None):
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers=headers)
+    with urllib.request.urlopen(req, timeout=60) as response:
+        return response.status, response.read()
+
+
+def start_gunicorn(args, mode):
+    env = dict(os.environ, GUNICORN_WORKER_CLASS=mode, WEB_CONCURRENCY=str(args.workers),
+               GUNICORN_THREADS=str(args.threads))
+    process = subprocess.Popen(
+        ["gunicorn", "wsgi", "--chdir", "./src/", "-c", "gunicorn.conf.py",
+         "--bind", f"127.0.0.1:{args.port}"],
+        cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(process.stderr.read().decode())
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{args.port}/api/private", timeout=1)
+        except urllib.error.HTTPError:
+            return process  # 401: el servidor ya responde
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"gunicorn ({mode}) no arrancó a tiempo")
+
+
+def load(args, call):
+    latencies, errors = [], 0
+    deadline = time.time() + args.duration
+
+    def client():
+        local, local_errors = [], 0
+        while time.time() < deadline:
+            start = time.perf_counter()
+            try:
+                call()
+                local.append(time.perf_counter() - start)
+            except (urllib.error.URLError, OSError):
+                local_errors += 1
+        return local, local_errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for result in [executor.submit(client) for _ in range(args.concurrency)]:
+            client_latencies, client_errors = result.result()
+            latencies += client_latencies
+            errors += client_errors
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0.0,
+        "errors": errors,
+    }
+
+
+def run_mode(args, mode):
+    base_url = f"http://127.0.0.1:{args.port}/api"
+    credentials = {"email": args.email, "password": args.password}
+    process = start_gunicorn(args, mode)
+    try:
+        _, body = request(f"{base_url}/login", credentials)
+        token = json.loads(body)["token"]
+        return {
+            "POST /api/login": load(args, lambda: request(f"{base_url}/login", credentials)),
+            "GET /api/professional/review_files": load(
+                args, lambda: request(f"{base_url}/professional/review_files", token=token)),
+        }
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    args = parse_args()
+    results = {}
+    for mode in args.modes:
+        print(f"Modo {mode}...", file=sys.stderr)
+        try:
+            results[mode] = run_mode(args, mode)
+        except RuntimeError as e:
+            print(f"  omitido: {str(e).strip().splitlines()[-1]}", file=sys.stderr)
+
+    print(f"\nworkers={args.workers} threads={args.threads} concurrencia={args.concurrency} "
+          f"duración={args.duration}s por endpoint\n")
+    print(f"{'modo':<10}{'endpoint':<38}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errores':>10}")
+    for mode, endpoints in results.items():
+        for endpoint, stats in endpoints.items():
+            print(f"{mode:<10}{endpoint:<38}{stats['rps']:>10.1f}{stats['p50']:>10.1f}"
+                  f"{stats['p95']:>10.1f}{stats['errors']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Benchmark de las consultas calientes de la API con y sin los índices de
+`medical_file` y `professional_student_data`.
+
+Siembra (si hace falta) una base de datos de pruebas con --rows expedientes,
+y para cada consulta muestra el plan (EXPLAIN ANALYZE en Postgres, EXPLAIN QUERY
+PLAN en SQLite) y la latencia mediana/p95, primero sin índices y luego con ellos.
+
+ATENCIÓN: borra y vuelve a crear índices; úsalo solo contra una base de pruebas.
+
+    $ pipenv run python benchmarks/index_lookups.py --database-url postgresql://.../bench --rows 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+BATCH_SIZE = 10000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True, help="Base de datos de pruebas (se modifican sus índices)")
+    parser.add_argument("--rows", type=int, default=1000000, help="Expedientes (y pacientes) a sembrar")
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--professionals", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=50, help="Ejecuciones por consulta para medir latencia")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+args = parse_args()
+os.environ["DATABASE_URL"] = args.database_url
+sys.path.insert(0, SRC_DIR)
+
+from sqlalchemy import func, insert, select, text  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from app import app  # noqa: E402
+from api.models import (  # noqa: E402
+    db, User, UserRole, UserStatus, MedicalFile, FileStatus, ProfessionalStudentData, AcademicGrade
+)
+
+HOT_INDEX_TABLES = (MedicalFile.__table__, ProfessionalStudentData.__table__)
+
+
+def insert_users(role, count, prefix, password):
+    ids = []
+    for start in range(0, count, BATCH_SIZE):
+        rows = [{
+            "first_name": f"{prefix}{i}",
+            "first_surname": "Bench",
+            "birth_day": date(1990, 1, 1),
+            "email": f"{prefix}{i}@bench.test",
+            "password": password,
+            "role": role,
+            "status": UserStatus.approved,
+        } for i in range(start, min(start + BATCH_SIZE, count))]
+        ids += db.session.scalars(insert(User).returning(User.id), rows).all()
+    return ids
+
+
+def seed(rng):
+    existing = db.session.scalar(select(func.count(MedicalFile.id)))
+    if existing >= args.rows:
+        print(f"Usando {existing} expedientes existentes")
+        return
+
+    print(f"Sembrando {args.rows} expedientes...")
+    password = generate_password_hash("bench")
+    professionals = insert_users(UserRole.professional, args.professionals, "bpr", password)
+    students = insert_users(UserRole.student, args.students, "bst", password)
+
+    db.session.execute(insert(ProfessionalStudentData), [{
+        "user_id": student_id,
+        "institution": "Bench",
+        "career": "Medicina",
+        "academic_grade": AcademicGrade.bachelor,
+        "register_number": str(student_id),
+        "requested_professional_id": rng.choice(professionals),
+        "validated_by_id": rng.choice(professionals),
+    } for student_id in students])
+
+    statuses = list(FileStatus)
+    now = datetime.utcnow()
+    for start in range(0, args.rows, BATCH_SIZE):
+        patients = insert_users(UserRole.patient, min(BATCH_SIZE, args.rows - start), f"bpt{start}_", password)
+        db.session.execute(insert(MedicalFile), [{
+            "user_id": patient_id,
+            "file_status": rng.choice(statuses),
+            "selected_student_id": rng.choice(students),
+            "patient_requested_student_id": rng.choice(students) if rng.random() < 0.1 else None,
+            "reviewed_at": now - timedelta(minutes=rng.randrange(525600)),
+        } for patient_id in patients])
+        db.session.commit()
+        print(f"  {start + len(patients)}/{args.rows}")
+
+
+def hot_queries():
+    student_id = db.session.scalar(select(MedicalFile.selected_student_id).limit(1))
+    professional_id = db.session.scalar(select(ProfessionalStudentData.requested_professional_id).limit(1))
+    patient_id = db.session.scalar(select(MedicalFile.user_id).order_by(func.random()).limit(1))
+    return {
+        "patient_requests": select(MedicalFile.id).where(MedicalFile.patient_requested_student_id == student_id),
+        "assigned_patients": select(MedicalFile.id).where(MedicalFile.selected_student_id == student_id),
+        "review_files": select(MedicalFile.id).where(MedicalFile.file_status == FileStatus.review)
+        .order_by(MedicalFile.reviewed_at).limit(50),
+        "file_by_patient": select(MedicalFile.id).where(MedicalFile.user_id == patient_id),
+        "student_requests": select(ProfessionalStudentData.id)
+        .where(ProfessionalStudentData.requested_professional_id == professional_id),
+        "approved_students": select(ProfessionalStudentData.id)
+        .where(ProfessionalStudentData.validated_by_id == professional_id),
+    }
+
+
+def explain(statement):
+    sql = str(statement.compile(dialect=db.engine.dialect, compile_kwargs={"literal_binds": True}))
+    prefix = "EXPLAIN ANALYZE " if db.engine.dialect.name == "postgresql" else "EXPLAIN QUERY PLAN "
+    rows = db.session.execute(text(prefix + sql)).all()
+    return "\n".join("    " + " | ".join(str(col) for col in row) for row in rows)
+
+
+def measure(statement):
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        db.session.execute(statement).all()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def set_indexes(enabled):
+    db.session.close()
+    with db.engine.begin() as connection:
+        for table in HOT_INDEX_TABLES:
+            for index in table.indexes:
+                if enabled:
+                    index.create(connection, checkfirst=True)
+                else:
+                    index.drop(connection, checkfirst=True)
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("ANALYZE medical_file; ANALYZE professional_student_data"))
+        else:
+            connection.execute(text("ANALYZE"))
+
+
+def run_phase(label, queries):
+    print(f"\n==================== {label} ====================")
+    results = {}
+    for name, statement in queries.items():
+        median, p95 = measure(statement)
+        results[name] = median
+        print(f"\n{name}: mediana {median:.2f} ms, p95 {p95:.2f} ms")
+        print(explain(statement))
+    return results
+
+
+def main():
+    rng = random.Random(args.seed)
+    with app.app_context():
+        db.create_all()
+        seed(rng)
+        queries = hot_queries()
+
+        set_indexes(False)
+        before = run_phase("SIN ÍNDICES", queries)
+        set_indexes(True)
+        after = run_phase("CON ÍNDICES", queries)
+
+    print("\n==================== RESUMEN (mediana, ms) ====================")
+    print(f"{'consulta':<20}{'antes':>12}{'después':>12}{'mejora':>10}")
+    for name in queries:
+        speedup = before[name] / after[name] if after[name] else float("inf")
+        print(f"{name:<20}{before[name]:>12.2f}{after[name]:>12.2f}{speedup:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
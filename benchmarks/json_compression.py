@@ -0,0 +1,77 @@
+"""
+Costo de serialización JSON y bytes transferidos en los endpoints con respuestas más grandes.
+
+Siembra una base SQLite temporal con `seed_database` (o usa --database-url ya poblada),
+obtiene una vez el payload de cada endpoint y mide, por proveedor JSON (stdlib / orjson),
+el tiempo de `app.json.dumps` y el tamaño sin comprimir, con gzip y con brotli (si está
+instalado), con los niveles que usa la API.
+
+    $ pipenv run python benchmarks/json_compression.py --patients 5000 --iterations 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="Base ya sembrada con `flask seed`")
+    parser.add_argument("--patients", type=int, default=5000)
+    parser.add_argument("--iterations", type=int, default=200)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/json_bench.db"
+    os.environ["DATABASE_URL"] = database_url
+
+    from app import app  # noqa: E402
+    from api.auth import create_user_token
+    from api.json_provider import JSON_PROVIDERS, brotli, compress_body
+    from api.models import db, User, UserRole, MedicalFile, FileStatus
+    from api.seed import seed_database
+
+    with app.app_context():
+        if args.database_url is None:
+            db.create_all()
+            seed_database(args.patients, max(10, args.patients // 50), max(2, args.patients // 500), seed=1)
+        admin = User.query.filter_by(role=UserRole.admin).first()
+        professional = User.query.filter_by(role=UserRole.professional).first()
+        file_id = db.session.query(MedicalFile.id).filter(MedicalFile.file_status == FileStatus.review).limit(1).scalar()
+        tokens = {"admin": create_user_token(admin), "professional": create_user_token(professional)}
+
+    endpoints = (
+        ("GET /api/users?limit=500&fields=*", "admin", f"/api/users?limit=500&fields={','.join(('id', 'first_name', 'second_name', 'first_surname', 'second_surname', 'birth_day', 'phone', 'email', 'role', 'status'))}"),
+        ("GET /api/professional/review_files", "professional", "/api/professional/review_files"),
+        ("GET /api/medical_file/<id>", "professional", f"/api/medical_file/{file_id}"),
+    )
+
+    client = app.test_client()
+    payloads = []
+    for name, role, path in endpoints:
+        response = client.get(path, headers={"Authorization": f"Bearer {tokens[role]}"})
+        if response.status_code != 200:
+            print(f"{name}: HTTP {response.status_code}", file=sys.stderr)
+            continue
+        payloads.append((name, response.get_json()))
+
+    print(f"\n{'endpoint':<40}{'proveedor':<10}{'ms dumps':>10}{'bytes':>10}{'gzip':>10}{'br':>10}")
+    for name, payload in payloads:
+        for provider_name, provider_class in JSON_PROVIDERS.items():
+            provider = provider_class(app)
+            with app.app_context():
+                seconds = min(timeit.repeat(lambda: provider.dumps(payload), number=args.iterations, repeat=3))
+                body = provider.dumps(payload).encode()
+            gzip_size = len(compress_body(body, "gzip"))
+            br_size = len(compress_body(body, "br")) if brotli is not None else "-"
+            print(f"{name:<40}{provider_name:<10}{seconds / args.iterations * 1000:>10.3f}{len(body):>10}"
+                  f"{gzip_size:>10}{br_size:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Latencia de la búsqueda de usuarios (GET /api/search/users) por tipo de consulta.
+
+Siembra una base SQLite temporal con `seed_database` (o usa --database-url ya poblada, p. ej.
+PostgreSQL con `flask seed --patients 1000000` y la migración de índices aplicada) y mide
+p50/p90/p99/máx en ms, por tipo de consulta, de `search_users` (solo el backend) y del
+endpoint completo como admin. Con SQLite se reporta además el tiempo de carga del índice
+de trigramas en memoria (la primera búsqueda).
+
+    $ pipenv run python benchmarks/user_search.py --patients 100000 --iterations 200
+    $ DATABASE_URL=postgresql://... pipenv run python benchmarks/user_search.py --database-url $DATABASE_URL
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="Base ya sembrada con `flask seed`")
+    parser.add_argument("--patients", type=int, default=100000)
+    parser.add_argument("--iterations", type=int, default=200, help="Consultas por tipo")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args()
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda p: samples[min(len(samples) - 1, int(p * len(samples)))]
+    return statistics.median(samples), pick(0.90), pick(0.99), samples[-1]
+
+
+def typo(word, rng):
+    # Intercambia dos letras vecinas ("maria" -> "mraia")
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def main():
+    args = parse_args()
+    database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/search_bench.db"
+    os.environ["DATABASE_URL"] = database_url
+
+    from app import app  # noqa: E402
+    from api.auth import create_user_token
+    from api.models import db, User, UserRole
+    from api.search import search_backend, search_users
+    from api.seed import FIRST_NAMES, SURNAMES, seed_database
+
+    rng = random.Random(args.seed)
+    with app.app_context():
+        if args.database_url is None:
+            db.create_all()
+            seed_database(args.patients, max(10, args.patients // 50), max(2, args.patients // 500), seed=args.seed)
+        total_users = db.session.query(User.id).count()
+        max_id = db.session.query(db.func.max(User.id)).scalar()
+        admin = User.query.filter_by(role=UserRole.admin).first()
+        token = create_user_token(admin)
+
+        started = time.perf_counter()
+        search_users("maria")
+        print(f"{type(search_backend).__name__} sobre {total_users} usuarios; "
+              f"primera búsqueda (carga del índice): {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    generators = {
+        "nombre completo": lambda: f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)} {rng.choice(SURNAMES)}",
+        "prefijos (2 letras)": lambda: f"{rng.choice(FIRST_NAMES)[:2]} {rng.choice(SURNAMES)[:2]}",
+        "subcadena": lambda: rng.choice(SURNAMES)[1:6],
+        "email": lambda: f"pt{rng.randrange(max(1, args.patients))}@seed",
+        "con errores": lambda: f"{typo(rng.choice(FIRST_NAMES), rng)} {typo(rng.choice(SURNAMES), rng)}",
+        "sin resultados": lambda: f"zq{rng.randrange(max_id)}x",
+    }
+
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {token}"}
+    print(f"\n{'consulta':<22}{'capa':<10}{'p50':>8}{'p90':>8}{'p99':>8}{'máx':>8}{'resultados':>12}")
+    for name, generate in generators.items():
+        queries = [generate() for _ in range(args.iterations)]
+        backend_ms, endpoint_ms, results = [], [], []
+        with app.app_context():
+            for query in queries:
+                started = time.perf_counter()
+                results.append(len(search_users(query)))
+                backend_ms.append((time.perf_counter() - started) * 1000)
+        for query in queries:
+            started = time.perf_counter()
+            response = client.get("/api/search/users", query_string={"q": query}, headers=headers)
+            endpoint_ms.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                print(f"{query!r}: HTTP {response.status_code}", file=sys.stderr)
+        for layer, samples in (("backend", backend_ms), ("endpoint", endpoint_ms)):
+            p50, p90, p99, worst = percentiles(samples)
+            print(f"{name:<22}{layer:<10}{p50:>8.1f}{p90:>8.1f}{p99:>8.1f}{worst:>8.1f}"
+                  f"{statistics.mean(results):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Prueba de carga del flujo completo de un expediente contra un servidor ya levantado.
+
+Cada cliente virtual inicia sesión con un student y un professional sembrados por
+`flask seed` y repite el flujo:
+
+    paciente:      POST /register -> POST /login -> POST /patient/request_student_validation/<student>
+    student:       GET /student/patient_requests -> PUT /student/validate_patient/<patient>
+                   -> POST /api/backgrounds -> PUT /student/mark_review/<file>
+    professional:  GET /professional/review_files -> GET /medical_file/<file>
+                   -> PUT /professional/review_file/<file>
+
+Reporta por endpoint: requests, errores, p50/p90/p99/máx en ms, y el throughput de flujos.
+
+    $ pipenv run flask seed --patients 10000 --students 200 --professionals 20
+    $ pipenv run start   # u otro servidor (gunicorn -c gunicorn.conf.py ...)
+    $ pipenv run python benchmarks/workflow_load.py --students 200 --professionals 20 --clients 16 --duration 60
+
+--students / --professionals deben coincidir con los de `flask seed` (solo se usan las
+cuentas aprobadas: st{i}/pr{i} con i % 10 != 9). La contraseña es la de api/seed.py.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+SEED_PASSWORD = "seed1234"
+
+BACKGROUNDS_PAYLOAD = {
+    "non_pathological_background": {
+        "sex": "female", "nationality": "Mexicana", "blood_type": "O+", "civil_status": "single",
+        "housing_type": "rented", "economic_activity": "Estudiante", "has_medical_insurance": "yes",
+        "diet_quality": "regular", "meals_per_day": 3, "daily_liquid_intake_liters": 2.0,
+        "hygiene_quality": "good", "exercise_quality": "bad", "sleep_quality": "regular",
+    },
+    "patological_background": {"chronic_diseases": "Asma", "allergies": "Penicilina"},
+    "family_background": {"hypertension": True, "diabetes": False},
+    "gynecological_background": {"menarche_age": 12, "pregnancies": 0, "births": 0},
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:3001/api")
+    parser.add_argument("--students", type=int, required=True, help="Students sembrados")
+    parser.add_argument("--professionals", type=int, required=True, help="Professionals sembrados")
+    parser.add_argument("--password", default=SEED_PASSWORD)
+    parser.add_argument("--clients", type=int, default=8, help="Clientes virtuales simultáneos")
+    parser.add_argument("--duration", type=float, default=30.0, help="Segundos de carga")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Pausa (s) entre pasos de un cliente")
+    return parser.parse_args()
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.workflows = 0
+
+    def add(self, endpoint, seconds, ok):
+        with self.lock:
+            if ok:
+                self.latencies[endpoint].append(seconds)
+            else:
+                self.errors[endpoint] += 1
+
+
+class StepFailed(Exception):
+    pass
+
+
+class Client:
+    def __init__(self, args, recorder, rng):
+        self.args = args
+        self.recorder = recorder
+        self.rng = rng
+
+    def call(self, endpoint, method, path, body=None, token=None):
+        """Hace la petición y la registra bajo `endpoint` (la ruta sin ids)."""
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.args.base_url + path, data=data, headers=headers, method=method)
+
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=60) as response:
+                payload = response.read()
+        except (urllib.error.URLError, OSError) as e:
+            self.recorder.add(endpoint, time.perf_counter() - start, False)
+            raise StepFailed(f"{endpoint}: {e}")
+        self.recorder.add(endpoint, time.perf_counter() - start, True)
+
+        if self.args.think_time:
+            time.sleep(self.args.think_time)
+        return json.loads(payload) if payload else None
+
+    def login(self, email):
+        data = self.call("POST /login", "POST", "/login", {"email": email, "password": self.args.password})
+        return data["token"], data["user"]
+
+    def seeded_login(self, prefix, count):
+        approved = [i for i in range(count) if i % 10 != 9]
+        return self.login(f"{prefix}{self.rng.choice(approved)}@seed.test")
+
+    def run(self, deadline):
+        student_token, student = self.seeded_login("st", self.args.students)
+        professional_token, _ = self.seeded_login("pr", self.args.professionals)
+
+        while time.time() < deadline:
+            try:
+                self.workflow(student_token, student["id"], professional_token)
+            except StepFailed as e:
+                print(f"  flujo interrumpido: {e}", file=sys.stderr)
+                continue
+            with self.recorder.lock:
+                self.recorder.workflows += 1
+
+    def workflow(self, student_token, student_id, professional_token):
+        email = f"lt{uuid.uuid4().hex[:12]}@load.test"
+        self.call("POST /register", "POST", "/register", {
+            "first_name": "Carga", "first_surname": "Prueba", "birth_day": "1990-05-17",
+            "role": "patient", "email": email, "password": self.args.password,
+        })
+        patient_token, patient = self.login(email)
+        medical_file_id = patient["medical_file"]["id"]
+
+        self.call("POST /patient/request_student_validation/<id>", "POST",
+                  f"/patient/request_student_validation/{student_id}", {}, patient_token)
+        self.call("GET /student/patient_requests", "GET", "/student/patient_requests", token=student_token)
+        self.call("PUT /student/validate_patient/<id>", "PUT",
+                  f"/student/validate_patient/{patient['id']}", {"action": "approve"}, student_token)
+
+        self.call("POST /api/backgrounds", "POST", "/api/backgrounds",
+                  dict(BACKGROUNDS_PAYLOAD, medical_file_id=medical_file_id), student_token)
+        self.call("PUT /student/mark_review/<id>", "PUT", f"/student/mark_review/{medical_file_id}", {},
+                  student_token)
+
+        self.call("GET /professional/review_files", "GET", "/professional/review_files", token=professional_token)
+        self.call("GET /medical_file/<id>", "GET", f"/medical_file/{medical_file_id}", token=professional_token)
+        self.call("PUT /professional/review_file/<id>", "PUT", f"/professional/review_file/{medical_file_id}",
+                  {"action": "approve"}, professional_token)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def report(recorder, elapsed, args):
+    print(f"\nclientes={args.clients} duración={elapsed:.1f}s flujos completos={recorder.workflows} "
+          f"({recorder.workflows / elapsed:.2f}/s)\n")
+    print(f"{'endpoint':<48}{'reqs':>8}{'errores':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'máx ms':>9}")
+    for endpoint in sorted(set(recorder.latencies) | set(recorder.errors)):
+        values = sorted(recorder.latencies[endpoint])
+        print(f"{endpoint:<48}{len(values):>8}{recorder.errors[endpoint]:>9}"
+              f"{percentile(values, 0.50) * 1000:>9.1f}{percentile(values, 0.90) * 1000:>9.1f}"
+              f"{percentile(values, 0.99) * 1000:>9.1f}{(values[-1] if values else 0) * 1000:>9.1f}")
+
+
+def main():
+    args = parse_args()
+    recorder = Recorder()
+    deadline = time.time() + args.duration
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as executor:
+        futures = [executor.submit(Client(args, recorder, random.Random(n)).run, deadline)
+                   for n in range(args.clients)]
+        for future in futures:
+            try:
+                future.result()
+            except StepFailed as e:
+                print(f"  cliente sin sesión: {e}", file=sys.stderr)
+    report(recorder, time.perf_counter() - started, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# Configuración de gunicorn para el backend (Procfile / render.yaml: `gunicorn wsgi --chdir ./src/ -c gunicorn.conf.py`).
+#
+# GUNICORN_WORKER_CLASS elige el modo de los workers:
+#   - gthread (por defecto): cada worker atiende GUNICORN_THREADS requests a la vez, así que
+#     un hash de contraseña o una consulta lenta no bloquean al worker completo.
+#   - gevent: cada worker atiende hasta GUNICORN_WORKER_CONNECTIONS requests con greenlets.
+#     Requiere `gevent` y `psycogreen` (psycopg2 se parchea para ceder el control en las consultas).
+#   - sync: un request por worker, como gunicorn por defecto.
+#
+# Otras variables: WEB_CONCURRENCY (workers), GUNICORN_TIMEOUT, GUNICORN_GRACEFUL_TIMEOUT,
+# GUNICORN_KEEPALIVE. El número de workers se deja en WEB_CONCURRENCY para que
+# api/pool.py reparta DB_MAX_CONNECTIONS entre ellos.
+
+import importlib.util
+import multiprocessing
+import os
+
+WORKER_CLASSES = ("sync", "gthread", "gevent")
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+if worker_class not in WORKER_CLASSES:
+    raise RuntimeError(f"GUNICORN_WORKER_CLASS debe ser uno de: {', '.join(WORKER_CLASSES)}")
+
+if worker_class == "gevent":
+    missing = [name for name in ("gevent", "psycogreen") if importlib.util.find_spec(name) is None]
+    if missing:
+        raise RuntimeError(f"El modo gevent necesita instalar: {', '.join(missing)}")
+
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+threads = int(os.getenv("GUNICORN_THREADS", 4)) if worker_class == "gthread" else 1
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", 100))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+
+
+def post_worker_init(worker):
+    if worker_class == "gevent":
+        # El worker de gevent aplica el monkey patching en init_process, antes de este hook
+        # (en post_fork todavía no); falta el driver de Postgres
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+        worker.log.info("psycopg2 parcheado para gevent (worker %s)", worker.pid)
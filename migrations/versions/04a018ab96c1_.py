@@ -0,0 +1,26 @@
+"""add medical_file version for read-model caching
+
+Revision ID: 04a018ab96c1
+Revises: 26999cfe5478
+Create Date: 2026-10-18 11:41:52.208617
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '04a018ab96c1'
+down_revision = '26999cfe5478'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('medical_file', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('medical_file', schema=None) as batch_op:
+        batch_op.drop_column('version')
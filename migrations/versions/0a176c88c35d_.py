@@ -0,0 +1,34 @@
+"""add snapshot_fragment for incremental snapshot rendering
+
+Revision ID: 0a176c88c35d
+Revises: 04a018ab96c1
+Create Date: 2026-10-18 12:20:41.583102
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a176c88c35d'
+down_revision = '04a018ab96c1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('snapshot_fragment',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('medical_file_id', sa.Integer(), nullable=False),
+    sa.Column('section', sa.String(length=40), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('html', sa.Text(), nullable=False),
+    sa.Column('rendered_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['medical_file_id'], ['medical_file.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('medical_file_id', 'section', name='uq_snapshot_fragment_medical_file_id_section')
+    )
+
+
+def downgrade():
+    op.drop_table('snapshot_fragment')
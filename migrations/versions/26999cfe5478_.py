@@ -0,0 +1,61 @@
+"""add indexes on hot lookup columns and one background per medical file
+
+Revision ID: 26999cfe5478
+Revises: b6ca9b5fabb6
+Create Date: 2026-10-18 11:02:14.512903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '26999cfe5478'
+down_revision = 'b6ca9b5fabb6'
+branch_labels = None
+depends_on = None
+
+
+BACKGROUND_TABLES = (
+    'non_pathological_background',
+    'pathological_background',
+    'family_background',
+    'gynecological_background',
+)
+
+
+def upgrade():
+    with op.batch_alter_table('medical_file', schema=None) as batch_op:
+        batch_op.create_index('ix_medical_file_user_id', ['user_id'], unique=False)
+        batch_op.create_index('ix_medical_file_selected_student_id', ['selected_student_id'], unique=False)
+        batch_op.create_index('ix_medical_file_patient_requested_student_id', ['patient_requested_student_id'], unique=False)
+        batch_op.create_index('ix_medical_file_file_status_reviewed_at', ['file_status', 'reviewed_at'], unique=False)
+
+    with op.batch_alter_table('professional_student_data', schema=None) as batch_op:
+        batch_op.create_index('ix_professional_student_data_requested_professional_id', ['requested_professional_id'], unique=False)
+        batch_op.create_index('ix_professional_student_data_validated_by_id', ['validated_by_id'], unique=False)
+
+    for table in BACKGROUND_TABLES:
+        # create_backgrounds insertaba una fila nueva en cada envío: se conserva la más reciente
+        op.execute(sa.text(
+            f"DELETE FROM {table} WHERE id NOT IN "
+            f"(SELECT MAX(id) FROM {table} GROUP BY medical_file_id)"
+        ))
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_unique_constraint(f'uq_{table}_medical_file_id', ['medical_file_id'])
+
+
+def downgrade():
+    for table in reversed(BACKGROUND_TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_constraint(f'uq_{table}_medical_file_id', type_='unique')
+
+    with op.batch_alter_table('professional_student_data', schema=None) as batch_op:
+        batch_op.drop_index('ix_professional_student_data_validated_by_id')
+        batch_op.drop_index('ix_professional_student_data_requested_professional_id')
+
+    with op.batch_alter_table('medical_file', schema=None) as batch_op:
+        batch_op.drop_index('ix_medical_file_file_status_reviewed_at')
+        batch_op.drop_index('ix_medical_file_patient_requested_student_id')
+        batch_op.drop_index('ix_medical_file_selected_student_id')
+        batch_op.drop_index('ix_medical_file_user_id')
@@ -0,0 +1,38 @@
+"""add medical_file_snapshot version history
+
+Revision ID: 66427d86b801
+Revises: 0a176c88c35d
+Create Date: 2026-10-18 12:58:09.311470
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '66427d86b801'
+down_revision = '0a176c88c35d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('medical_file_snapshot',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('medical_file_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('is_checkpoint', sa.Boolean(), nullable=False),
+    sa.Column('payload', sa.LargeBinary(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('content_length', sa.Integer(), nullable=False),
+    sa.Column('created_by_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['created_by_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['medical_file_id'], ['medical_file.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('medical_file_id', 'version', name='uq_medical_file_snapshot_medical_file_id_version')
+    )
+
+
+def downgrade():
+    op.drop_table('medical_file_snapshot')
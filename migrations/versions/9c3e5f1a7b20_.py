@@ -0,0 +1,34 @@
+"""add medical_file review queue claim columns
+
+Revision ID: 9c3e5f1a7b20
+Revises: 66427d86b801
+Create Date: 2026-10-18 13:42:17.504213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c3e5f1a7b20'
+down_revision = '66427d86b801'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('medical_file', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('claimed_by_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('claimed_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('lease_expires_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_medical_file_claimed_by_id'), ['claimed_by_id'], unique=False)
+        batch_op.create_foreign_key('fk_medical_file_claimed_by_id_users', 'users', ['claimed_by_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('medical_file', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_medical_file_claimed_by_id_users', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_medical_file_claimed_by_id'))
+        batch_op.drop_column('lease_expires_at')
+        batch_op.drop_column('claimed_at')
+        batch_op.drop_column('claimed_by_id')
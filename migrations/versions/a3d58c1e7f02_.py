@@ -0,0 +1,91 @@
+"""add append-only file_transition log, partitioned by month on postgresql
+
+Revision ID: a3d58c1e7f02
+Revises: f2c7b9a4e813
+Create Date: 2026-10-18 16:58:12.604731
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d58c1e7f02'
+down_revision = 'f2c7b9a4e813'
+branch_labels = None
+depends_on = None
+
+# Mes actual y los siguientes; después las crea `flask create-audit-partitions`
+PARTITION_MONTHS_AHEAD = 3
+APPEND_ONLY_MESSAGE = "file_transition es de solo inserción"
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _upgrade_postgresql():
+    # La llave primaria de una tabla particionada debe incluir la columna de partición
+    op.execute("""
+        CREATE TABLE file_transition (
+            id BIGSERIAL NOT NULL,
+            medical_file_id INTEGER NOT NULL,
+            actor_id INTEGER,
+            from_status filestatus NOT NULL,
+            to_status filestatus NOT NULL,
+            comment TEXT,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("CREATE INDEX ix_file_transition_medical_file_id_id ON file_transition (medical_file_id, id)")
+    op.execute("CREATE TABLE file_transition_default PARTITION OF file_transition DEFAULT")
+    today = date.today()
+    for offset in range(PARTITION_MONTHS_AHEAD + 1):
+        start = _add_months(date(today.year, today.month, 1), offset)
+        op.execute(
+            f"CREATE TABLE file_transition_{start:%Y_%m} PARTITION OF file_transition "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{_add_months(start, 1).isoformat()}')"
+        )
+
+    op.execute(f"""
+        CREATE FUNCTION file_transition_append_only() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            RAISE EXCEPTION '{APPEND_ONLY_MESSAGE}';
+        END;
+        $$
+    """)
+    op.execute("CREATE TRIGGER file_transition_append_only BEFORE UPDATE OR DELETE ON file_transition "
+               "FOR EACH ROW EXECUTE FUNCTION file_transition_append_only()")
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        _upgrade_postgresql()
+        return
+
+    op.create_table('file_transition',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+    sa.Column('medical_file_id', sa.Integer(), nullable=False),
+    sa.Column('actor_id', sa.Integer(), nullable=True),
+    sa.Column('from_status', sa.Enum('empty', 'progress', 'review', 'approved', 'confirmed', name='filestatus'), nullable=False),
+    sa.Column('to_status', sa.Enum('empty', 'progress', 'review', 'approved', 'confirmed', name='filestatus'), nullable=False),
+    sa.Column('comment', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_file_transition_medical_file_id_id', 'file_transition', ['medical_file_id', 'id'], unique=False)
+    if op.get_bind().dialect.name == 'sqlite':
+        for operation in ('UPDATE', 'DELETE'):
+            op.execute(f"CREATE TRIGGER file_transition_no_{operation.lower()} BEFORE {operation} ON file_transition "
+                       f"BEGIN SELECT RAISE(ABORT, '{APPEND_ONLY_MESSAGE}'); END")
+
+
+def downgrade():
+    # En PostgreSQL borra también las particiones y su trigger
+    op.drop_table('file_transition')
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP FUNCTION file_transition_append_only()")
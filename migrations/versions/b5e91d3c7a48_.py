@@ -0,0 +1,26 @@
+"""add users.token_version for JWT revocation
+
+Revision ID: b5e91d3c7a48
+Revises: a3d58c1e7f02
+Create Date: 2026-10-18 18:04:37.215906
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e91d3c7a48'
+down_revision = 'a3d58c1e7f02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('token_version')
@@ -0,0 +1,52 @@
+"""add users search indexes (pg_trgm, unaccent)
+
+Revision ID: b7d2e4c91f36
+Revises: 9c3e5f1a7b20
+Create Date: 2026-10-18 14:21:05.118903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2e4c91f36'
+down_revision = '9c3e5f1a7b20'
+branch_labels = None
+depends_on = None
+
+# Misma expresión que usa api/search.py: la consulta debe coincidir con la del índice
+SEARCH_DOCUMENT = "user_search_text(first_name, second_name, first_surname, second_surname, email)"
+
+
+def upgrade():
+    # Solo PostgreSQL; en SQLite la búsqueda usa el índice en memoria
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    # unaccent() es STABLE (depende del search_path); con el diccionario explícito se puede
+    # envolver como IMMUTABLE y usarlo en índices
+    op.execute("""
+        CREATE OR REPLACE FUNCTION user_search_text(
+            first_name text, second_name text, first_surname text, second_surname text, email text)
+        RETURNS text LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+            SELECT lower(public.unaccent('public.unaccent'::regdictionary,
+                coalesce(first_name, '') || ' ' || coalesce(second_name, '') || ' ' ||
+                coalesce(first_surname, '') || ' ' || coalesce(second_surname, '') || ' ' ||
+                coalesce(email, '')))
+        $$
+    """)
+    op.execute(f"CREATE INDEX ix_users_search_trgm ON users USING gin ({SEARCH_DOCUMENT} gin_trgm_ops)")
+    op.execute(f"CREATE INDEX ix_users_search_tsv ON users USING gin "
+               f"(to_tsvector('simple'::regconfig, {SEARCH_DOCUMENT}))")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute("DROP INDEX IF EXISTS ix_users_search_tsv")
+    op.execute("DROP INDEX IF EXISTS ix_users_search_trgm")
+    op.execute("DROP FUNCTION IF EXISTS user_search_text(text, text, text, text, text)")
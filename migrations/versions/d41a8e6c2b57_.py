@@ -0,0 +1,32 @@
+"""add partial indexes on family_background flags
+
+Revision ID: d41a8e6c2b57
+Revises: b7d2e4c91f36
+Create Date: 2026-10-18 15:02:44.730218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41a8e6c2b57'
+down_revision = 'b7d2e4c91f36'
+branch_labels = None
+depends_on = None
+
+FAMILY_BACKGROUND_FLAGS = ("hypertension", "diabetes", "cancer", "mental_illnesses", "congenital_diseases",
+                           "heart_diseases", "liver_diseases", "kidney_diseases")
+
+
+def upgrade():
+    # En SQLite una columna booleana se compila como "flag = 1", y el planificador solo usa
+    # un índice parcial si el predicado coincide con el de la consulta
+    for flag in FAMILY_BACKGROUND_FLAGS:
+        op.create_index(f'ix_family_background_{flag}', 'family_background', ['medical_file_id'], unique=False,
+                        postgresql_where=sa.text(flag), sqlite_where=sa.text(f'{flag} = 1'))
+
+
+def downgrade():
+    for flag in FAMILY_BACKGROUND_FLAGS:
+        op.drop_index(f'ix_family_background_{flag}', table_name='family_background')
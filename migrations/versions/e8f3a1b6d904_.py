@@ -0,0 +1,59 @@
+"""add dashboard_counter with incrementally maintained dashboard counts
+
+Revision ID: e8f3a1b6d904
+Revises: d41a8e6c2b57
+Create Date: 2026-10-18 15:47:31.902655
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8f3a1b6d904'
+down_revision = 'd41a8e6c2b57'
+branch_labels = None
+depends_on = None
+
+# Conteos iniciales (mismas métricas que api/dashboard_stats.py); en adelante la app los
+# mantiene y `flask rebuild-dashboard-stats` los recalcula
+BACKFILL = (
+    "SELECT 0, 'users.' || role || '.' || status, count(*) FROM users GROUP BY role, status",
+    "SELECT 0, 'files.' || file_status, count(*) FROM medical_file GROUP BY file_status",
+    "SELECT selected_student_id, 'files.' || file_status, count(*) FROM medical_file "
+    "WHERE selected_student_id IS NOT NULL GROUP BY selected_student_id, file_status",
+    "SELECT patient_requested_student_id, 'patient_requests', count(*) FROM medical_file "
+    "WHERE patient_requested_student_id IS NOT NULL GROUP BY patient_requested_student_id",
+    "SELECT approved_by_id, 'approved', count(*) FROM medical_file "
+    "WHERE approved_by_id IS NOT NULL GROUP BY approved_by_id",
+    "SELECT no_approved_by_id, 'rejected', count(*) FROM medical_file "
+    "WHERE no_approved_by_id IS NOT NULL GROUP BY no_approved_by_id",
+    "SELECT requested_professional_id, 'student_requests', count(*) FROM professional_student_data "
+    "WHERE requested_professional_id IS NOT NULL AND validated_by_id IS NULL GROUP BY requested_professional_id",
+    "SELECT validated_by_id, 'validated_users', count(*) FROM professional_student_data "
+    "WHERE validated_by_id IS NOT NULL GROUP BY validated_by_id",
+)
+
+
+def upgrade():
+    op.create_table('dashboard_counter',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('metric', sa.String(length=60), nullable=False),
+    sa.Column('shard', sa.Integer(), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('owner_id', 'metric', 'shard', name='uq_dashboard_counter_owner_id_metric_shard')
+    )
+
+    # Los enums se guardan con su nombre ('patient', 'review', ...), igual que la métrica;
+    # en PostgreSQL el tipo enum se convierte a texto para concatenarlo
+    cast = "::text" if op.get_bind().dialect.name == "postgresql" else ""
+    for query in BACKFILL:
+        for column in ("role", "status", "file_status"):
+            query = query.replace(f"|| {column}", f"|| {column}{cast}")
+        op.execute(f"INSERT INTO dashboard_counter (owner_id, metric, value, shard) SELECT q.*, 0 FROM ({query}) AS q")
+
+
+def downgrade():
+    op.drop_table('dashboard_counter')
@@ -0,0 +1,26 @@
+"""add index on users role and status
+
+Revision ID: f2c7b9a4e813
+Revises: e8f3a1b6d904
+Create Date: 2026-10-18 16:21:08.447193
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c7b9a4e813'
+down_revision = 'e8f3a1b6d904'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index('ix_users_role_status', ['role', 'status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_role_status')
@@ -4,34 +4,185 @@
  
    
 import os                                                       # Importa el módulo `os` para acceder a variables de entorno
+from flask import g, request                                    # `g` guarda datos de la página actual; `request` lee el cursor de la URL
 from flask_admin import Admin                                   # Importa la clase `Admin` de Flask-Admin para crear una interfaz de administración
 from flask_admin.contrib.sqla import ModelView                  # Importa `ModelView` para crear vistas de modelos SQLAlchemy en la interfaz de administración
+from flask_admin.contrib.sqla.filters import (                  # Filtros del lado del servidor (solo sobre columnas indexadas)
+    BooleanEqualFilter,
+    EnumEqualFilter,
+    FilterEqual,
+    IntEqualFilter,
+)
 from flask_admin import expose                                  # Importa `expose` para definir rutas personalizadas en las vistas de administración 
+from sqlalchemy import func, inspect, not_, or_, text           # Conteos acotados y estimados; historial de cambios del modelo
+from sqlalchemy.orm import joinedload, selectinload             # Carga anticipada de las relaciones mostradas
 from .models import (                                           # Importa los modelos necesarios desde el módulo `models`          
     db,
     User,
+    UserRole,
+    UserStatus,
     ProfessionalStudentData,
     MedicalFile,
+    FileStatus,
     NonPathologicalBackground,
     PathologicalBackground,
     FamilyBackground,
-    GynecologicalBackground
+    GynecologicalBackground,
+    FAMILY_BACKGROUND_FLAGS
     
 )
+from .auth import invalidate_user                               # Revoca los tokens de un usuario al cambiar su rol o estado
+from .file_cache import bump_file_version                       # Invalida el documento cacheado del expediente al editarlo
+
+# Hasta este número de filas el listado muestra el conteo exacto; por encima muestra
+# "N+" (con filtros) o la estimación de PostgreSQL (pg_class.reltuples, sin filtros)
+ADMIN_EXACT_COUNT_LIMIT = int(os.getenv("ADMIN_EXACT_COUNT_LIMIT", 10000))
+
+
+def _enum_options(enum_class):
+    return [(member.value, member.value) for member in enum_class]
+
+
+class FlagFilter(BooleanEqualFilter):                                                      # Filtro de banderas con índice parcial
+    # La columna sola (no "= true"): es idéntica al predicado de los índices parciales
+    def apply(self, query, value, alias=None):
+        column = self.get_column(alias)
+        return query.filter(column if value == "1" else or_(not_(column), column.is_(None)))
+
+
+class LargeTableView(ModelView):                                                           # Vista base para tablas con millones de filas
+    """
+    Listado por id descendente con paginación keyset: "siguiente" y "anterior" llevan el
+    último / primer id de la página (?after= / ?before=) en lugar de OFFSET. Los saltos a
+    otra página (o con otro orden) usan OFFSET como siempre. El conteo está acotado por
+    ADMIN_EXACT_COUNT_LIMIT.
+    """
+    page_size = 50
+    column_default_sort = ("id", True)
+    column_sortable_list = ("id",)                                                          # Ordenar por columnas sin índice recorre toda la tabla
+    column_display_pk = True
+
+    def _primary_key_column(self):
+        return getattr(self.model, self._primary_key)
+
+    def _estimated_rows(self):
+        if self.session.get_bind().dialect.name != "postgresql":
+            return None
+        return self.session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+            {"table": self.model.__table__.name},
+        ).scalar()
+
+    def _count(self, count_query, filtered):
+        if not filtered:
+            estimated = self._estimated_rows()
+            if estimated is not None and estimated > ADMIN_EXACT_COUNT_LIMIT:
+                g.admin_count_label = f"~{estimated:,}"
+                return estimated
+        capped = count_query.limit(ADMIN_EXACT_COUNT_LIMIT + 1).subquery()
+        count = self.session.query(func.count()).select_from(capped).scalar()
+        if count > ADMIN_EXACT_COUNT_LIMIT:
+            g.admin_count_label = f"{ADMIN_EXACT_COUNT_LIMIT:,}+"
+        return count
+
+    def get_list(self, page, sort_column, sort_desc, search, filters,
+                 execute=True, page_size=None):
+        joins, count_joins = {}, {}
+        pk = self._primary_key_column()
+        query = self.get_query()
+        count_query = self.session.query(pk)
+
+        if self._search_supported and search:
+            query, count_query, joins, count_joins = self._apply_search(
+                query, count_query, joins, count_joins, search)
+        if filters and self._filters:
+            query, count_query, joins, count_joins = self._apply_filters(
+                query, count_query, joins, count_joins, filters)
+
+        count = self._count(count_query, bool(search or filters))
+
+        for relation in self._auto_joins:
+            query = query.options(joinedload(relation))
+
+        if page_size is None:
+            page_size = self.page_size
 
-class UserView(ModelView):                                                                  # Define una vista personalizada para el modelo `User`  
+        # Keyset solo con el orden por defecto (id desc) y desde la página 1 en adelante
+        after = request.args.get("after", type=int)
+        before = request.args.get("before", type=int)
+        if execute and page and page_size and sort_column is None and (after or before):
+            if after:
+                data = query.filter(pk < after).order_by(pk.desc()).limit(page_size).all()
+            else:
+                data = query.filter(pk > before).order_by(pk.asc()).limit(page_size).all()[::-1]
+        else:
+            query, joins = self._apply_sorting(query, joins, sort_column, sort_desc)
+            query = self._apply_pagination(query, page, page_size)
+            if not execute:
+                return count, query
+            data = query.all()
+
+        if data:
+            g.admin_keyset = (page, self.get_pk_value(data[0]), self.get_pk_value(data[-1]))
+        return count, data
+
+    def _get_list_url(self, view_args):
+        extra_args = {k: v for k, v in view_args.extra_args.items() if k not in ("after", "before")}
+        keyset = g.get("admin_keyset")
+        if keyset and view_args.page and view_args.sort is None:
+            page, first_id, last_id = keyset
+            if view_args.page == page + 1:
+                extra_args["after"] = last_id
+            elif view_args.page == page - 1:
+                extra_args["before"] = first_id
+            elif view_args.page == page:
+                extra_args.update({k: v for k, v in view_args.extra_args.items() if k in ("after", "before")})
+        return super(LargeTableView, self)._get_list_url(view_args.clone(extra_args=extra_args))
+
+    def render(self, template, **kwargs):
+        if template == self.list_template:
+            kwargs["num_pages"] = None                                                      # Paginador simple (anterior / siguiente)
+            kwargs["count"] = g.get("admin_count_label", kwargs.get("count"))
+        return super(LargeTableView, self).render(template, **kwargs)
+
+
+class UserView(LargeTableView):                                                             # Define una vista personalizada para el modelo `User`
     column_list = [
         "id", "role", "status",
         "first_name", "second_name", "first_surname", "second_surname", 
-        "birth_day","phone", "email", "password"  
+        "birth_day","phone", "email"
+    ]
+    # El hash de la contraseña no se muestra, exporta ni edita en ninguna vista
+    column_exclude_list = column_details_exclude_list = column_export_exclude_list = ["password"]
+    form_excluded_columns = ["password", "token_version", "professional_student_data", "medical_file"]
+    can_create = False                                                                      # Los usuarios se crean con /register o la carga en bloque (hashean la contraseña)
+    column_sortable_list = ("id", "email")
+    column_filters = [
+        EnumEqualFilter(User.role, "Rol", options=_enum_options(UserRole), enum_class=UserRole),
+        EnumEqualFilter(User.status, "Estado", options=_enum_options(UserStatus), enum_class=UserStatus),
+        FilterEqual(User.email, "Email"),
     ]
 
-class ProfessionalStudentDataView(ModelView):                                                      # Define una vista personalizada para el modelo `ProfessionalData`
+    def on_model_change(self, form, model, is_created):
+        # Los JWT llevan rol y estado como claims: si cambian, se revocan los tokens emitidos
+        state = inspect(model)
+        if state.attrs.role.history.has_changes() or state.attrs.status.history.has_changes():
+            invalidate_user(model.id)
+
+    def on_model_delete(self, model):
+        invalidate_user(model.id)                                                           # Descarta también su identidad cacheada
+
+class ProfessionalStudentDataView(LargeTableView):                                                      # Define una vista personalizada para el modelo `ProfessionalData`
     column_list = [
         "id", "user_id", "institution", "career", "academic_grade", "register_number"
     ]
+    column_filters = [
+        IntEqualFilter(ProfessionalStudentData.user_id, "Usuario (id)"),
+        IntEqualFilter(ProfessionalStudentData.requested_professional_id, "Profesional solicitado (id)"),
+        IntEqualFilter(ProfessionalStudentData.validated_by_id, "Validado por (id)"),
+    ]
 
-class MedicalFileView(ModelView):                                                           # Define una vista personalizada para el modelo `MedicalFile`
+class MedicalFileView(LargeTableView):                                                           # Define una vista personalizada para el modelo `MedicalFile`
     column_list = [
             "id", "user_id", "file_status", "selected_student_id", "progressed_by_id", 
             "progressed_at", "reviewed_by_id", "reviewed_at", "approved_by_id",
@@ -39,10 +190,51 @@ class MedicalFileView(ModelView):
             "confirmed_at", "no_confirmed_by_id", "no_confirmed_at", "non_pathological_background",
             "pathological_background", "family_background", "gynecological_background",
     ]
+    # Los antecedentes se muestran como capturado sí/no: se cargan en una consulta por
+    # sección para toda la página y solo con su id
+    column_formatters = {
+        section: lambda view, context, model, name: "Sí" if getattr(model, name) is not None else "—"
+        for section in ("non_pathological_background", "pathological_background",
+                        "family_background", "gynecological_background")
+    }
+    column_filters = [
+        EnumEqualFilter(MedicalFile.file_status, "Estado", options=_enum_options(FileStatus), enum_class=FileStatus),
+        IntEqualFilter(MedicalFile.user_id, "Paciente (id)"),
+        IntEqualFilter(MedicalFile.selected_student_id, "Estudiante (id)"),
+        IntEqualFilter(MedicalFile.patient_requested_student_id, "Estudiante solicitado (id)"),
+        IntEqualFilter(MedicalFile.claimed_by_id, "Reclamado por (id)"),
+    ]
+    form_excluded_columns = ["review_html", "version"]
+
+    def on_model_change(self, form, model, is_created):
+        bump_file_version(model)                                                            # version no se incrementa sola (version_id_generator=False)
+
+    def get_query(self):
+        return super(MedicalFileView, self).get_query().options(
+            selectinload(MedicalFile.non_pathological_background).load_only(NonPathologicalBackground.id),
+            selectinload(MedicalFile.pathological_background).load_only(PathologicalBackground.id),
+            selectinload(MedicalFile.family_background).load_only(FamilyBackground.id),
+            selectinload(MedicalFile.gynecological_background).load_only(GynecologicalBackground.id),
+        )
 
-class NonPathologicalBackgroundView(ModelView):                                             # Define una vista personalizada para el modelo `NonPathologicalBackground`
+class BackgroundView(LargeTableView):                                                        # Base de las vistas de antecedentes
+    # El documento cacheado del expediente incluye sus antecedentes: al editarlos, moverlos
+    # de expediente o borrarlos se invalida el expediente anterior y el nuevo
+    def _bump_medical_files(self, model):
+        history = inspect(model).attrs.medical_file.history
+        for medical_file in {*history.deleted, model.medical_file}:
+            if medical_file is not None:
+                bump_file_version(medical_file)
+
+    def on_model_change(self, form, model, is_created):
+        self._bump_medical_files(model)
+
+    def on_model_delete(self, model):
+        self._bump_medical_files(model)
+
+class NonPathologicalBackgroundView(BackgroundView):                                             # Define una vista personalizada para el modelo `NonPathologicalBackground`
     column_list = [
-        "id", "user_id", "medical_file_id", "sex", "nationality", "ethnic_group", "languages",
+        "id", "medical_file_id", "sex", "nationality", "ethnic_group", "languages",
         "blood_type", "spiritual_practices", "other_origin_info", "civil_status", "address",
         "housing_type", "cohabitants", "dependents", "other_living_info", "education_institution",
         "academic_degree", "career", "institute_registration_number", "other_education_info", 
@@ -53,27 +245,33 @@ class NonPathologicalBackgroundView(ModelView):
         "sleep_quality", "sleep_details", "hobbies", "recent_travel", "has_piercings",
         "has_tattoos", "alcohol_use", "tobacco_use", "other_drug_use", "addictions", "other_recreational_info"
     ]
+    column_filters = [IntEqualFilter(NonPathologicalBackground.medical_file_id, "Expediente (id)")]
 
-class PathologicalBackgroundView(ModelView):                                                # Define una vista personalizada para el modelo `PathologicalBackground`
+class PathologicalBackgroundView(BackgroundView):                                                # Define una vista personalizada para el modelo `PathologicalBackground`
     column_list = [
-        "id", "user_id", "medical_file_id", "disability_description", "visual_disability",
+        "id", "medical_file_id", "disability_description", "visual_disability",
         "hearing_disability", "motor_disability", "intellectual_disability", "chronic_diseases",
         "current_medications", "hospitalizations", "surgeries", "accidents", "transfusions",
         "allergies", "other_pathological_info"
     ]
+    column_filters = [IntEqualFilter(PathologicalBackground.medical_file_id, "Expediente (id)")]
 
-class FamilyBackgroundView(ModelView):                                                      # Define una vista personalizada para el modelo `FamilyBackground`
+class FamilyBackgroundView(BackgroundView):                                                      # Define una vista personalizada para el modelo `FamilyBackground`
     column_list = [
-        "id", "user_id", "medical_file_id", "hypertension", "diabetes", "cancer",
+        "id", "medical_file_id", "hypertension", "diabetes", "cancer",
         "mental_illnesses", "congenital_diseases", "heart_diseases", "liver_diseases",
         "kidney_diseases", "other_family_background_info"
     ]
+    column_filters = [IntEqualFilter(FamilyBackground.medical_file_id, "Expediente (id)")] + [
+        FlagFilter(getattr(FamilyBackground, flag), flag) for flag in FAMILY_BACKGROUND_FLAGS
+    ]
 
-class GynecologicalBackgroundView(ModelView):                                               # Define una vista personalizada para el modelo `GynecologicalBackground`
+class GynecologicalBackgroundView(BackgroundView):                                               # Define una vista personalizada para el modelo `GynecologicalBackground`
     column_list = [
-        "id", "user_id", "medical_file_id", "menarche_age", "pregnancies", "births", "c_sections",
+        "id", "medical_file_id", "menarche_age", "pregnancies", "births", "c_sections",
         "abortions", "contraceptive_methods", "other_gynecological_info"
     ]
+    column_filters = [IntEqualFilter(GynecologicalBackground.medical_file_id, "Expediente (id)")]
 
 
 
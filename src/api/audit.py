@@ -0,0 +1,88 @@
+# Bitácora de transiciones de estado del expediente (tabla file_transition).
+#
+# `transition_file` registra cada cambio de estado con `record_transition`; las filas se
+# acumulan en la sesión y se insertan todas juntas (un solo executemany) justo antes del
+# commit, en la misma transacción que el cambio de estado: si la transacción se revierte,
+# la bitácora también. La tabla es de solo inserción (en la base, un trigger rechaza
+# UPDATE y DELETE) y no toca la fila de medical_file.
+#
+# En PostgreSQL file_transition está particionada por mes de created_at. La migración crea
+# las particiones de los próximos meses y una partición DEFAULT para que ningún insert
+# falle; `flask create-audit-partitions` (p. ej. en un cron mensual) crea las siguientes
+# antes de que empiece el mes. Para depurar meses viejos basta con DETACH / DROP de su
+# partición.
+
+from datetime import date, datetime
+
+from sqlalchemy import event, insert, select, text
+
+from api.models import db, FileTransition
+
+AUDIT_PARTITION_MONTHS_AHEAD = 3
+
+
+def record_transition(medical_file_id, from_status, to_status, actor_id=None, comment=None, session=None):
+    (session or db.session).info.setdefault("file_transitions", []).append({
+        "medical_file_id": medical_file_id,
+        "actor_id": actor_id,
+        "from_status": from_status,
+        "to_status": to_status,
+        "comment": comment or None,
+        "created_at": datetime.utcnow(),
+    })
+
+
+def _write_transitions(session):
+    rows = session.info.pop("file_transitions", None)
+    if rows:
+        session.execute(insert(FileTransition), rows)
+
+
+def _discard_transitions(session):
+    session.info.pop("file_transitions", None)
+
+
+event.listen(db.session, "before_commit", _write_transitions)
+event.listen(db.session, "after_rollback", _discard_transitions)
+
+
+def file_timeline(medical_file_id, after_id=None, limit=50):
+    """Transiciones de un expediente en orden cronológico (keyset sobre id); devuelve (filas, next_after_id)."""
+    query = select(FileTransition).where(FileTransition.medical_file_id == medical_file_id)
+    if after_id is not None:
+        query = query.where(FileTransition.id > after_id)
+    rows = db.session.execute(query.order_by(FileTransition.id).limit(limit + 1)).scalars().all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return rows, (rows[-1].id if has_more else None)
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_sql(month):
+    """CREATE TABLE de la partición mensual de file_transition que contiene `month`."""
+    start = date(month.year, month.month, 1)
+    end = _add_months(start, 1)
+    return (
+        f"CREATE TABLE IF NOT EXISTS file_transition_{start:%Y_%m} PARTITION OF file_transition "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def create_transition_partitions(months_ahead=AUDIT_PARTITION_MONTHS_AHEAD, today=None):
+    """
+    Crea (si faltan) las particiones del mes actual y los `months_ahead` siguientes.
+    Solo aplica en PostgreSQL; devuelve los nombres de las particiones revisadas (sin commit).
+    """
+    if db.session.get_bind().dialect.name != "postgresql":
+        return []
+    month = today or date.today()
+    names = []
+    for offset in range(months_ahead + 1):
+        start = _add_months(date(month.year, month.month, 1), offset)
+        db.session.execute(text(partition_sql(start)))
+        names.append(f"file_transition_{start:%Y_%m}")
+    return names
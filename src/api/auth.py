@@ -0,0 +1,226 @@
+# Carga del usuario autenticado (identidad del JWT) una sola vez por request.
+# Los tokens emitidos por `create_user_token` llevan role y status como claims,
+# así que normalmente no hace falta consultar la tabla `users`; los tokens sin
+# claims (emitidos antes) caen a una consulta de id, role y status. En ambos casos
+# los decoradores de roles y los handlers reutilizan el resultado guardado en `flask.g`.
+#
+# Revocación: cada token lleva la versión de tokens del usuario ("ver"), guardada en
+# users.token_version. Al cambiar el status o rol de un usuario, `invalidate_user`
+# incrementa la versión en la misma transacción que el cambio y los tokens anteriores se
+# rechazan. La versión se lee junto con la identidad (una consulta por id).
+#
+# Para no consultar `users` en cada request, (identidad, versión) se cachea
+# IDENTITY_CACHE_TTL segundos (por defecto 30; 0 desactiva la caché):
+#   - con REDIS_URL (y `redis` instalado) en Redis, compartida entre workers: al hacer
+#     commit de una revocación se borra la entrada y todos los workers la ven al instante;
+#   - si no, en memoria del proceso: el worker que revoca la ve al instante y los demás
+#     tardan a lo más el TTL.
+#
+# Stream de eventos: EventSource no permite enviar headers, así que /api/events recibe el
+# token en la URL. Para no dejar el JWT de acceso en logs e historial se usa un token aparte
+# (`create_stream_token`): firmado con otra sal, válido solo para abrir el stream y por
+# STREAM_TOKEN_MAX_AGE segundos. No es un JWT, así que no sirve en ningún otro endpoint.
+
+import json
+import os
+import time
+from collections import namedtuple
+from datetime import timedelta
+from threading import Lock
+
+from flask import current_app, g
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from flask_jwt_extended import create_access_token, get_jwt, get_jwt_identity
+from sqlalchemy import event, update
+
+from api.models import db, User, UserRole, UserStatus
+
+try:
+    import redis
+except ImportError:  # Dependencia opcional
+    redis = None
+
+
+CurrentUser = namedtuple("CurrentUser", ["id", "role", "status"])
+
+STREAM_TOKEN_SALT = "api-events-stream"
+STREAM_TOKEN_MAX_AGE = 60
+
+
+class LocalIdentityCache:
+    def __init__(self):
+        self._data = {}
+        self._lock = Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None:
+                return None
+            expires_at, row = entry
+            if expires_at < time.monotonic():
+                del self._data[user_id]
+                return None
+            return row
+
+    def set(self, user_id, row, ttl):
+        with self._lock:
+            self._data[user_id] = (time.monotonic() + ttl, row)
+
+    def delete(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._data.pop(user_id, None)
+
+
+class RedisIdentityCache:
+    def __init__(self, url):
+        self._client = redis.Redis.from_url(url)
+
+    @staticmethod
+    def key(user_id):
+        return f"identity:{user_id}"
+
+    def get(self, user_id):
+        value = self._client.get(self.key(user_id))
+        if value is None:
+            return None
+        role, status, token_version = json.loads(value)
+        return CurrentUser(user_id, UserRole(role), UserStatus(status)), token_version
+
+    def set(self, user_id, row, ttl):
+        identity, token_version = row
+        self._client.set(self.key(user_id),
+                         json.dumps([identity.role.value, identity.status.value, token_version]), ex=ttl)
+
+    def delete(self, user_ids):
+        self._client.delete(*(self.key(user_id) for user_id in user_ids))
+
+
+def _create_identity_cache():
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url and redis is not None:
+        return RedisIdentityCache(redis_url)
+    return LocalIdentityCache()
+
+
+identity_cache = _create_identity_cache()
+
+
+def _cache_ttl():
+    return current_app.config.get("IDENTITY_CACHE_TTL", 0)
+
+
+def _load_identity_row(user_id):
+    """(CurrentUser, token_version) del usuario sin cargar relaciones, o None."""
+    ttl = _cache_ttl()
+    if ttl:
+        row = identity_cache.get(user_id)
+        if row is not None:
+            return row
+
+    result = db.session.query(User.id, User.role, User.status, User.token_version).filter(
+        User.id == user_id).first()
+    row = (CurrentUser(*result[:3]), result[3]) if result else None
+
+    if row is not None and ttl:
+        identity_cache.set(user_id, row, ttl)
+    return row
+
+
+def load_user_identity(user_id):
+    """Devuelve (id, role, status) del usuario sin cargar relaciones, o None."""
+    row = _load_identity_row(user_id)
+    return row[0] if row else None
+
+
+def get_current_user():
+    """Usuario del JWT actual, cargado una vez y guardado en `flask.g`."""
+    if "current_user" not in g:
+        user_id = int(get_jwt_identity())
+        claims = get_jwt()
+        if "role" in claims and "status" in claims:
+            g.current_user = CurrentUser(
+                user_id, UserRole(claims["role"]), UserStatus(claims["status"]))
+        else:
+            g.current_user = load_user_identity(user_id)
+    return g.current_user
+
+
+# -------------------- VERSIONES DE TOKEN --------------------
+
+
+def create_user_token(user):
+    """JWT con role, status y versión de token como claims adicionales."""
+    return create_access_token(
+        identity=str(user.id),
+        additional_claims={
+            "role": user.role.value,
+            "status": user.status.value,
+            "ver": user.token_version,
+        },
+        expires_delta=timedelta(hours=1)
+    )
+
+
+def is_token_revoked(jwt_header, jwt_payload):
+    """Callback de `token_in_blocklist_loader`: rechaza tokens de una versión anterior."""
+    if "ver" not in jwt_payload:
+        return False
+    row = _load_identity_row(int(jwt_payload["sub"]))
+    return row is None or jwt_payload["ver"] < row[1]
+
+
+def invalidate_user(user_id):
+    """Revoca los tokens emitidos al usuario. Se llama antes del commit que cambia su status
+    o rol, para que ambos se confirmen juntos; la identidad cacheada se borra al hacer commit."""
+    db.session.execute(
+        update(User).where(User.id == user_id).values(token_version=User.token_version + 1),
+        execution_options={"synchronize_session": False},
+    )
+    db.session.info.setdefault("invalidated_users", set()).add(user_id)
+
+    current_user = g.get("current_user")
+    if current_user is not None and current_user.id == user_id:
+        g.pop("current_user")
+
+
+def _drop_invalidated(session):
+    # Después del commit: si se borrara antes, un request concurrente podría volver a
+    # cachear la versión anterior mientras la transacción sigue abierta
+    user_ids = session.info.pop("invalidated_users", None)
+    if user_ids:
+        identity_cache.delete(user_ids)
+
+
+def _discard_invalidated(session):
+    session.info.pop("invalidated_users", None)
+
+
+event.listen(db.session, "after_commit", _drop_invalidated)
+event.listen(db.session, "after_rollback", _discard_invalidated)
+
+
+# -------------------- TOKEN DEL STREAM DE EVENTOS --------------------
+
+
+def _stream_serializer():
+    return URLSafeTimedSerializer(current_app.config["JWT_SECRET_KEY"], salt=STREAM_TOKEN_SALT)
+
+
+def create_stream_token():
+    """Token de vida corta para abrir /api/events, emitido al usuario del JWT actual."""
+    claims = get_jwt()
+    return _stream_serializer().dumps({"sub": int(get_jwt_identity()), "ver": claims.get("ver")})
+
+
+def load_stream_token(token):
+    """Identidad (CurrentUser) de un token de stream vigente y no revocado, o None."""
+    try:
+        payload = _stream_serializer().loads(token, max_age=STREAM_TOKEN_MAX_AGE)
+    except BadSignature:  # Incluye SignatureExpired
+        return None
+    row = _load_identity_row(payload["sub"])
+    if row is None or (payload["ver"] is not None and payload["ver"] < row[1]):
+        return None
+    return row[0]
@@ -0,0 +1,185 @@
+# Consultas de cohortes sobre los antecedentes de los expedientes.
+#
+# Un filtro es JSON con combinadores y condiciones sobre columnas "<sección>.<columna>",
+# los mismos nombres que las columnas del CSV de exportación:
+#
+#     {"all": [
+#         {"field": "family_background.diabetes", "op": "eq", "value": true},
+#         {"field": "family_background.hypertension", "op": "eq", "value": true},
+#         {"field": "non_pathological_background.tobacco_use", "op": "present"},
+#         {"field": "non_pathological_background.diet_quality", "op": "eq", "value": "bad"}
+#     ]}
+#
+# Combinadores: "all" (AND), "any" (OR) y "not" (incluye a quienes no tienen el dato).
+# Operadores según el tipo de la columna:
+#   booleanos: eq;  enums: eq, ne, in;  números: eq, ne, in, gt, gte, lt, lte;
+#   texto: eq, contains (sin distinguir mayúsculas);  todos: present, missing (NULL o vacío).
+# Además "file_status" filtra por el estado del expediente.
+#
+# El filtro se compila a una sola consulta: medical_file con LEFT JOIN solo a las secciones
+# que usa. Las banderas de family_background tienen índices parciales (WHERE <bandera>),
+# así que "eq true" sobre varias se resuelve combinando índices pequeños.
+
+from sqlalchemy import and_, func, not_, or_, select
+from sqlalchemy import Boolean, Enum, Float, Integer
+
+from api.models import db, MedicalFile, FileStatus, BACKGROUND_SECTIONS
+
+COHORT_MAX_CONDITIONS = 30
+COHORT_MAX_DEPTH = 5
+
+_SECTIONS = dict(BACKGROUND_SECTIONS)
+_EXCLUDED_COLUMNS = {"id", "medical_file_id"}
+_OPERATORS = {
+    "boolean": {"eq", "present", "missing"},
+    "enum": {"eq", "ne", "in", "present", "missing"},
+    "number": {"eq", "ne", "in", "gt", "gte", "lt", "lte", "present", "missing"},
+    "text": {"eq", "contains", "present", "missing"},
+}
+
+
+class CohortQueryError(ValueError):
+    pass
+
+
+def _column_kind(column):
+    if isinstance(column.type, Boolean):
+        return "boolean"
+    if isinstance(column.type, Enum):
+        return "enum"
+    if isinstance(column.type, (Integer, Float)):
+        return "number"
+    return "text"
+
+
+def cohort_fields():
+    """Campos filtrables con su tipo, operadores y valores permitidos (para el formulario)."""
+    fields = [{"field": "file_status", "kind": "enum", "operators": sorted(_OPERATORS["enum"]),
+               "values": [status.value for status in FileStatus]}]
+    for section, model in BACKGROUND_SECTIONS:
+        for column in model.__table__.columns:
+            if column.key in _EXCLUDED_COLUMNS:
+                continue
+            kind = _column_kind(column)
+            field = {"field": f"{section}.{column.key}", "kind": kind, "operators": sorted(_OPERATORS[kind])}
+            if kind == "enum":
+                field["values"] = [member.value for member in column.type.enum_class]
+            fields.append(field)
+    return fields
+
+
+class _Compiler:
+    def __init__(self):
+        self.sections = set()
+        self.conditions = 0
+
+    def compile(self, node, depth=0):
+        if depth > COHORT_MAX_DEPTH:
+            raise CohortQueryError(f"El filtro admite a lo sumo {COHORT_MAX_DEPTH} niveles")
+        if not isinstance(node, dict) or len(node) == 0:
+            raise CohortQueryError("Cada nodo del filtro debe ser un objeto")
+
+        for combinator, combine in (("all", and_), ("any", or_)):
+            if combinator in node:
+                children = node[combinator]
+                if not isinstance(children, list) or not children:
+                    raise CohortQueryError(f'"{combinator}" requiere una lista no vacía')
+                return combine(*[self.compile(child, depth + 1) for child in children])
+        if "not" in node:
+            # Sin dato (NULL, o la sección no capturada) cuenta como "no cumple" la condición negada
+            return not_(func.coalesce(self.compile(node["not"], depth + 1), False))
+        return self._condition(node)
+
+    def _resolve(self, field):
+        if field == "file_status":
+            return MedicalFile.file_status, "enum"
+        section, _, column_name = str(field).partition(".")
+        model = _SECTIONS.get(section)
+        column = model.__table__.columns.get(column_name) if model is not None else None
+        if column is None or column_name in _EXCLUDED_COLUMNS:
+            raise CohortQueryError(f"Campo no válido: {field}")
+        self.sections.add(section)
+        return getattr(model, column_name), _column_kind(column)
+
+    def _value(self, column, kind, value):
+        if kind == "boolean" and isinstance(value, bool):
+            return value
+        if kind == "number" and isinstance(value, (int, float)) and not isinstance(value, bool):
+            return value
+        if kind == "text" and isinstance(value, str):
+            return value
+        if kind == "enum":
+            try:
+                return column.type.enum_class(value)
+            except ValueError:
+                pass
+        raise CohortQueryError(f"Valor no válido para {column.key}: {value!r}")
+
+    def _condition(self, node):
+        self.conditions += 1
+        if self.conditions > COHORT_MAX_CONDITIONS:
+            raise CohortQueryError(f"El filtro admite a lo sumo {COHORT_MAX_CONDITIONS} condiciones")
+
+        column, kind = self._resolve(node.get("field"))
+        op = node.get("op", "eq")
+        if op not in _OPERATORS[kind]:
+            raise CohortQueryError(f"Operador no válido para {node.get('field')}: {op}")
+
+        if op in ("present", "missing"):
+            present = column.is_not(None)
+            if kind == "text":
+                present = and_(present, column != "")
+            return present if op == "present" else not_(present)
+
+        if op == "in":
+            values = node.get("value")
+            if not isinstance(values, list) or not values:
+                raise CohortQueryError('"in" requiere una lista de valores')
+            return column.in_([self._value(column, kind, value) for value in values])
+
+        value = self._value(column, kind, node.get("value"))
+        if op == "contains":
+            return func.lower(column).contains(value.lower(), autoescape=True)
+        if kind == "boolean":
+            # La columna sola (no "= true" ni "IS TRUE"): se compila igual que el predicado
+            # de los índices parciales, así que tanto PostgreSQL como SQLite los usan
+            return column if value else or_(not_(column), column.is_(None))
+        return {
+            "eq": column == value,
+            "ne": column != value,
+            "gt": column > value,
+            "gte": column >= value,
+            "lt": column < value,
+            "lte": column <= value,
+        }[op]
+
+
+def compile_cohort(where):
+    """
+    Compila el filtro a un SELECT de medical_file.id. Lanza CohortQueryError si el filtro
+    no es válido.
+    """
+    compiler = _Compiler()
+    condition = compiler.compile(where)
+
+    query = select(MedicalFile.id)
+    for section, model in BACKGROUND_SECTIONS:
+        if section in compiler.sections:
+            query = query.outerjoin(model, model.medical_file_id == MedicalFile.id)
+    return query.where(condition)
+
+
+def count_cohort(where):
+    query = compile_cohort(where)
+    return db.session.execute(select(func.count()).select_from(query.subquery())).scalar()
+
+
+def cohort_ids(where, after_id=None, limit=100):
+    """Página de ids de expedientes (keyset sobre id); devuelve (ids, next_after_id)."""
+    query = compile_cohort(where)
+    if after_id is not None:
+        query = query.where(MedicalFile.id > after_id)
+    ids = db.session.execute(query.order_by(MedicalFile.id).limit(limit + 1)).scalars().all()
+    has_more = len(ids) > limit
+    ids = ids[:limit]
+    return ids, (ids[-1] if has_more else None)
@@ -1,6 +1,22 @@
 
+import os
+
 import click
 from api.models import db, User
+from api.export import EXPORT_FORMATS, parse_export_filters, iter_medical_files, generate_export
+from api.onboarding import parse_users_file, register_users
+from api.seed import SEED_BATCH_SIZE, SEED_EMAIL_DOMAIN, SEED_PASSWORD, has_seed_users, seed_database
+from api.static_files import precompress_directory
+from api.dashboard_stats import rebuild_dashboard_counters
+from api.audit import AUDIT_PARTITION_MONTHS_AHEAD, create_transition_partitions
+
+
+def _ensure_not_seeded():
+    if has_seed_users():
+        raise click.ClickException(
+            f"La base ya tiene cuentas de seed (*@{SEED_EMAIL_DOMAIN}). Vacíala antes de volver a sembrar, "
+            "p. ej.: flask db downgrade base && flask db upgrade")
+
 
 """
 In this file, you can add as many commands as you want using the @app.cli.command decorator
@@ -18,17 +34,117 @@ def setup_commands(app):
     @click.argument("count") # argument of out command
     def insert_test_users(count):
         print("Creating test users")
-        for x in range(1, int(count) + 1):
-            user = User()
-            user.email = "test_user" + str(x) + "@test.com"
-            user.password = "123456"
-            user.is_active = True
-            db.session.add(user)
-            db.session.commit()
-            print("User: ", user.email, " created.")
+        result = register_users([{
+            "first_name": "Test",
+            "first_surname": "User" + str(x),
+            "birth_day": "2000-01-01",
+            "role": "patient",
+            "email": "test_user" + str(x) + "@test.com",
+            "password": "123456",
+        } for x in range(1, int(count) + 1)], partial=True)
 
-        print("All test users created")
+        for error in result["errors"]:
+            print("User: ", error["email"], " skipped:", error["errors"])
+        print("All test users created:", result["created"])
 
     @app.cli.command("insert-test-data")
     def insert_test_data():
-        pass
\ No newline at end of file
+        _ensure_not_seeded()
+        summary = seed_database(patients=50, students=10, professionals=3, admins=1, seed=0)
+        print("Test data created:", summary, "- password:", SEED_PASSWORD)
+
+    """
+    Genera una población sintética coherente (admins, professionals, students, patients,
+    expedientes en todos los estados y sus antecedentes) con inserts por lotes:
+    $ flask seed --patients 100000 --students 2000 --professionals 200 --seed 42
+    Todas las cuentas usan la contraseña SEED_PASSWORD (ver api/seed.py).
+    """
+    @app.cli.command("seed")
+    @click.option("--patients", default=10000, type=int)
+    @click.option("--students", default=None, type=int, help="Por defecto, 1 por cada 50 pacientes")
+    @click.option("--professionals", default=None, type=int, help="Por defecto, 1 por cada 10 students")
+    @click.option("--admins", default=2, type=int)
+    @click.option("--batch-size", default=SEED_BATCH_SIZE, type=int, help="Filas por INSERT / commit")
+    @click.option("--seed", "rng_seed", default=None, type=int, help="Semilla para resultados reproducibles")
+    def seed(patients, students, professionals, admins, batch_size, rng_seed):
+        students = students if students is not None else max(10, patients // 50)
+        professionals = professionals if professionals is not None else max(2, students // 10)
+        if min(admins, students, professionals) < 1:
+            raise click.BadParameter("Se necesita al menos un admin, un professional y un student")
+        _ensure_not_seeded()
+
+        print(f"Sembrando {admins} admins, {professionals} professionals, {students} students, {patients} patients")
+        summary = seed_database(patients, students, professionals, admins, batch_size, rng_seed)
+        print("Listo:", summary, "- contraseña:", SEED_PASSWORD)
+
+    """
+    Exporta los expedientes con sus antecedentes en NDJSON o CSV, en streaming:
+    $ flask export-medical-files --format csv --status approved --from 2025-01-01 --output files.csv
+    """
+    @app.cli.command("export-medical-files")
+    @click.option("--format", "fmt", type=click.Choice(EXPORT_FORMATS), default="ndjson")
+    @click.option("--status", "file_status", default=None, help="Filtrar por file_status")
+    @click.option("--from", "date_from", default=None, help="Fecha inicial (ISO 8601, incluida)")
+    @click.option("--to", "date_to", default=None, help="Fecha final (ISO 8601, excluida)")
+    @click.option("--date-field", default="progressed_at", help="Columna de fecha a filtrar")
+    @click.option("--chunk-size", default=500, type=int, help="Filas por lote del cursor")
+    @click.option("--output", type=click.File("w", encoding="utf-8"), default="-")
+    def export_medical_files(fmt, file_status, date_from, date_to, date_field, chunk_size, output):
+        try:
+            filters = parse_export_filters(file_status, date_from, date_to, date_field)
+        except ValueError as e:
+            raise click.BadParameter(str(e))
+
+        for chunk in generate_export(fmt, iter_medical_files(chunk_size=chunk_size, **filters)):
+            output.write(chunk)
+
+    """
+    Registra usuarios en bloque desde un CSV (con cabecera) o JSON:
+    $ flask bulk-register-users pacientes.csv --partial
+    """
+    @app.cli.command("bulk-register-users")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--partial", is_flag=True, help="Registrar las filas válidas aunque otras tengan errores")
+    def bulk_register_users(path, partial):
+        fmt = "csv" if path.lower().endswith(".csv") else "json"
+        with open(path, encoding="utf-8-sig") as f:
+            raw_rows = parse_users_file(f.read(), fmt)
+
+        result = register_users(raw_rows, partial=partial)
+        for error in result["errors"]:
+            print(f"Fila {error['row']} ({error['email']}): {error['errors']}")
+        print(f"Usuarios creados: {result['created']} - filas con errores: {len(result['errors'])}")
+
+    """
+    Genera las variantes .gz/.br de los assets del frontend después de `npm run build`:
+    $ flask precompress-static
+    """
+    @app.cli.command("precompress-static")
+    @click.option("--directory", default=None, help="Por defecto, dist/ en la raíz del proyecto")
+    def precompress_static(directory):
+        directory = directory or os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..", "dist")
+        written = precompress_directory(directory)
+        print(f"Variantes comprimidas generadas: {written}")
+
+    """
+    Recalcula los conteos de los dashboards desde las tablas (después de cargas fuera de la
+    app o como conciliación periódica, p. ej. en un cron nocturno):
+    $ flask rebuild-dashboard-stats
+    """
+    @app.cli.command("rebuild-dashboard-stats")
+    def rebuild_dashboard_stats():
+        counters = rebuild_dashboard_counters()
+        db.session.commit()
+        print(f"Conteos recalculados: {counters}")
+
+    """
+    Crea las particiones mensuales de la bitácora de transiciones (PostgreSQL) del mes
+    actual y los siguientes; conviene correrlo en un cron mensual:
+    $ flask create-audit-partitions --months 3
+    """
+    @app.cli.command("create-audit-partitions")
+    @click.option("--months", default=AUDIT_PARTITION_MONTHS_AHEAD, type=int, help="Meses por delante del actual")
+    def create_audit_partitions(months):
+        partitions = create_transition_partitions(months)
+        db.session.commit()
+        print(f"Particiones revisadas: {', '.join(partitions) or 'ninguna (solo PostgreSQL)'}")
@@ -0,0 +1,253 @@
+# Conteos de los dashboards (usuarios por rol/estado, expedientes por estado, y por
+# profesional / estudiante) mantenidos de forma incremental en dashboard_counter.
+#
+# Cada conteo es la suma de "contribuciones" de las filas: un expediente en review aporta
+# +1 a ("global", "files.review") y +1 a (su estudiante, "files.review"). Al hacer flush
+# se compara el estado anterior y el nuevo de los User / MedicalFile /
+# ProfessionalStudentData modificados por el ORM y se acumula la diferencia; justo antes
+# del commit se aplica con un upsert (value = value + delta) en la misma transacción, así
+# que un rollback también descarta los conteos. Lo que se escribe sin ORM lo registra quien
+# lo escribe (`record_counter_changes` en transition_file, `record_counter` en los
+# inserts en bloque) o se recalcula con `rebuild_dashboard_counters` (seed y
+# `flask rebuild-dashboard-stats`, que también sirve para conciliar periódicamente).
+#
+# Leer los conteos es O(número de métricas) sin importar el tamaño de las tablas.
+
+import os
+import random
+from collections import Counter
+
+from sqlalchemy import delete, event, func, inspect, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from api.models import db, DashboardCounter, User, MedicalFile, ProfessionalStudentData, UserRole, UserStatus, FileStatus
+
+GLOBAL = 0
+DASHBOARD_COUNTER_SHARDS = int(os.getenv("DASHBOARD_COUNTER_SHARDS", 8))
+
+
+def _user_contributions(state):
+    if state["role"] is None:
+        return []
+    # register_user asigna el rol como str; UserRole(...) acepta ambos
+    role, status = UserRole(state["role"]), UserStatus(state["status"] or UserStatus.pre_approved)
+    return [(GLOBAL, f"users.{role.value}.{status.value}")]
+
+
+def _file_contributions(state):
+    status = FileStatus(state["file_status"] or FileStatus.empty).value
+    items = [(GLOBAL, f"files.{status}")]
+    for field, metric in (("selected_student_id", f"files.{status}"),
+                          ("patient_requested_student_id", "patient_requests"),
+                          ("approved_by_id", "approved"),
+                          ("no_approved_by_id", "rejected")):
+        owner = state[field]
+        if owner:
+            items.append((owner, metric))
+    return items
+
+
+def _academic_contributions(state):
+    items = []
+    requested, validator = state["requested_professional_id"], state["validated_by_id"]
+    if requested and not validator:
+        items.append((requested, "student_requests"))
+    if validator:
+        items.append((validator, "validated_users"))
+    return items
+
+
+# Modelo -> (columnas que afectan los conteos, contribuciones de un estado)
+TRACKED_MODELS = {
+    User: (("role", "status"), _user_contributions),
+    MedicalFile: (("file_status", "selected_student_id", "patient_requested_student_id",
+                   "approved_by_id", "no_approved_by_id"), _file_contributions),
+    ProfessionalStudentData: (("requested_professional_id", "validated_by_id"), _academic_contributions),
+}
+
+FILE_COUNTER_FIELDS = TRACKED_MODELS[MedicalFile][0]
+
+
+def _pending(session):
+    return session.info.setdefault("counter_deltas", Counter())
+
+
+def record_counter(metric, delta=1, owner_id=GLOBAL, session=None):
+    _pending(session or db.session)[(owner_id, metric)] += delta
+
+
+def record_counter_changes(model, before, after, session=None):
+    """Registra el cambio de una fila escrita sin ORM (before/after: dict de columnas)."""
+    contributions = TRACKED_MODELS[model][1]
+    pending = _pending(session or db.session)
+    for key in contributions(before):
+        pending[key] -= 1
+    for key in contributions(after):
+        pending[key] += 1
+
+
+def counter_state(obj):
+    fields = TRACKED_MODELS[type(obj)][0]
+    return {field: getattr(obj, field) for field in fields}
+
+
+def _states(session, obj, fields):
+    """Estado antes y después del flush; lo que no estaba cargado se lee de la base."""
+    attrs = inspect(obj).attrs
+    before, after, unknown = {}, {}, []
+    for field in fields:
+        history = attrs[field].history
+        if history.deleted:
+            before[field] = history.deleted[0]
+        elif history.unchanged:
+            before[field] = history.unchanged[0]
+        else:
+            unknown.append(field)
+        if history.added:
+            after[field] = history.added[0]
+    if unknown:
+        model = type(obj)
+        row = session.execute(
+            select(*[getattr(model, field) for field in unknown]).where(model.id == obj.id)
+        ).one()
+        before.update(zip(unknown, row))
+    return before, {**before, **after}
+
+
+def _collect(session, flush_context, instances):
+    pending = _pending(session)
+    for obj in session.new:
+        tracked = TRACKED_MODELS.get(type(obj))
+        if tracked:
+            for key in tracked[1](counter_state(obj)):
+                pending[key] += 1
+    for obj in session.dirty:
+        tracked = TRACKED_MODELS.get(type(obj))
+        if tracked and session.is_modified(obj, include_collections=False):
+            before, after = _states(session, obj, tracked[0])
+            if before != after:
+                for key in tracked[1](before):
+                    pending[key] -= 1
+                for key in tracked[1](after):
+                    pending[key] += 1
+    for obj in session.deleted:
+        tracked = TRACKED_MODELS.get(type(obj))
+        if tracked:
+            before, _ = _states(session, obj, tracked[0])
+            for key in tracked[1](before):
+                pending[key] -= 1
+
+
+def _upsert_statement(dialect_name):
+    dialect_insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(dialect_name)
+    if dialect_insert is None:
+        return None
+    statement = dialect_insert(DashboardCounter)
+    return statement.on_conflict_do_update(
+        index_elements=["owner_id", "metric", "shard"],
+        set_={"value": DashboardCounter.value + statement.excluded.value},
+    )
+
+
+def _apply(session):
+    session.flush()  # Recoge los cambios aún pendientes (_collect)
+    pending = session.info.pop("counter_deltas", None)
+    if not pending:
+        return
+
+    # Un shard por transacción para los globales y filas en orden fijo (sin deadlocks)
+    shard = random.randrange(DASHBOARD_COUNTER_SHARDS)
+    rows = [
+        {"owner_id": owner_id, "metric": metric, "shard": shard if owner_id == GLOBAL else 0, "value": delta}
+        for (owner_id, metric), delta in sorted(pending.items()) if delta
+    ]
+    if not rows:
+        return
+
+    statement = _upsert_statement(session.get_bind().dialect.name)
+    if statement is not None:
+        session.execute(statement, rows)
+        return
+    for row in rows:
+        updated = session.execute(
+            update(DashboardCounter).where(
+                DashboardCounter.owner_id == row["owner_id"],
+                DashboardCounter.metric == row["metric"],
+                DashboardCounter.shard == row["shard"],
+            ).values(value=DashboardCounter.value + row["value"])
+        ).rowcount
+        if not updated:
+            session.execute(insert(DashboardCounter).values(**row))
+
+
+def _discard(session):
+    session.info.pop("counter_deltas", None)
+
+
+event.listen(db.session, "before_flush", _collect)
+event.listen(db.session, "before_commit", _apply)
+event.listen(db.session, "after_rollback", _discard)
+
+
+def rebuild_dashboard_counters():
+    """Recalcula todos los conteos desde las tablas (sin commit)."""
+    totals = Counter()
+
+    for role, status, count in db.session.execute(
+            select(User.role, User.status, func.count()).group_by(User.role, User.status)):
+        totals[(GLOBAL, f"users.{role.value}.{status.value}")] += count
+
+    for status, count in db.session.execute(
+            select(MedicalFile.file_status, func.count()).group_by(MedicalFile.file_status)):
+        totals[(GLOBAL, f"files.{status.value}")] += count
+    for student_id, status, count in db.session.execute(
+            select(MedicalFile.selected_student_id, MedicalFile.file_status, func.count())
+            .where(MedicalFile.selected_student_id.is_not(None))
+            .group_by(MedicalFile.selected_student_id, MedicalFile.file_status)):
+        totals[(student_id, f"files.{status.value}")] += count
+    for column, metric in ((MedicalFile.patient_requested_student_id, "patient_requests"),
+                           (MedicalFile.approved_by_id, "approved"),
+                           (MedicalFile.no_approved_by_id, "rejected")):
+        for owner_id, count in db.session.execute(
+                select(column, func.count()).where(column.is_not(None)).group_by(column)):
+            totals[(owner_id, metric)] += count
+
+    for owner_id, count in db.session.execute(
+            select(ProfessionalStudentData.requested_professional_id, func.count())
+            .where(ProfessionalStudentData.requested_professional_id.is_not(None),
+                   ProfessionalStudentData.validated_by_id.is_(None))
+            .group_by(ProfessionalStudentData.requested_professional_id)):
+        totals[(owner_id, "student_requests")] += count
+    for owner_id, count in db.session.execute(
+            select(ProfessionalStudentData.validated_by_id, func.count())
+            .where(ProfessionalStudentData.validated_by_id.is_not(None))
+            .group_by(ProfessionalStudentData.validated_by_id)):
+        totals[(owner_id, "validated_users")] += count
+
+    db.session.execute(delete(DashboardCounter))
+    _discard(db.session)
+    if totals:
+        db.session.execute(insert(DashboardCounter), [
+            {"owner_id": owner_id, "metric": metric, "shard": 0, "value": value}
+            for (owner_id, metric), value in sorted(totals.items())
+        ])
+    return len(totals)
+
+
+def dashboard_counts(owner_id=GLOBAL, prefixes=None):
+    """
+    Conteos de un dueño como dict anidado por los puntos de la métrica
+    ({"files": {"review": 3}, ...}); `prefixes` limita las métricas devueltas.
+    """
+    query = select(DashboardCounter.metric, func.sum(DashboardCounter.value)).where(
+        DashboardCounter.owner_id == owner_id).group_by(DashboardCounter.metric)
+    result = {}
+    for metric, value in db.session.execute(query):
+        if prefixes is not None and not metric.startswith(prefixes):
+            continue
+        *path, leaf = metric.split(".")
+        node = result
+        for part in path:
+            node = node.setdefault(part, {})
+        node[leaf] = int(value)
+    return result
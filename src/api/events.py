@@ -0,0 +1,187 @@
+# Notificaciones en tiempo real (Server-Sent Events) para los dashboards.
+#
+# Los handlers llaman a `emit_event(canal, tipo, datos)` antes del commit; el evento solo
+# sale si la transacción se confirma. Canales: "user:<id>" (un usuario concreto) y
+# "role:<rol>" (p. ej. todos los professionals). GET /api/events mantiene abierta la
+# conexión y reenvía los eventos de los canales del usuario.
+#
+# EVENT_BROKER elige el broker:
+#   - "memory": cola en memoria del proceso; solo ve eventos del mismo worker.
+#   - "postgres": pg_notify dentro de la transacción (se entrega al hacer commit) y un
+#     hilo por worker con LISTEN que reparte las notificaciones a sus suscriptores, así
+#     que funciona con varios workers de gunicorn. Requiere psycopg2.
+# Por defecto "postgres" si la base es PostgreSQL y "memory" en otro caso.
+#
+# Cada stream abierto ocupa un hilo (gthread) o un greenlet (gevent) del worker mientras
+# dura. SSE_MAX_STREAMS limita los streams simultáneos por worker para que los demás
+# requests no se queden sin hilos; al llenarse, /api/events responde 503 y el cliente
+# reintenta más tarde. Por defecto: la mitad de GUNICORN_THREADS en gthread, la mitad de
+# GUNICORN_WORKER_CONNECTIONS en gevent y 0 (SSE desactivado) en sync.
+# Sin stream el dashboard no recibe eventos: useServerEvents vuelve a pedir sus listas en
+# cada reintento y al reconectar, así que sigue actualizándose (con retraso). Con muchos
+# dashboards abiertos conviene gevent, donde el límite es mucho mayor.
+
+import json
+import os
+import queue
+import select
+import threading
+import time
+
+from sqlalchemy import event, func, select as sql_select
+
+from api.models import db
+
+PG_CHANNEL = "app_events"
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def _default_max_streams():
+    worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+    if worker_class == "gevent":
+        return int(os.getenv("GUNICORN_WORKER_CONNECTIONS", 100)) // 2
+    if worker_class == "sync":
+        return 0
+    return int(os.getenv("GUNICORN_THREADS", 4)) // 2
+
+
+SSE_MAX_STREAMS = int(os.getenv("SSE_MAX_STREAMS", _default_max_streams()))
+_stream_slots = threading.BoundedSemaphore(SSE_MAX_STREAMS) if SSE_MAX_STREAMS > 0 else None
+
+
+def acquire_stream_slot():
+    """Reserva un lugar para un stream en este worker; False si ya están todos ocupados."""
+    return _stream_slots is not None and _stream_slots.acquire(blocking=False)
+
+
+def release_stream_slot():
+    _stream_slots.release()
+
+
+class Subscription:
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = tuple(channels)
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class MemoryBroker:
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, channels)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    def dispatch(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(message)
+            except queue.Full:
+                pass  # Cliente lento: se descarta; el dashboard refresca al reconectar
+
+    def emit(self, session, channel, message):
+        # Se publica en el after_commit de la sesión (ver _publish_pending)
+        session.info.setdefault("pending_events", []).append((channel, message))
+
+
+class PostgresBroker(MemoryBroker):
+    def __init__(self):
+        super().__init__()
+        self._listener_pid = None
+        self._listener_lock = threading.Lock()
+
+    def emit(self, session, channel, message):
+        # NOTIFY es transaccional: Postgres lo entrega al hacer commit y lo descarta en rollback
+        payload = json.dumps({"channel": channel, "message": message}, default=str)
+        session.execute(sql_select(func.pg_notify(PG_CHANNEL, payload)))
+
+    def subscribe(self, channels):
+        self._ensure_listener(db.engine)
+        return super().subscribe(channels)
+
+    def _ensure_listener(self, engine):
+        # Un hilo LISTEN por proceso (se vuelve a crear en cada worker tras el fork)
+        with self._listener_lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+            threading.Thread(target=self._listen, args=(engine,), name="pg-event-listener", daemon=True).start()
+
+    def _listen(self, engine):
+        while True:
+            connection = None
+            try:
+                connection = engine.raw_connection()
+                connection.detach()  # Conexión dedicada, fuera del pool
+                dbapi_connection = connection.dbapi_connection
+                dbapi_connection.autocommit = True
+                dbapi_connection.cursor().execute(f"LISTEN {PG_CHANNEL}")
+
+                while True:
+                    if select.select([dbapi_connection], [], [], 30) == ([], [], []):
+                        continue
+                    dbapi_connection.poll()
+                    while dbapi_connection.notifies:
+                        notify = dbapi_connection.notifies.pop(0)
+                        data = json.loads(notify.payload)
+                        self.dispatch(data["channel"], data["message"])
+            except Exception:
+                time.sleep(1)  # Reintento tras caída de la conexión
+            finally:
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+
+
+def _default_broker_name():
+    database_url = os.getenv("DATABASE_URL", "")
+    return "postgres" if database_url.startswith(("postgres://", "postgresql")) else "memory"
+
+
+EVENT_BROKERS = {"memory": MemoryBroker, "postgres": PostgresBroker}
+broker = EVENT_BROKERS[os.getenv("EVENT_BROKER") or _default_broker_name()]()
+
+
+def emit_event(channel, event_type, data=None):
+    """Encola un evento para `channel`; se entrega solo si la transacción actual hace commit."""
+    broker.emit(db.session, channel, {"type": event_type, "data": data or {}})
+
+
+def _publish_pending(session):
+    for channel, message in session.info.pop("pending_events", ()):
+        broker.dispatch(channel, message)
+
+
+def _discard_pending(session):
+    session.info.pop("pending_events", None)
+
+
+event.listen(db.session, "after_commit", _publish_pending)
+event.listen(db.session, "after_rollback", _discard_pending)
@@ -0,0 +1,91 @@
+# Exportación masiva de expedientes (MedicalFile + sus cuatro antecedentes) para análisis.
+# Se recorre la tabla con un cursor del lado del servidor (`yield_per`) y cada expediente
+# se convierte en una línea NDJSON o CSV en cuanto se lee, así que la memoria usada no
+# depende del número de expedientes. Lo usan el endpoint de admin y el comando
+# `flask export-medical-files`.
+
+import csv
+import io
+import json
+from datetime import datetime
+
+from sqlalchemy.orm import joinedload
+
+from api.models import MedicalFile, FileStatus, BACKGROUND_SECTIONS
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_DATE_FIELDS = ("progressed_at", "reviewed_at", "approved_at", "confirmed_at")
+EXPORT_CHUNK_SIZE = 500
+
+
+def parse_export_filters(file_status=None, date_from=None, date_to=None, date_field=None):
+    """Convierte los filtros recibidos como texto; lanza ValueError si alguno no es válido."""
+    date_field = date_field or "progressed_at"
+    if date_field not in EXPORT_DATE_FIELDS:
+        raise ValueError(f"date_field debe ser uno de: {', '.join(EXPORT_DATE_FIELDS)}")
+
+    return {
+        "file_status": FileStatus(file_status) if file_status else None,
+        "date_from": datetime.fromisoformat(date_from) if date_from else None,
+        "date_to": datetime.fromisoformat(date_to) if date_to else None,
+        "date_field": date_field,
+    }
+
+
+def iter_medical_files(file_status=None, date_from=None, date_to=None, date_field="progressed_at",
+                       chunk_size=EXPORT_CHUNK_SIZE):
+    query = MedicalFile.query.options(
+        *[joinedload(getattr(MedicalFile, section)) for section, _ in BACKGROUND_SECTIONS]
+    )
+
+    if file_status is not None:
+        query = query.filter(MedicalFile.file_status == file_status)
+    date_column = getattr(MedicalFile, date_field)
+    if date_from is not None:
+        query = query.filter(date_column >= date_from)
+    if date_to is not None:
+        query = query.filter(date_column < date_to)
+
+    return query.order_by(MedicalFile.id).yield_per(chunk_size)
+
+
+def _csv_fieldnames():
+    fieldnames = [column.key for column in MedicalFile.__table__.columns if column.key != "review_html"]
+    for section, model in BACKGROUND_SECTIONS:
+        fieldnames += [f"{section}.{column.key}" for column in model.__table__.columns]
+    return fieldnames
+
+
+def _flatten(record):
+    row = {}
+    for key, value in record.items():
+        if isinstance(value, dict):
+            row.update({f"{key}.{sub_key}": sub_value for sub_key, sub_value in value.items()})
+        else:
+            row[key] = value
+    return row
+
+
+def generate_ndjson(medical_files):
+    for medical_file in medical_files:
+        yield json.dumps(medical_file.serialize(), ensure_ascii=False) + "\n"
+
+
+def generate_csv(medical_files):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=_csv_fieldnames(), extrasaction="ignore")
+
+    writer.writeheader()
+    for medical_file in medical_files:
+        writer.writerow(_flatten(medical_file.serialize()))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    # Cabecera sola si no hubo filas
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def generate_export(fmt, medical_files):
+    return generate_ndjson(medical_files) if fmt == "ndjson" else generate_csv(medical_files)
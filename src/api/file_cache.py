@@ -0,0 +1,103 @@
+# Caché del documento JSON de GET /api/medical_file/<id> (modelo de lectura desnormalizado).
+#
+# La clave es (id, version): los handlers que modifican un expediente llaman a
+# `bump_file_version` antes del commit, así que un documento cacheado nunca queda
+# desactualizado, solo deja de usarse. La versión también es el ETag, de modo que el
+# navegador puede revalidar con If-None-Match y recibir un 304 sin cuerpo.
+#
+# Niveles: LRU en memoria del proceso (MEDICAL_FILE_CACHE_SIZE entradas) y, si se define
+# REDIS_URL y está instalado `redis`, Redis compartido entre workers
+# (MEDICAL_FILE_CACHE_TTL segundos).
+
+import os
+from collections import OrderedDict
+from threading import Lock
+
+try:
+    import redis
+except ImportError:  # Dependencia opcional
+    redis = None
+
+
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+class RedisCache:
+    def __init__(self, url, ttl):
+        self._client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def get(self, key):
+        value = self._client.get(key)
+        return value.decode("utf-8") if value is not None else None
+
+    def set(self, key, value):
+        self._client.set(key, value, ex=self.ttl)
+
+
+class MedicalFileCache:
+    def __init__(self, local, shared=None):
+        self.local = local
+        self.shared = shared
+
+    @staticmethod
+    def key(file_id, version):
+        return f"medical_file:{file_id}:v{version}"
+
+    def get(self, file_id, version):
+        key = self.key(file_id, version)
+        document = self.local.get(key)
+        if document is None and self.shared is not None:
+            document = self.shared.get(key)
+            if document is not None:
+                self.local.set(key, document)
+        return document
+
+    def set(self, file_id, version, document):
+        key = self.key(file_id, version)
+        self.local.set(key, document)
+        if self.shared is not None:
+            self.shared.set(key, document)
+
+
+def _create_medical_file_cache():
+    local = LRUCache(int(os.getenv("MEDICAL_FILE_CACHE_SIZE", 1024)))
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url and redis is not None:
+        return MedicalFileCache(local, RedisCache(redis_url, int(os.getenv("MEDICAL_FILE_CACHE_TTL", 86400))))
+    return MedicalFileCache(local)
+
+
+medical_file_cache = _create_medical_file_cache()
+
+
+def medical_file_etag(file_id, version):
+    return f"mf{file_id}-v{version}"
+
+
+def bump_file_version(medical_file):
+    """Invalida el documento cacheado del expediente (se llama antes del commit)."""
+    # version es el version_id_col de MedicalFile: el UPDATE va condicionado a la versión
+    # leída, así que dos escrituras concurrentes no terminan con la misma versión (la
+    # segunda falla con 409, ver api/file_states.py). Un expediente nuevo empieza en la 1.
+    if medical_file.id is None:
+        return
+    medical_file.version = medical_file.version + 1
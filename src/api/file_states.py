@@ -0,0 +1,100 @@
+# Máquina de estados del expediente (FileStatus) con control de concurrencia optimista.
+#
+# MedicalFile.version es el version_id_col del mapper: todo UPDATE del ORM sobre el
+# expediente lleva "WHERE id = ? AND version = <versión leída>" y, si otro worker lo cambió
+# entretanto, SQLAlchemy lanza StaleDataError en el flush. Los cambios de estado van
+# además por `transition_file`, que ejecuta el UPDATE condicionado al estado esperado
+# ("WHERE file_status = <esperado> AND version = <leída>") en el momento de la transición,
+# antes de que el handler haga más trabajo. En ambos casos se responde 409 con el estado
+# actual, sin bloquear filas ni tablas.
+
+from sqlalchemy import select, update
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.exc import StaleDataError
+
+from api.audit import record_transition
+from api.dashboard_stats import counter_state, record_counter_changes
+from api.models import db, MedicalFile, FileStatus
+from api.utils import APIException
+
+# Transiciones permitidas desde cada estado
+FILE_TRANSITIONS = {
+    # El estudiante acepta la solicitud del paciente
+    FileStatus.empty: {FileStatus.progress},
+    # El estudiante envía el expediente a revisión
+    FileStatus.progress: {FileStatus.review},
+    # El profesional aprueba o lo regresa a progreso
+    FileStatus.review: {FileStatus.approved, FileStatus.progress},
+    FileStatus.approved: {FileStatus.confirmed},
+    FileStatus.confirmed: set(),
+}
+
+
+class FileStateConflict(APIException):
+    status_code = 409
+
+    def __init__(self, medical_file_id, file_status, version, message=None):
+        message = message or "El expediente fue modificado por otra operación"
+        super().__init__(message, payload={
+            "error": message,
+            "medical_file_id": medical_file_id,
+            "file_status": file_status.value if file_status else None,
+            "version": version,
+        })
+
+
+def current_file_state(medical_file_id):
+    return db.session.execute(
+        select(MedicalFile.file_status, MedicalFile.version).where(MedicalFile.id == medical_file_id)
+    ).first() or (None, None)
+
+
+def transition_file(medical_file, target, actor_id=None, comment=None, **values):
+    """
+    Cambia el estado del expediente a `target` (y asigna `values`) con un UPDATE
+    condicionado al estado y la versión leídos. Lanza FileStateConflict (409) si la
+    transición no está permitida o si otro proceso cambió el expediente. La transición
+    queda en la bitácora (api/audit.py) con `actor_id` y `comment`.
+    """
+    expected, version = medical_file.file_status, medical_file.version
+    if target not in FILE_TRANSITIONS[expected]:
+        raise FileStateConflict(
+            medical_file.id, expected, version,
+            f"No se puede pasar el expediente de {expected.value} a {target.value}")
+
+    values = {"file_status": target, **values}
+    medical_file_id = medical_file.id
+    before = counter_state(medical_file)
+    try:
+        # El autoflush de cambios previos del handler también puede chocar con la versión
+        updated = db.session.execute(
+            update(MedicalFile).where(
+                MedicalFile.id == medical_file_id,
+                MedicalFile.file_status == expected,
+                MedicalFile.version == version,
+            ).values(version=version + 1, **values),
+            execution_options={"synchronize_session": False},
+        ).rowcount
+    except StaleDataError:
+        updated = 0
+    if not updated:
+        db.session.rollback()
+        raise FileStateConflict(medical_file_id, *current_file_state(medical_file_id))
+
+    # El objeto en sesión queda igual que la fila (la versión nueva es la que se espera
+    # en los siguientes UPDATE del ORM)
+    for key, value in {**values, "version": version + 1}.items():
+        set_committed_value(medical_file, key, value)
+    # El UPDATE no pasa por el flush del ORM: los conteos del dashboard se registran aquí
+    record_counter_changes(MedicalFile, before, counter_state(medical_file))
+    record_transition(medical_file_id, expected, target, actor_id, comment)
+
+
+def commit_file(medical_file):
+    """Commit que traduce un conflicto de versión del flush a FileStateConflict (409)."""
+    medical_file_id = medical_file.id
+    try:
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        raise FileStateConflict(medical_file_id, *current_file_state(medical_file_id))
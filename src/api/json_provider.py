@@ -0,0 +1,106 @@
+# Serialización JSON de las respuestas (app.json) y compresión de las respuestas de la API.
+#
+# JSON_PROVIDER elige el proveedor: "orjson" (por defecto si está instalado) o "stdlib".
+# Ambos serializan datetime/date en ISO 8601 y los Enum por su valor, así que los handlers
+# pueden devolver las columnas tal cual sin `.isoformat()` ni `.value`.
+#
+# `compress_response` se registra como after_request del blueprint: comprime con brotli
+# (si está instalado el paquete opcional `brotli`) o gzip según Accept-Encoding las
+# respuestas de al menos API_COMPRESS_MIN_SIZE bytes. Las que ya vienen codificadas o en
+# streaming (export) se dejan igual.
+
+import enum
+import gzip
+import os
+from datetime import date, datetime
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Dependencia opcional
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Dependencia opcional
+    brotli = None
+
+COMPRESS_MIN_SIZE = int(os.getenv("API_COMPRESS_MIN_SIZE", 1024))
+GZIP_LEVEL = int(os.getenv("API_GZIP_LEVEL", 6))
+# Calidades altas de brotli son para contenido estático; 4-5 conviene para respuestas dinámicas
+BROTLI_QUALITY = int(os.getenv("API_BROTLI_QUALITY", 4))
+COMPRESSIBLE_MIMETYPES = ("application/json", "text/html", "text/csv", "text/plain")
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    @staticmethod
+    def default(o):
+        if isinstance(o, (datetime, date)):
+            return o.isoformat()
+        if isinstance(o, enum.Enum):
+            return o.value
+        return DefaultJSONProvider.default(o)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """datetime, date, Enum, UUID y dataclasses los serializa orjson de forma nativa."""
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=DefaultJSONProvider.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+JSON_PROVIDERS = {"stdlib": StdlibJSONProvider}
+if orjson is not None:
+    JSON_PROVIDERS["orjson"] = OrjsonProvider
+
+
+def json_provider_class(name=None):
+    name = name or os.getenv("JSON_PROVIDER") or ("orjson" if orjson is not None else "stdlib")
+    if name not in JSON_PROVIDERS:
+        raise RuntimeError(f"JSON_PROVIDER={name} no disponible (opciones: {', '.join(JSON_PROVIDERS)})")
+    return JSON_PROVIDERS[name]
+
+
+def _choose_encoding(accept_encodings):
+    if brotli is not None and accept_encodings["br"]:
+        return "br"
+    if accept_encodings["gzip"]:
+        return "gzip"
+    return None
+
+
+def compress_body(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def compress_response(response, request):
+    if (response.direct_passthrough or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or not 200 <= response.status_code < 300):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = _choose_encoding(request.accept_encodings)
+    body = response.get_data()
+    if encoding is None or len(body) < COMPRESS_MIN_SIZE:
+        return response
+
+    response.set_data(compress_body(body, encoding))
+    response.headers["Content-Encoding"] = encoding
+    # Otra representación del mismo recurso: el ETag pasa a ser débil (como hace nginx)
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
@@ -91,6 +91,10 @@ class FamilyBackgroundLine(PyEnum):
 
 class User(db.Model):
     __tablename__ = "users"
+    __table_args__ = (
+        # Filtros por rol / estado (panel de administración, listados por rol)
+        db.Index("ix_users_role_status", "role", "status"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     first_name: Mapped[str] = mapped_column(String(100), nullable=False)
@@ -104,6 +108,8 @@ class User(db.Model):
     role: Mapped[UserRole] = mapped_column(Enum(UserRole), nullable=False)
     status: Mapped[UserStatus] = mapped_column(
         Enum(UserStatus), nullable=False, default=UserStatus.pre_approved)
+    # Se incrementa al cambiar status o rol: invalida los JWT emitidos antes (api/auth.py)
+    token_version: Mapped[int] = mapped_column(nullable=False, default=0, server_default="0")
 
     professional_student_data: Mapped["ProfessionalStudentData"] = relationship(
         "ProfessionalStudentData", back_populates="user", uselist=False, cascade="all, delete-orphan", foreign_keys="[ProfessionalStudentData.user_id]"
@@ -128,6 +134,19 @@ class User(db.Model):
             "professional_student_data": self.professional_student_data.serialize() if self.professional_student_data else None
         }
 
+    # Versión ligera para listados: solo columnas propias, sin relaciones
+    def serialize_summary(self):
+        return {
+            "id": self.id,
+            "first_name": self.first_name,
+            "second_name": self.second_name,
+            "first_surname": self.first_surname,
+            "second_surname": self.second_surname,
+            "email": self.email,
+            "role": self.role.value,
+            "status": self.status.value
+        }
+
     def __repr__(self):
         return f"<User {self.id} - {self.email} .>"
 
@@ -149,7 +168,7 @@ class ProfessionalStudentData(db.Model):
 
     # -------- VALIDACIÓN DEL ADMIN AL PROFESSIONAL --------
     validated_by_id: Mapped[int] = mapped_column(ForeignKey(
-        "users.id"), nullable=True)  # Admin que valida al Professional
+        "users.id"), nullable=True, index=True)  # Admin que valida al Professional
     validated_at: Mapped[datetime] = mapped_column(
         DateTime, nullable=True)               # Fecha validación Professional
 
@@ -160,7 +179,7 @@ class ProfessionalStudentData(db.Model):
 
     # -------- VALIDACIÓN DEL PROFESSIONAL AL STUDENT --------
     requested_professional_id: Mapped[int] = mapped_column(ForeignKey(
-        "users.id"), nullable=True)  # Professional al que el Student le pide validación
+        "users.id"), nullable=True, index=True)  # Professional al que el Student le pide validación
     requested_at: Mapped[datetime] = mapped_column(
         DateTime, nullable=True)                        # Cuándo solicitó
 
@@ -225,17 +244,21 @@ class ProfessionalStudentData(db.Model):
 
 class MedicalFile(db.Model):
     __tablename__ = "medical_file"
+    __table_args__ = (
+        # Listado de expedientes en revisión ordenados por fecha
+        db.Index("ix_medical_file_file_status_reviewed_at", "file_status", "reviewed_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     user = relationship("User", back_populates="medical_file", foreign_keys=[user_id])
 
     file_status = db.Column(Enum(FileStatus), default=FileStatus.empty, nullable=False)
-    selected_student_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    selected_student_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
     selected_student = relationship("User", foreign_keys=[selected_student_id])
 
     # ---------- Solicitud del paciente hacia un estudiante ----------
-    patient_requested_student_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    patient_requested_student_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True, index=True)
     patient_requested_student_at = db.Column(db.DateTime, nullable=True)
     patient_requested_student = relationship("User", foreign_keys=[patient_requested_student_id])
 
@@ -269,6 +292,19 @@ class MedicalFile(db.Model):
     
     review_html = db.Column(db.Text, nullable=True)
 
+    # ---------- Cola de revisión (api/review_queue.py) ----------
+    # Profesional que tomó el expediente para revisarlo; el reclamo vence en lease_expires_at
+    claimed_by_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True, index=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)
+
+    # Versión del documento del expediente: se incrementa en cada cambio de contenido o estado
+    # y forma la clave de caché / ETag de GET /api/medical_file/<id>
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    # Control de concurrencia optimista: los UPDATE del ORM llevan "AND version = <leída>"
+    # (StaleDataError si no coincide). La versión la incrementa bump_file_version / transition_file.
+    __mapper_args__ = {"version_id_col": version, "version_id_generator": False}
+
     # ---------- Relaciones de usuarios para cada estado ----------
     progressed_by = relationship("User", foreign_keys=[progressed_by_id])
     reviewed_by = relationship("User", foreign_keys=[reviewed_by_id])
@@ -320,7 +356,7 @@ class NonPathologicalBackground(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     medical_file_id = db.Column(db.Integer, db.ForeignKey(
-        'medical_file.id'), nullable=False)
+        'medical_file.id'), nullable=False, unique=True)
     medical_file = relationship(
         "MedicalFile", back_populates="non_pathological_background")
 
@@ -437,7 +473,7 @@ class PathologicalBackground(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     medical_file_id = db.Column(db.Integer, db.ForeignKey(
-        'medical_file.id'), nullable=False)
+        'medical_file.id'), nullable=False, unique=True)
     medical_file = relationship(
         "MedicalFile", back_populates="pathological_background")
 
@@ -478,12 +514,24 @@ class PathologicalBackground(db.Model):
 # -------------------- MODELO: FamilyBackground --------------------
 
 
+FAMILY_BACKGROUND_FLAGS = ("hypertension", "diabetes", "cancer", "mental_illnesses", "congenital_diseases",
+                           "heart_diseases", "liver_diseases", "kidney_diseases")
+
+
 class FamilyBackground(db.Model):
     __tablename__ = "family_background"
+    # Un índice parcial por bandera (solo las filas en true) para las consultas de cohortes
+    # (api/cohorts.py): pequeños y combinables con BitmapAnd. El predicado es el mismo texto
+    # que SQLAlchemy genera para la columna sola ("flag" en PostgreSQL, "flag = 1" en SQLite)
+    __table_args__ = tuple(
+        db.Index(f"ix_family_background_{flag}", "medical_file_id",
+                 postgresql_where=db.text(flag), sqlite_where=db.text(f"{flag} = 1"))
+        for flag in FAMILY_BACKGROUND_FLAGS
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     medical_file_id = db.Column(db.Integer, db.ForeignKey(
-        'medical_file.id'), nullable=False)
+        'medical_file.id'), nullable=False, unique=True)
     medical_file = relationship(
         "MedicalFile", back_populates="family_background")
 
@@ -520,7 +568,7 @@ class GynecologicalBackground(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     medical_file_id = db.Column(db.Integer, db.ForeignKey(
-        'medical_file.id'), nullable=False)
+        'medical_file.id'), nullable=False, unique=True)
     medical_file = relationship(
         "MedicalFile", back_populates="gynecological_background")
 
@@ -544,3 +592,109 @@ class GynecologicalBackground(db.Model):
             "contraceptive_methods": self.contraceptive_methods,
             "other_gynecological_info": self.other_gynecological_info
         }
+
+
+# -------------------- MODELO: SnapshotFragment --------------------
+# HTML ya renderizado de cada sección del snapshot de un expediente (ver api/snapshots.py).
+# content_hash identifica los datos (y la plantilla) con que se renderizó: si no cambian,
+# la sección no se vuelve a renderizar.
+class SnapshotFragment(db.Model):
+    __tablename__ = "snapshot_fragment"
+    __table_args__ = (
+        db.UniqueConstraint("medical_file_id", "section", name="uq_snapshot_fragment_medical_file_id_section"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    medical_file_id = db.Column(db.Integer, db.ForeignKey("medical_file.id"), nullable=False)
+    section = db.Column(db.String(40), nullable=False)
+    content_hash = db.Column(db.String(64), nullable=False)
+    html = db.Column(db.Text, nullable=False)
+    rendered_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+# -------------------- MODELO: MedicalFileSnapshot --------------------
+# Historial de snapshots enviados a revisión. Cada versión guarda el documento completo
+# comprimido (checkpoint) o solo un delta comprimido contra la versión anterior; para
+# reconstruir una versión basta el checkpoint previo más los deltas hasta ella.
+class MedicalFileSnapshot(db.Model):
+    __tablename__ = "medical_file_snapshot"
+    __table_args__ = (
+        db.UniqueConstraint("medical_file_id", "version", name="uq_medical_file_snapshot_medical_file_id_version"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    medical_file_id = db.Column(db.Integer, db.ForeignKey("medical_file.id"), nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    is_checkpoint = db.Column(db.Boolean, nullable=False, default=False)
+    payload = db.Column(db.LargeBinary, nullable=False)
+    content_hash = db.Column(db.String(64), nullable=False)
+    content_length = db.Column(db.Integer, nullable=False)
+    created_by_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def serialize(self):
+        return {
+            "version": self.version,
+            "is_checkpoint": self.is_checkpoint,
+            "content_length": self.content_length,
+            "stored_bytes": len(self.payload),
+            "created_by_id": self.created_by_id,
+            "created_at": serialize_datetime(self.created_at),
+        }
+
+
+# -------------------- MODELO: DashboardCounter --------------------
+# Conteos de los dashboards mantenidos en la misma transacción que los cambios
+# (ver api/dashboard_stats.py). owner_id 0 son los globales; si no, el usuario dueño del
+# conteo. Los globales se reparten en varios `shard` para que escrituras concurrentes no
+# esperen todas por la misma fila; el valor es la suma de sus shards.
+class DashboardCounter(db.Model):
+    __tablename__ = "dashboard_counter"
+    __table_args__ = (
+        db.UniqueConstraint("owner_id", "metric", "shard", name="uq_dashboard_counter_owner_id_metric_shard"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    owner_id = db.Column(db.Integer, nullable=False, default=0)
+    metric = db.Column(db.String(60), nullable=False)
+    shard = db.Column(db.Integer, nullable=False, default=0)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+
+# -------------------- MODELO: FileTransition --------------------
+# Bitácora de solo inserción de los cambios de estado del expediente (ver api/audit.py):
+# quién, de qué estado a cuál, el comentario y cuándo. Sin llaves foráneas: el historial se
+# conserva aunque se borre el expediente o el usuario. En PostgreSQL la tabla está
+# particionada por mes de created_at (la llave primaria es (id, created_at)).
+class FileTransition(db.Model):
+    __tablename__ = "file_transition"
+    __table_args__ = (
+        db.Index("ix_file_transition_medical_file_id_id", "medical_file_id", "id"),
+    )
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
+    medical_file_id = db.Column(db.Integer, nullable=False)
+    actor_id = db.Column(db.Integer, nullable=True)
+    from_status = db.Column(Enum(FileStatus), nullable=False)
+    to_status = db.Column(Enum(FileStatus), nullable=False)
+    comment = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "actor_id": self.actor_id,
+            "from_status": self.from_status.value,
+            "to_status": self.to_status.value,
+            "comment": self.comment,
+            "created_at": serialize_datetime(self.created_at),
+        }
+
+
+# Secciones de antecedentes de un expediente: (relación en MedicalFile, modelo)
+BACKGROUND_SECTIONS = (
+    ("non_pathological_background", NonPathologicalBackground),
+    ("pathological_background", PathologicalBackground),
+    ("family_background", FamilyBackground),
+    ("gynecological_background", GynecologicalBackground),
+)
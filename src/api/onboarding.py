@@ -0,0 +1,223 @@
+# Alta masiva de usuarios (p. ej. pacientes de una clínica desde una hoja de cálculo).
+#
+# 1. Se validan todas las filas antes de escribir nada (campos requeridos, longitudes,
+#    rol, fecha, grado académico, emails repetidos en el archivo o ya registrados).
+# 2. Las contraseñas de las filas válidas se hashean en paralelo en el pool de procesos.
+# 3. Users, ProfessionalStudentData y MedicalFile se insertan con INSERT por lotes
+#    (executemany / INSERT ... RETURNING) dentro de una sola transacción.
+#
+# Por defecto, si alguna fila es inválida no se inserta ninguna; con `partial=True` se
+# insertan las válidas. En ambos casos se devuelven los errores por fila.
+# Lo usan POST /api/admin/users/bulk y el comando `flask bulk-register-users`.
+#
+# El hash de cada contraseña cuesta del orden de 100 ms de CPU, así que el endpoint no
+# inserta todo en una transacción: `iter_register_chunks` hace commit cada
+# BULK_REGISTER_CHUNK_SIZE filas y el endpoint responde una línea NDJSON por lote, con lo
+# que el proxy ve tráfico mientras el pool de hashes avanza. Si un lote falla (p. ej. un
+# email registrado entre la validación y el INSERT) los anteriores quedan guardados.
+
+import csv
+import io
+import json
+import os
+from datetime import date
+
+from sqlalchemy import insert, select
+
+from api.dashboard_stats import record_counter
+from api.models import db, User, UserRole, UserStatus, ProfessionalStudentData, MedicalFile, FileStatus, AcademicGrade
+from api.passwords import hash_passwords
+
+BULK_REGISTER_MAX_ROWS = 10000
+BULK_REGISTER_HTTP_MAX_ROWS = int(os.getenv("BULK_REGISTER_HTTP_MAX_ROWS", 5000))
+BULK_REGISTER_CHUNK_SIZE = int(os.getenv("BULK_REGISTER_CHUNK_SIZE", 50))
+EMAIL_LOOKUP_CHUNK = 1000
+
+REQUIRED_FIELDS = ("first_name", "first_surname", "birth_day", "role", "email", "password")
+ACADEMIC_FIELDS = ("institution", "career", "academic_grade", "register_number")
+OPTIONAL_FIELDS = ("second_name", "second_surname", "phone")
+MAX_LENGTHS = {
+    "first_name": 100, "second_name": 100, "first_surname": 100, "second_surname": 100,
+    "phone": 20, "email": 30, "institution": 100, "career": 100, "register_number": 30,
+}
+
+
+def parse_users_file(content, fmt):
+    """Lee una lista de usuarios desde texto CSV (con cabecera) o JSON."""
+    if fmt == "csv":
+        return list(csv.DictReader(io.StringIO(content)))
+
+    data = json.loads(content)
+    if isinstance(data, dict):
+        data = data.get("users")
+    if not isinstance(data, list):
+        raise ValueError("Se esperaba una lista de usuarios")
+    return data
+
+
+def _clean(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def validate_user_row(raw):
+    """Devuelve (fila normalizada, errores por campo)."""
+    if not isinstance(raw, dict):
+        return None, {"_": "la fila debe ser un objeto"}
+
+    row = {field: _clean(raw.get(field)) for field in REQUIRED_FIELDS + OPTIONAL_FIELDS + ACADEMIC_FIELDS}
+    # La contraseña se respeta tal cual (puede tener espacios)
+    row["password"] = raw.get("password") or None
+    errors = {}
+
+    for field in REQUIRED_FIELDS:
+        if not row[field]:
+            errors[field] = "requerido"
+
+    for field, max_length in MAX_LENGTHS.items():
+        if row[field] and len(row[field]) > max_length:
+            errors[field] = f"no puede superar {max_length} caracteres"
+
+    if row["role"]:
+        try:
+            row["role"] = UserRole(row["role"])
+        except ValueError:
+            errors["role"] = f"debe ser uno de: {', '.join(role.value for role in UserRole)}"
+
+    if row["birth_day"]:
+        try:
+            row["birth_day"] = date.fromisoformat(row["birth_day"])
+        except ValueError:
+            errors["birth_day"] = "fecha inválida (AAAA-MM-DD)"
+
+    if row["role"] in (UserRole.student, UserRole.professional):
+        for field in ACADEMIC_FIELDS:
+            if not row[field]:
+                errors[field] = "requerido para student/professional"
+        if row["academic_grade"]:
+            try:
+                row["academic_grade"] = AcademicGrade(row["academic_grade"])
+            except ValueError:
+                errors["academic_grade"] = "grado académico no válido"
+
+    return row, errors
+
+
+def _registered_emails(emails):
+    registered = set()
+    for start in range(0, len(emails), EMAIL_LOOKUP_CHUNK):
+        chunk = emails[start:start + EMAIL_LOOKUP_CHUNK]
+        registered.update(db.session.scalars(select(User.email).where(User.email.in_(chunk))))
+    return registered
+
+
+def validate_users(raw_rows):
+    """Valida todas las filas; devuelve (filas válidas, errores [{row, email, errors}])."""
+    validated = [validate_user_row(raw) for raw in raw_rows]
+
+    emails = [row["email"] for row, _ in validated if row and row["email"]]
+    registered = _registered_emails(emails)
+    seen = set()
+
+    valid_rows, row_errors = [], []
+    for index, (row, errors) in enumerate(validated, start=1):
+        email = row["email"] if row else None
+        if email:
+            if email in registered:
+                errors["email"] = "ya está registrado"
+            elif email in seen:
+                errors["email"] = "repetido en el archivo"
+            seen.add(email)
+
+        if errors:
+            row_errors.append({"row": index, "email": email, "errors": errors})
+        else:
+            valid_rows.append(row)
+    return valid_rows, row_errors
+
+
+def insert_users(rows):
+    """Inserta usuarios ya validados con sus datos académicos / expediente (sin commit)."""
+    passwords = hash_passwords([row["password"] for row in rows])
+
+    # El email es único: se usa para asociar cada id devuelto con su fila sin depender
+    # del orden de RETURNING (así el INSERT se hace por lotes en cualquier motor)
+    inserted = db.session.execute(
+        insert(User).returning(User.id, User.email),
+        [{
+            "first_name": row["first_name"],
+            "second_name": row["second_name"],
+            "first_surname": row["first_surname"],
+            "second_surname": row["second_surname"],
+            "birth_day": row["birth_day"],
+            "phone": row["phone"],
+            "email": row["email"],
+            "password": password,
+            "role": row["role"],
+        } for row, password in zip(rows, passwords)]
+    ).all()
+    ids_by_email = {email: user_id for user_id, email in inserted}
+    user_ids = [ids_by_email[row["email"]] for row in rows]
+
+    academic_rows = [{
+        "user_id": user_id,
+        "institution": row["institution"],
+        "career": row["career"],
+        "academic_grade": row["academic_grade"],
+        "register_number": row["register_number"],
+    } for row, user_id in zip(rows, user_ids) if row["role"] in (UserRole.student, UserRole.professional)]
+    if academic_rows:
+        db.session.execute(insert(ProfessionalStudentData), academic_rows)
+
+    medical_file_rows = [
+        {"user_id": user_id, "file_status": FileStatus.empty}
+        for row, user_id in zip(rows, user_ids) if row["role"] == UserRole.patient
+    ]
+    if medical_file_rows:
+        db.session.execute(insert(MedicalFile), medical_file_rows)
+
+    # Inserts sin ORM: los conteos del dashboard se registran a mano
+    for row in rows:
+        record_counter(f"users.{row['role'].value}.{UserStatus.pre_approved.value}")
+    if medical_file_rows:
+        record_counter(f"files.{FileStatus.empty.value}", len(medical_file_rows))
+
+    return user_ids
+
+
+def iter_register_chunks(rows, chunk_size=None):
+    """Inserta filas ya validadas con un commit por lote; produce el total creado tras cada uno."""
+    chunk_size = chunk_size or BULK_REGISTER_CHUNK_SIZE
+    created = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        try:
+            insert_users(chunk)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        created += len(chunk)
+        yield created
+
+
+def register_users(raw_rows, partial=False, max_rows=BULK_REGISTER_MAX_ROWS):
+    """Valida y registra una lista de usuarios en una sola transacción."""
+    if len(raw_rows) > max_rows:
+        raise ValueError(f"Máximo {max_rows} usuarios por carga")
+
+    valid_rows, row_errors = validate_users(raw_rows)
+    if row_errors and not partial:
+        return {"created": 0, "errors": row_errors}
+
+    created = 0
+    if valid_rows:
+        try:
+            created = len(insert_users(valid_rows))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    return {"created": created, "errors": row_errors}
@@ -0,0 +1,145 @@
+# Hash y verificación de contraseñas fuera del hilo del request.
+#
+# El hash es CPU puro; se ejecuta en un pool de procesos acotado para que una ráfaga de
+# registros/logins no sature los workers web. Si ya hay PASSWORD_HASH_MAX_PENDING
+# operaciones en curso o en cola, se responde 503 en lugar de dejar el request esperando.
+#
+# Variables de entorno:
+#   PASSWORD_HASH_METHOD       método de werkzeug, p. ej. "scrypt" o "pbkdf2:sha256:600000"
+#   PASSWORD_HASH_WORKERS      procesos del pool (0 = calcular en el mismo hilo)
+#   PASSWORD_HASH_MAX_PENDING  operaciones simultáneas admitidas (en curso + en cola)
+#   PASSWORD_HASH_QUEUE_TIMEOUT  segundos que se espera un hueco antes del 503
+#
+# Los hashes en bloque (`hash_passwords`) se mandan al pool de uno en uno; cada uno ocupa
+# un hueco y nunca hay más de PASSWORD_HASH_WORKERS en vuelo, así que un alta masiva no
+# acapara los huecos y los logins/registros se intercalan entre sus hashes.
+#
+# Al cambiar PASSWORD_HASH_METHOD los hashes existentes siguen siendo válidos y se
+# recalculan con el método nuevo en el siguiente login correcto (`needs_rehash`).
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
+from threading import BoundedSemaphore, Lock
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from api.utils import APIException
+
+
+class PasswordHasherBusy(APIException):
+    status_code = 503
+
+    def __init__(self):
+        super().__init__("Servidor ocupado, intenta de nuevo en unos segundos")
+
+
+class WerkzeugPasswordHasher:
+    """Hasher basado en werkzeug.security con un método configurable."""
+
+    def __init__(self, method):
+        self.method = method
+
+    @cached_property
+    def prefix(self):
+        # Prefijo que werkzeug guarda con cada hash (método y parámetros normalizados)
+        return generate_password_hash("", method=self.method).split("$", 1)[0]
+
+    def hash(self, password):
+        return generate_password_hash(password, method=self.method)
+
+    def verify(self, stored_hash, password):
+        return check_password_hash(stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        return stored_hash.split("$", 1)[0] != self.prefix
+
+
+class PasswordExecutor:
+    """Ejecuta las funciones del hasher en un pool de procesos con cola acotada."""
+
+    def __init__(self, workers, max_pending, queue_timeout):
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._slots = BoundedSemaphore(max_pending)
+        self._pool = None
+        self._pool_pid = None
+        self._lock = Lock()
+
+    def _get_pool(self):
+        # Un pool por proceso: los workers de gunicorn lo crean después del fork
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise PasswordHasherBusy()
+        try:
+            if not self.workers:
+                return fn(*args)
+            return self._get_pool().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def map(self, fn, items):
+        """
+        Aplica fn a muchos valores. Cada valor es una tarea que ocupa un hueco y hay a lo más
+        `workers` en vuelo, así que un request interactivo espera como mucho un hash del lote
+        y el resto de los huecos le queda libre. Espera su turno en lugar de responder 503:
+        es trabajo en lote, no un request del usuario.
+        """
+        if not self.workers:
+            results = []
+            for item in items:
+                with self._slots:
+                    results.append(fn(item))
+            return results
+
+        results, in_flight = [], deque()
+        try:
+            for item in items:
+                if len(in_flight) >= self.workers:
+                    results.append(in_flight.popleft().result())
+                self._slots.acquire()
+                try:
+                    future = self._get_pool().submit(fn, item)
+                except BaseException:
+                    self._slots.release()
+                    raise
+                future.add_done_callback(lambda _: self._slots.release())
+                in_flight.append(future)
+            while in_flight:
+                results.append(in_flight.popleft().result())
+        finally:
+            for future in in_flight:
+                future.cancel()
+        return results
+
+password_hasher = WerkzeugPasswordHasher(os.getenv("PASSWORD_HASH_METHOD", "scrypt"))
+
+_workers = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+password_executor = PasswordExecutor(
+    workers=_workers,
+    max_pending=int(os.getenv("PASSWORD_HASH_MAX_PENDING", max(_workers, 1) * 4)),
+    queue_timeout=float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", 0.5))
+)
+
+
+def hash_password(password):
+    return password_executor.run(password_hasher.hash, password)
+
+
+def hash_passwords(passwords):
+    return password_executor.map(password_hasher.hash, passwords)
+
+
+def verify_password(stored_hash, password):
+    return password_executor.run(password_hasher.verify, stored_hash, password)
+
+
+def needs_rehash(stored_hash):
+    return password_hasher.needs_rehash(stored_hash)
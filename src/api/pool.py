@@ -0,0 +1,122 @@
+# Configuración e instrumentación del pool de conexiones de SQLAlchemy.
+#
+# Cada worker de gunicorn es un proceso con su propio pool, así que las conexiones
+# totales a Postgres son workers x (pool_size + max_overflow). Si se define
+# DB_MAX_CONNECTIONS (presupuesto total para la app), el pool de cada worker se
+# dimensiona dividiéndolo entre WEB_CONCURRENCY workers; si no, se usan
+# DB_POOL_SIZE / DB_MAX_OVERFLOW directamente.
+#
+# Variables de entorno:
+#   DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT (s), DB_POOL_RECYCLE (s),
+#   DB_POOL_PRE_PING (1/0), DB_MAX_CONNECTIONS, WEB_CONCURRENCY
+
+import os
+import time
+from threading import Lock
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+DEFAULT_POOL_SIZE = 5
+DEFAULT_MAX_OVERFLOW = 10
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+class PoolStats:
+    """Contadores de espera al obtener conexiones del pool (por proceso)."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, waited, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms_total": round(self.wait_total * 1000, 3),
+                "wait_ms_avg": round(self.wait_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_ms_max": round(self.wait_max * 1000, 3),
+            }
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mide cuánto tarda cada checkout (espera + conexión nueva si hace falta)."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_stats.record(time.perf_counter() - start)
+        return connection
+
+
+def pool_sizing():
+    """Tamaño del pool de este worker según el entorno: (pool_size, max_overflow)."""
+    max_connections = _env_int("DB_MAX_CONNECTIONS", None)
+    if max_connections:
+        workers = max(1, _env_int("WEB_CONCURRENCY", 1))
+        per_worker = max(1, max_connections // workers)
+        # Con presupuesto fijo no se permite overflow: el total nunca lo supera
+        pool_size = min(_env_int("DB_POOL_SIZE", per_worker), per_worker)
+        return pool_size, 0
+
+    return _env_int("DB_POOL_SIZE", DEFAULT_POOL_SIZE), _env_int("DB_MAX_OVERFLOW", DEFAULT_MAX_OVERFLOW)
+
+
+def engine_options(database_url):
+    """Opciones para SQLALCHEMY_ENGINE_OPTIONS; el pool solo se configura para Postgres."""
+    if not database_url.startswith("postgresql"):
+        return {}
+
+    pool_size, max_overflow = pool_sizing()
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": _env_int("DB_POOL_TIMEOUT", 30),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": _env_int("DB_POOL_PRE_PING", 1) == 1,
+    }
+
+
+def pool_metrics(engine):
+    pool = engine.pool
+    metrics = {
+        "pid": os.getpid(),
+        "pool_class": type(pool).__name__,
+        "status": pool.status(),
+    }
+    if isinstance(pool, QueuePool):
+        metrics.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+        })
+    metrics.update(pool_stats.to_dict())
+    return metrics
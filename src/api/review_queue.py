@@ -0,0 +1,163 @@
+# Cola de trabajo de expedientes en revisión para los profesionales.
+#
+# En lugar de que todos vean y tomen los mismos expedientes, cada profesional "reclama" el
+# siguiente: el más antiguo en review (por reviewed_at) que no esté reclamado o cuyo
+# reclamo ya venció. En PostgreSQL la fila se bloquea con SELECT ... FOR UPDATE SKIP
+# LOCKED, así que reclamos simultáneos toman expedientes distintos sin esperarse; en
+# cualquier motor el UPDATE es condicional y se reintenta si otro lo ganó.
+#
+# El reclamo dura REVIEW_LEASE_SECONDS; el profesional lo puede renovar mientras revisa.
+# Si abandona el expediente, al vencer vuelve a estar disponible para otro.
+
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, case, func, or_, select, update
+
+from api.events import emit_event
+from api.models import db, MedicalFile, FileStatus
+
+REVIEW_LEASE_SECONDS = int(os.getenv("REVIEW_LEASE_SECONDS", 900))
+CLAIM_ATTEMPTS = 5
+
+
+def _available(now):
+    return or_(MedicalFile.claimed_by_id.is_(None), MedicalFile.lease_expires_at < now)
+
+
+def _active_claim_of(professional_id, now):
+    return and_(MedicalFile.claimed_by_id == professional_id, MedicalFile.lease_expires_at >= now)
+
+
+def current_claim(professional_id):
+    now = datetime.utcnow()
+    return db.session.execute(
+        select(MedicalFile.id, MedicalFile.lease_expires_at).where(
+            MedicalFile.file_status == FileStatus.review,
+            _active_claim_of(professional_id, now),
+        ).order_by(MedicalFile.claimed_at).limit(1)
+    ).first()
+
+
+def claim_next_file(professional_id):
+    """
+    Asigna al profesional el expediente en revisión más antiguo disponible.
+    Si ya tiene uno reclamado y vigente, devuelve ese. Devuelve (id, lease_expires_at) o None.
+    Hace commit.
+    """
+    claim = current_claim(professional_id)
+    if claim is not None:
+        return claim
+
+    for _ in range(CLAIM_ATTEMPTS):
+        now = datetime.utcnow()
+        medical_file_id = db.session.execute(
+            select(MedicalFile.id).where(
+                MedicalFile.file_status == FileStatus.review,
+                _available(now),
+            ).order_by(MedicalFile.reviewed_at, MedicalFile.id).limit(1).with_for_update(skip_locked=True)
+        ).scalar()
+        if medical_file_id is None:
+            db.session.rollback()
+            return None
+
+        lease_expires_at = now + timedelta(seconds=REVIEW_LEASE_SECONDS)
+        claimed = db.session.execute(
+            update(MedicalFile).where(
+                MedicalFile.id == medical_file_id,
+                MedicalFile.file_status == FileStatus.review,
+                _available(now),
+            ).values(claimed_by_id=professional_id, claimed_at=now, lease_expires_at=lease_expires_at)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return medical_file_id, lease_expires_at
+    return None
+
+
+def renew_claim(medical_file_id, professional_id):
+    """Extiende el reclamo vigente del profesional; devuelve la nueva expiración o None. Hace commit."""
+    now = datetime.utcnow()
+    lease_expires_at = now + timedelta(seconds=REVIEW_LEASE_SECONDS)
+    renewed = db.session.execute(
+        update(MedicalFile).where(
+            MedicalFile.id == medical_file_id,
+            MedicalFile.file_status == FileStatus.review,
+            _active_claim_of(professional_id, now),
+        ).values(lease_expires_at=lease_expires_at)
+    ).rowcount
+    db.session.commit()
+    return lease_expires_at if renewed else None
+
+
+def release_claim(medical_file_id, professional_id):
+    """Devuelve el expediente a la cola y avisa a los profesionales. Hace commit."""
+    released = db.session.execute(
+        update(MedicalFile).where(
+            MedicalFile.id == medical_file_id,
+            MedicalFile.claimed_by_id == professional_id,
+        ).values(claimed_by_id=None, claimed_at=None, lease_expires_at=None)
+    ).rowcount
+    if released:
+        emit_event("role:professional", "file_review", {"medical_file_id": medical_file_id})
+    db.session.commit()
+    return bool(released)
+
+
+def is_claimed_by_other(medical_file, professional_id):
+    return (medical_file.claimed_by_id is not None
+            and medical_file.claimed_by_id != professional_id
+            and medical_file.lease_expires_at is not None
+            and medical_file.lease_expires_at >= datetime.utcnow())
+
+
+def clear_claim(medical_file):
+    medical_file.claimed_by_id = None
+    medical_file.claimed_at = None
+    medical_file.lease_expires_at = None
+
+
+def queue_stats(professional_id=None):
+    """
+    Estado global de la cola y, por profesional, reclamos vigentes y expedientes resueltos.
+    Con professional_id solo se incluye ese profesional.
+    """
+    now = datetime.utcnow()
+    in_review = MedicalFile.file_status == FileStatus.review
+
+    waiting, claimed, oldest_reviewed_at = db.session.execute(
+        select(
+            func.count(case((_available(now), 1))),
+            func.count(case((~_available(now), 1))),
+            func.min(case((_available(now), MedicalFile.reviewed_at))),
+        ).where(in_review)
+    ).one()
+
+    per_professional = {}
+
+    def entry(user_id):
+        return per_professional.setdefault(user_id, {"professional_id": user_id, "claimed": 0, "approved": 0, "rejected": 0})
+
+    claims_query = select(MedicalFile.claimed_by_id, func.count()).where(
+        in_review, MedicalFile.claimed_by_id.is_not(None), MedicalFile.lease_expires_at >= now)
+    approved_query = select(MedicalFile.approved_by_id, func.count()).where(MedicalFile.approved_by_id.is_not(None))
+    rejected_query = select(MedicalFile.no_approved_by_id, func.count()).where(MedicalFile.no_approved_by_id.is_not(None))
+    if professional_id is not None:
+        claims_query = claims_query.where(MedicalFile.claimed_by_id == professional_id)
+        approved_query = approved_query.where(MedicalFile.approved_by_id == professional_id)
+        rejected_query = rejected_query.where(MedicalFile.no_approved_by_id == professional_id)
+        entry(professional_id)
+
+    for key, query, column in (("claimed", claims_query, MedicalFile.claimed_by_id),
+                               ("approved", approved_query, MedicalFile.approved_by_id),
+                               ("rejected", rejected_query, MedicalFile.no_approved_by_id)):
+        for user_id, count in db.session.execute(query.group_by(column)):
+            entry(user_id)[key] = count
+
+    return {
+        "waiting": waiting,
+        "claimed": claimed,
+        "oldest_waiting_seconds": int((now - oldest_reviewed_at).total_seconds()) if oldest_reviewed_at else None,
+        "lease_seconds": REVIEW_LEASE_SECONDS,
+        "professionals": sorted(per_professional.values(), key=lambda item: item["professional_id"]),
+    }
@@ -2,29 +2,58 @@
 This module takes care of starting the API Server, Loading the DB and Adding the endpoints
 """
 import json
+import os
+import time
 
-from flask import Flask, request, jsonify, url_for, Blueprint
+from flask import Flask, request, jsonify, url_for, Blueprint, Response, stream_with_context, current_app
 from api.utils import generate_sitemap, APIException
+from api.auth import (create_user_token, get_current_user, invalidate_user, create_stream_token,
+                      load_stream_token, STREAM_TOKEN_MAX_AGE)
+from api.export import EXPORT_FORMATS, parse_export_filters, iter_medical_files, generate_export
+from api.pool import pool_metrics
+from api.passwords import hash_password, verify_password, needs_rehash, PasswordHasherBusy
+from api.file_cache import medical_file_cache, medical_file_etag, bump_file_version
+from api.file_states import transition_file, commit_file
+from api.validation import BACKGROUND_SCHEMAS
+from api.onboarding import parse_users_file, validate_users, iter_register_chunks, BULK_REGISTER_HTTP_MAX_ROWS
+from api.json_provider import compress_response
+from api.events import broker, emit_event, acquire_stream_slot, release_stream_slot
+from api.search import search_users, normalize_search_text
+from api.dashboard_stats import dashboard_counts
+from api.audit import file_timeline
+from api.cohorts import CohortQueryError, cohort_fields, count_cohort, cohort_ids
+from api.review_queue import claim_next_file, renew_claim, release_claim, is_claimed_by_other, clear_claim, queue_stats
+from api.snapshots import (
+    load_medical_file_for_snapshot, render_snapshot, snapshot_etag, compress_snapshot,
+    record_snapshot_version, get_snapshot_version, latest_snapshot_version, diff_snapshot_versions
+)
 from api.models import db, User, ProfessionalStudentData, MedicalFile, FileStatus, UserRole, UserStatus, GynecologicalBackground, NonPathologicalBackground, PathologicalBackground, FamilyBackground, MedicalFileSnapshot
 from flask_cors import CORS
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
-from flask_jwt_extended import create_access_token, get_jwt_identity, jwt_required
+from datetime import datetime
+from flask_jwt_extended import get_jwt_identity, jwt_required
 from functools import wraps
+from sqlalchemy import or_
+from sqlalchemy.orm import aliased, joinedload
 
 api = Blueprint('api', __name__)
 
 
+# Compresión gzip/brotli negociada para las respuestas de la API (ver api/json_provider.py)
+@api.after_request
+def compress_api_response(response):
+    return compress_response(response, request)
+
+
 # ---------------------------- Decoradores de roles ----------------------------
 
 
-def role_required(role_name):
+def role_required(*role_names):
     def decorator(fn):
         @wraps(fn)
         @jwt_required()
         def wrapper(*args, **kwargs):
-            current_user = User.query.get(get_jwt_identity())
-            if not current_user or current_user.role.value != role_name:
+            current_user = get_current_user()
+            if not current_user or current_user.role.value not in role_names:
                 raise APIException("Acceso no autorizado", status_code=403)
             return fn(*args, **kwargs)
         return wrapper
@@ -52,6 +81,9 @@ def register_user():
     if User.query.filter_by(email=data["email"]).first():
         return jsonify({"message": "El correo ya está registrado"}), 400
 
+    # Fuera del try: si el pool de hash está saturado se responde 503, no 500
+    password_hash = hash_password(data["password"])
+
     try:
         new_user = User(
             first_name=data["first_name"],
@@ -61,7 +93,7 @@ def register_user():
             birth_day=data["birth_day"],
             phone=data.get("phone"),
             email=data["email"],
-            password=generate_password_hash(data["password"]),
+            password=password_hash,
             role=data["role"]
         )
         db.session.add(new_user)
@@ -107,11 +139,19 @@ def login():
     password = data.get("password")
 
     user = User.query.filter_by(email=email).first()
-    if not user or not check_password_hash(user.password, password):
+    if not user or not verify_password(user.password, password):
         raise APIException("Credenciales inválidas", status_code=401)
 
-    access_token = create_access_token(identity=str(
-        user.id), expires_delta=timedelta(hours=1))
+    # Si cambió el método/costo de hash, se actualiza con la contraseña ya verificada.
+    # Es opcional: con el pool de hash saturado se deja para el siguiente login
+    if needs_rehash(user.password):
+        try:
+            user.password = hash_password(password)
+            db.session.commit()
+        except PasswordHasherBusy:
+            pass
+
+    access_token = create_user_token(user)
     return jsonify({"token": access_token, "user": user.serialize()}), 200
 
 # 03 EPT para ruta privada
@@ -126,11 +166,67 @@ def private():
 # 04 EPT para obtener todos los usuarios (admin)
 
 
+# Columnas de User que se pueden pedir con ?fields= (nunca el password)
+USER_LIST_FIELDS = ("id", "first_name", "second_name", "first_surname", "second_surname",
+                    "birth_day", "phone", "email", "role", "status")
+USERS_PAGE_DEFAULT_LIMIT = 100
+USERS_PAGE_MAX_LIMIT = 500
+
+
+def serialize_user_fields(row, fields):
+    # Enums y fechas los serializa el proveedor JSON (api/json_provider.py)
+    return dict(zip(fields, row))
+
+
 @api.route('/users', methods=['GET'])
 @admin_required
 def get_users():
-    users = User.query.all()
-    return jsonify([user.serialize() for user in users]), 200
+    """
+    Lista paginada de usuarios (keyset sobre id): ?after_id=&limit=&role=&status=&fields=
+    Devuelve {"users": [...], "next_after_id": id | null}.
+    """
+    try:
+        after_id = request.args.get("after_id", type=int)
+        limit = request.args.get("limit", USERS_PAGE_DEFAULT_LIMIT, type=int)
+        limit = max(1, min(limit, USERS_PAGE_MAX_LIMIT))
+        role = UserRole(request.args["role"]) if "role" in request.args else None
+        status = UserStatus(request.args["status"]) if "status" in request.args else None
+    except ValueError:
+        raise APIException("Parámetros de filtro inválidos", status_code=400)
+
+    fields = request.args.get("fields")
+    if fields:
+        fields = [field.strip() for field in fields.split(",") if field.strip()]
+        invalid = [field for field in fields if field not in USER_LIST_FIELDS]
+        if invalid:
+            raise APIException(f"Campos no permitidos: {', '.join(invalid)}", status_code=400)
+        if "id" not in fields:
+            fields.insert(0, "id")
+        query = db.session.query(*[getattr(User, field) for field in fields])
+    else:
+        query = User.query
+
+    if after_id is not None:
+        query = query.filter(User.id > after_id)
+    if role is not None:
+        query = query.filter(User.role == role)
+    if status is not None:
+        query = query.filter(User.status == status)
+
+    # Se pide una fila extra para saber si hay página siguiente
+    rows = query.order_by(User.id).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if fields:
+        users = [serialize_user_fields(row, fields) for row in rows]
+    else:
+        users = [user.serialize_summary() for user in rows]
+
+    return jsonify({
+        "users": users,
+        "next_after_id": users[-1]["id"] if has_more else None
+    }), 200
 
 # 05 EPT para validar profesional (admin)
 
@@ -146,9 +242,10 @@ def validate_professional(user_id):
     if not data:
         return jsonify({"error": "Datos profesionales incompletos"}), 400
 
-    data.validated_by_id = get_jwt_identity()
+    data.validated_by_id = int(get_jwt_identity())
     data.validated_at = datetime.utcnow()
     user.status = UserStatus.approved
+    invalidate_user(user.id)
 
     db.session.commit()
     return jsonify({"message": "Profesional validado exitosamente"}), 200
@@ -159,7 +256,7 @@ def validate_professional(user_id):
 @api.route('/request_student_validation/<int:professional_id>', methods=['POST'])
 @student_required
 def request_professional_validation(professional_id):
-    student = User.query.get(get_jwt_identity())
+    student = get_current_user()
 
     if student.status != UserStatus.pre_approved:
         return jsonify({"error": "Solo estudiantes pre_aprobados pueden solicitar validación"}), 400
@@ -175,6 +272,7 @@ def request_professional_validation(professional_id):
 
     student_data.requested_professional_id = professional.id
     student_data.requested_at = datetime.utcnow()
+    emit_event(f"user:{professional.id}", "student_request", {"student_id": student.id})
 
     db.session.commit()
     return jsonify({"message": "Solicitud enviada al profesional"}), 200
@@ -185,7 +283,7 @@ def request_professional_validation(professional_id):
 @api.route('/professional/validate_student/<int:student_id>', methods=['PUT'])
 @professional_required
 def validate_student(student_id):
-    professional = User.query.get(get_jwt_identity())
+    professional = get_current_user()
     student = User.query.get(student_id)
 
     if not student or student.role != UserRole.student or student.status != UserStatus.pre_approved:
@@ -209,6 +307,8 @@ def validate_student(student_id):
     else:
         return jsonify({"error": "Acción no válida. Usa 'approve' o 'reject'"}), 400
 
+    if action == "approve":
+        invalidate_user(student.id)
     db.session.commit()
     return jsonify({"message": f"Estudiante {action}d exitosamente"}), 200
 
@@ -218,7 +318,7 @@ def validate_student(student_id):
 @api.route('/patient/request_student_validation/<int:student_id>', methods=['POST'])
 @patient_required
 def patient_request_student(student_id):
-    patient = User.query.get(get_jwt_identity())
+    patient = get_current_user()
     student = User.query.get(student_id)
 
     if not student or student.role != UserRole.student or student.status != UserStatus.approved:
@@ -234,15 +334,17 @@ def patient_request_student(student_id):
 
     medical_file.patient_requested_student_id = student.id
     medical_file.patient_requested_student_at = datetime.utcnow()
+    bump_file_version(medical_file)
+    emit_event(f"user:{student.id}", "patient_request", {"patient_id": patient.id})
 
-    db.session.commit()
+    commit_file(medical_file)
     return jsonify({"message": "Solicitud enviada al estudiante"}), 200
 
 
 @api.route('/student/validate_patient/<int:patient_id>', methods=['PUT'])
 @student_required
 def validate_patient(patient_id):
-    student = User.query.get(get_jwt_identity())
+    student = get_current_user()
     patient = User.query.get(patient_id)
 
     if not student or student.role != UserRole.student or student.status != UserStatus.approved:
@@ -259,12 +361,15 @@ def validate_patient(patient_id):
     action = data.get("action")
 
     if action == "approve":
-        medical_file.selected_student_id = student.id
-        medical_file.student_validated_patient_id = student.id
-        medical_file.student_validated_patient_at = datetime.utcnow()
-        medical_file.file_status = FileStatus.progress
-        medical_file.progressed_by_id = student.id
-        medical_file.progressed_at = datetime.utcnow()
+        now = datetime.utcnow()
+        transition_file(
+            medical_file, FileStatus.progress, actor_id=student.id,
+            selected_student_id=student.id,
+            student_validated_patient_id=student.id,
+            student_validated_patient_at=now,
+            progressed_by_id=student.id,
+            progressed_at=now,
+        )
 
         # ✅ Actualizar status del paciente a "approved"
         patient.status = UserStatus.approved
@@ -278,8 +383,11 @@ def validate_patient(patient_id):
     # Resetear solicitud
     medical_file.patient_requested_student_id = None
     medical_file.patient_requested_student_at = None
+    bump_file_version(medical_file)
+    if action == "approve":
+        invalidate_user(patient.id)
 
-    db.session.commit()
+    commit_file(medical_file)
     return jsonify({"message": f"Paciente {action}d exitosamente"}), 200
 
 
@@ -287,19 +395,24 @@ def validate_patient(patient_id):
 @api.route('/student/patient_requests', methods=['GET'])
 @student_required
 def get_patient_requests():
-    student_id = get_jwt_identity()
-    requests = MedicalFile.query.filter_by(
-        patient_requested_student_id=student_id).all()
-    result = []
-
-    for req in requests:
-        patient_user = User.query.get(req.user_id)
-        result.append({
-            "id": patient_user.id,
-            "full_name": f"{patient_user.first_name} {patient_user.first_surname}",
-            "medicalFileId": req.id,
-            "approved": req.student_validated_patient_id == student_id
-        })
+    student_id = int(get_jwt_identity())
+
+    # Una sola consulta: expediente + columnas del paciente que usa el frontend
+    rows = db.session.query(
+        MedicalFile.id,
+        MedicalFile.student_validated_patient_id,
+        User.id,
+        User.first_name,
+        User.first_surname
+    ).join(User, User.id == MedicalFile.user_id).filter(
+        MedicalFile.patient_requested_student_id == student_id).all()
+
+    result = [{
+        "id": patient_id,
+        "full_name": f"{first_name} {first_surname}",
+        "medicalFileId": file_id,
+        "approved": validated_by_id == student_id
+    } for file_id, validated_by_id, patient_id, first_name, first_surname in rows]
 
     return jsonify(result), 200
 
@@ -308,27 +421,42 @@ def get_patient_requests():
 @api.route('/professional/student_requests', methods=['GET'])
 @professional_required
 def get_student_requests():
-    professional_id = get_jwt_identity()
-    student_requests = ProfessionalStudentData.query.filter_by(
-        requested_professional_id=professional_id).all()
-
-    result = []
-    for data in student_requests:
-        student = User.query.get(data.user_id)
-        result.append({
-            "id": student.id,
-            "full_name": f"{student.first_name} {student.first_surname}",
-            "email": student.email,
-            "career": data.career,
-            "academic_grade": data.academic_grade.value,
-            "requested_at": data.requested_at.isoformat() if data.requested_at else None,
-            "status": student.status.value  # 👈 Devuelve el status para frontend
-        })
+    professional_id = int(get_jwt_identity())
+
+    rows = db.session.query(
+        User.id,
+        User.first_name,
+        User.first_surname,
+        User.email,
+        User.status,
+        ProfessionalStudentData.career,
+        ProfessionalStudentData.academic_grade,
+        ProfessionalStudentData.requested_at
+    ).join(User, User.id == ProfessionalStudentData.user_id).filter(
+        ProfessionalStudentData.requested_professional_id == professional_id).all()
+
+    result = [{
+        "id": row.id,
+        "full_name": f"{row.first_name} {row.first_surname}",
+        "email": row.email,
+        "career": row.career,
+        "academic_grade": row.academic_grade,
+        "requested_at": row.requested_at,
+        "status": row.status  # 👈 Devuelve el status para frontend
+    } for row in rows]
 
     return jsonify(result), 200
 
 
 # 13 EPT para guardar antecedentes médicos
+SAVE_BACKGROUNDS_PAYLOAD_KEYS = (
+    ("non_pathological_background", "non_pathological_background"),
+    ("pathological_background", "patological_background"),
+    ("family_background", "family_background"),
+    ("gynecological_background", "gynecological_background"),
+)
+
+
 @api.route('/api/backgrounds', methods=['POST'])
 @jwt_required()
 def save_backgrounds():
@@ -338,59 +466,37 @@ def save_backgrounds():
     if not medical_file_id:
         return jsonify({"error": "medical_file_id es requerido"}), 400
 
+    # Validar y convertir todas las secciones antes de tocar la sesión
+    # ("patological_background" es la clave que envía el frontend)
+    sections, errors = {}, {}
+    for section, payload_key in SAVE_BACKGROUNDS_PAYLOAD_KEYS:
+        section_data = data.get(payload_key)
+        if not section_data:
+            continue
+        values, section_errors = BACKGROUND_SCHEMAS[section].validate(section_data)
+        if section_errors:
+            errors[payload_key] = section_errors
+        else:
+            sections[section] = values
+
+    if errors:
+        return jsonify({"error": "Datos de antecedentes inválidos", "details": errors}), 400
+
     medical_file = MedicalFile.query.get(medical_file_id)
     if not medical_file:
         return jsonify({"error": "Expediente no encontrado"}), 404
 
-    # ---------- Non Pathological Background ----------
-    non_path_data = data.get("non_pathological_background")
-    if non_path_data:
-        if not medical_file.non_pathological_background:
-            from api.models import NonPathologicalBackground
-            medical_file.non_pathological_background = NonPathologicalBackground()
-            medical_file.non_pathological_background.medical_file = medical_file
-
-        for key, value in non_path_data.items():
-            if hasattr(medical_file.non_pathological_background, key):
-                setattr(medical_file.non_pathological_background, key, value)
-
-    # ---------- Pathological Background ----------
-    path_data = data.get("patological_background")
-    if path_data:
-        if not medical_file.pathological_background:
-            from api.models import PathologicalBackground
-            medical_file.pathological_background = PathologicalBackground()
-            medical_file.pathological_background.medical_file = medical_file
-
-        for key, value in path_data.items():
-            if hasattr(medical_file.pathological_background, key):
-                setattr(medical_file.pathological_background, key, value)
-
-    # ---------- Family Background ----------
-    family_data = data.get("family_background")
-    if family_data:
-        if not medical_file.family_background:
-            from api.models import FamilyBackground
-            medical_file.family_background = FamilyBackground()
-            medical_file.family_background.medical_file = medical_file
-
-        for key, value in family_data.items():
-            if hasattr(medical_file.family_background, key):
-                setattr(medical_file.family_background, key, value)
-
-    # ---------- Gynecological Background ----------
-    gyne_data = data.get("gynecological_background")
-    if gyne_data:
-        if not medical_file.gynecological_background:
-            from api.models import GynecologicalBackground
-            medical_file.gynecological_background = GynecologicalBackground()
-            medical_file.gynecological_background.medical_file = medical_file
-
-        for key, value in gyne_data.items():
-            if hasattr(medical_file.gynecological_background, key):
-                setattr(medical_file.gynecological_background, key, value)
+    for section, values in sections.items():
+        background = getattr(medical_file, section)
+        if background is None:
+            background = BACKGROUND_SCHEMAS[section].model()
+            setattr(medical_file, section, background)
 
-    db.session.commit()
+        for key, value in values.items():
+            setattr(background, key, value)
+
+    bump_file_version(medical_file)
+    commit_file(medical_file)
     return jsonify({"message": "Antecedentes guardados exitosamente"}), 200
 
 
@@ -398,13 +504,18 @@ def save_backgrounds():
 @api.route('/student/mark_review/<int:medical_file_id>', methods=['PUT'])
 @student_required
 def mark_file_review(medical_file_id):
-    medical_file = MedicalFile.query.get(medical_file_id)
+    medical_file = load_medical_file_for_snapshot(medical_file_id)
     if not medical_file:
         return jsonify({"error": "Expediente no encontrado"}), 404
 
-    medical_file.file_status = FileStatus.review
-    medical_file.reviewed_at = datetime.utcnow()
-    db.session.commit()
+    # create_backgrounds ya lo pasa a revisión: en ese caso solo se genera el snapshot
+    if medical_file.file_status != FileStatus.review:
+        transition_file(medical_file, FileStatus.review, actor_id=int(get_jwt_identity()), reviewed_at=datetime.utcnow())
+        emit_event("role:professional", "file_review", {"medical_file_id": medical_file.id})
+    render_snapshot(medical_file)
+    record_snapshot_version(medical_file, int(get_jwt_identity()))
+    bump_file_version(medical_file)
+    commit_file(medical_file)
 
     return jsonify({"message": "Expediente marcado como en revisión"}), 200
 
@@ -416,24 +527,29 @@ def review_file(medical_file_id):
     data = request.get_json()
     action = data.get("action")
     comment = data.get("comment", "")
+    if not isinstance(comment, str):
+        return jsonify({"error": "El comentario debe ser texto"}), 400
 
     medical_file = MedicalFile.query.get(medical_file_id)
     if not medical_file:
         return jsonify({"error": "Expediente no encontrado"}), 404
 
+    # Otro profesional lo tiene reclamado en la cola de revisión
+    if is_claimed_by_other(medical_file, int(get_jwt_identity())):
+        return jsonify({"error": "El expediente está asignado a otro profesional"}), 409
+
+    # El comentario queda en la bitácora de transiciones (GET /medical_file/<id>/timeline)
     if action == "approve":
-        medical_file.file_status = FileStatus.approved
-        medical_file.approved_at = datetime.utcnow()
-        medical_file.approved_by_id = get_jwt_identity()
+        transition_file(medical_file, FileStatus.approved, actor_id=int(get_jwt_identity()), comment=comment,
+                        approved_at=datetime.utcnow(), approved_by_id=int(get_jwt_identity()))
     elif action == "reject":
-        medical_file.file_status = FileStatus.progress
-        medical_file.no_approved_at = datetime.utcnow()
-        medical_file.no_approved_by_id = get_jwt_identity()
-        # Aquí podrías guardar `comment` en una columna aparte si quieres
+        transition_file(medical_file, FileStatus.progress, actor_id=int(get_jwt_identity()), comment=comment,
+                        no_approved_at=datetime.utcnow(), no_approved_by_id=int(get_jwt_identity()))
     else:
         return jsonify({"error": "Acción no válida"}), 400
 
-    db.session.commit()
+    clear_claim(medical_file)
+    commit_file(medical_file)
     return jsonify({"message": f"Expediente {action} correctamente."}), 200
 
 
@@ -441,18 +557,23 @@ def review_file(medical_file_id):
 @api.route('/student/assigned_patients', methods=['GET'])
 @student_required
 def get_assigned_patients():
-    student_id = get_jwt_identity()
-    files = MedicalFile.query.filter_by(selected_student_id=student_id).all()
-
-    result = []
-    for f in files:
-        patient = User.query.get(f.user_id)
-        result.append({
-            "id": patient.id,
-            "full_name": f"{patient.first_name} {patient.first_surname}",
-            "medicalFileId": f.id,
-            "file_status": f.file_status.name if f.file_status else "N/A",
-        })
+    student_id = int(get_jwt_identity())
+
+    rows = db.session.query(
+        MedicalFile.id,
+        MedicalFile.file_status,
+        User.id,
+        User.first_name,
+        User.first_surname
+    ).join(User, User.id == MedicalFile.user_id).filter(
+        MedicalFile.selected_student_id == student_id).all()
+
+    result = [{
+        "id": patient_id,
+        "full_name": f"{first_name} {first_surname}",
+        "medicalFileId": file_id,
+        "file_status": file_status.name if file_status else "N/A",
+    } for file_id, file_status, patient_id, first_name, first_surname in rows]
 
     return jsonify(result), 200
 
@@ -492,77 +613,82 @@ def create_backgrounds():
     gyneco_data = clean_empty_strings(data.get("gynecological_background", {}))
     personal_data = clean_empty_strings(data.get("personal_data", {}))
 
-    # Crear antecedentes no patológicos
-    non_path = NonPathologicalBackground(
-        medical_file_id=medical_file.id,
-        sex=personal_data.get("sex"),
-        address=personal_data.get("address"),
-        education_institution=non_path_data.get("education_level"),
-        economic_activity=non_path_data.get("economic_activity"),
-        civil_status=non_path_data.get("marital_status"),
-        dependents=non_path_data.get("dependents"),
-        hobbies=non_path_data.get("hobbies"),
-        exercise_details=non_path_data.get("exercise"),
-        sleep_details=non_path_data.get("hygiene"),
-        has_tattoos=bool_to_yesno(non_path_data.get("tattoos")),
-        has_piercings=bool_to_yesno(non_path_data.get("piercings")),
-        alcohol_use=non_path_data.get("alcohol_use"),
-        tobacco_use=non_path_data.get("tobacco_use"),
-        other_recreational_info=non_path_data.get("others")
-    )
-    db.session.add(non_path)
-
-    # Crear antecedentes patológicos
-    path = PathologicalBackground(
-        medical_file_id=medical_file.id,
-        chronic_diseases=path_data.get("personal_diseases"),
-        current_medications=path_data.get("medications"),
-        hospitalizations=path_data.get("hospitalizations"),
-        surgeries=path_data.get("surgeries"),
-        accidents=path_data.get("traumatisms"),
-        transfusions=path_data.get("transfusions"),
-        allergies=path_data.get("allergies"),
-        other_pathological_info=path_data.get("others")
-    )
-    db.session.add(path)
-
-    # Crear antecedentes familiares
-    family = FamilyBackground(
-        medical_file_id=medical_file.id,
-        hypertension=family_data.get("hypertension", False),
-        diabetes=family_data.get("diabetes", False),
-        cancer=family_data.get("cancer", False),
-        heart_diseases=family_data.get("heart_disease", False),
-        kidney_diseases=family_data.get("kidney_disease", False),
-        liver_diseases=family_data.get("liver_disease", False),
-        mental_illnesses=family_data.get("mental_illness", False),
-        congenital_diseases=family_data.get("congenital_malformations", False),
-        other_family_background_info=family_data.get("others")
-    )
-    db.session.add(family)
-
-    # Helper para convertir string vacío a None y luego int
-    def safe_int(value):
-        return int(value) if value not in [None, ""] else None
-
-    # Crear antecedentes ginecológicos
-    gyneco = GynecologicalBackground(
-        medical_file_id=medical_file.id,
-        menarche_age=safe_int(gyneco_data.get("menarche_age")),
-        pregnancies=safe_int(gyneco_data.get("pregnancies")),
-        births=safe_int(gyneco_data.get("births")),
-        c_sections=safe_int(gyneco_data.get("c_sections")),
-        abortions=safe_int(gyneco_data.get("abortions")),
-        contraceptive_methods=gyneco_data.get("contraceptive_method"),
-        other_gynecological_info=gyneco_data.get("others")
-    )
-    db.session.add(gyneco)
-
-    # Actualizar estado a review
-    medical_file.file_status = FileStatus.review
-    medical_file.reviewed_at = datetime.utcnow()
+    # Valores de cada sección con los nombres de columna; se validan y convierten todos con
+    # los esquemas de api/validation.py antes de tocar la sesión (400 en lugar de un 500)
+    section_values = {
+        "non_pathological_background": dict(
+            sex=personal_data.get("sex"),
+            address=personal_data.get("address"),
+            education_institution=non_path_data.get("education_level"),
+            economic_activity=non_path_data.get("economic_activity"),
+            civil_status=non_path_data.get("marital_status"),
+            dependents=non_path_data.get("dependents"),
+            hobbies=non_path_data.get("hobbies"),
+            exercise_details=non_path_data.get("exercise"),
+            sleep_details=non_path_data.get("hygiene"),
+            has_tattoos=bool_to_yesno(non_path_data.get("tattoos")),
+            has_piercings=bool_to_yesno(non_path_data.get("piercings")),
+            alcohol_use=non_path_data.get("alcohol_use"),
+            tobacco_use=non_path_data.get("tobacco_use"),
+            other_recreational_info=non_path_data.get("others")
+        ),
+        "pathological_background": dict(
+            chronic_diseases=path_data.get("personal_diseases"),
+            current_medications=path_data.get("medications"),
+            hospitalizations=path_data.get("hospitalizations"),
+            surgeries=path_data.get("surgeries"),
+            accidents=path_data.get("traumatisms"),
+            transfusions=path_data.get("transfusions"),
+            allergies=path_data.get("allergies"),
+            other_pathological_info=path_data.get("others")
+        ),
+        "family_background": dict(
+            hypertension=family_data.get("hypertension", False),
+            diabetes=family_data.get("diabetes", False),
+            cancer=family_data.get("cancer", False),
+            heart_diseases=family_data.get("heart_disease", False),
+            kidney_diseases=family_data.get("kidney_disease", False),
+            liver_diseases=family_data.get("liver_disease", False),
+            mental_illnesses=family_data.get("mental_illness", False),
+            congenital_diseases=family_data.get("congenital_malformations", False),
+            other_family_background_info=family_data.get("others")
+        ),
+        "gynecological_background": dict(
+            menarche_age=gyneco_data.get("menarche_age"),
+            pregnancies=gyneco_data.get("pregnancies"),
+            births=gyneco_data.get("births"),
+            c_sections=gyneco_data.get("c_sections"),
+            abortions=gyneco_data.get("abortions"),
+            contraceptive_methods=gyneco_data.get("contraceptive_method"),
+            other_gynecological_info=gyneco_data.get("others")
+        ),
+    }
 
-    db.session.commit()
+    # Los errores se reportan con la clave del payload, como en save_backgrounds
+    errors = {}
+    for section, payload_key in SAVE_BACKGROUNDS_PAYLOAD_KEYS:
+        section_values[section], section_errors = BACKGROUND_SCHEMAS[section].validate(section_values[section])
+        if section_errors:
+            errors[payload_key] = section_errors
+    if errors:
+        return jsonify({"error": "Datos de antecedentes inválidos", "details": errors}), 400
+
+    # Reutilizar la sección existente (una por expediente) o crearla
+    for section, values in section_values.items():
+        background = getattr(medical_file, section) or BACKGROUND_SCHEMAS[section].model(medical_file_id=medical_file.id)
+        for key, value in values.items():
+            setattr(background, key, value)
+        db.session.add(background)
+
+    # Actualizar estado a review (si se reenvía estando ya en revisión, solo se guardan los
+    # antecedentes). El snapshot lo genera mark_review (BackgroundForm lo llama después de
+    # guardar): aquí las secciones en sesión aún no reflejan lo guardado
+    if medical_file.file_status != FileStatus.review:
+        transition_file(medical_file, FileStatus.review, actor_id=int(get_jwt_identity()), reviewed_at=datetime.utcnow())
+        emit_event("role:professional", "file_review", {"medical_file_id": medical_file.id})
+    bump_file_version(medical_file)
+
+    commit_file(medical_file)
 
     return jsonify({"message": "Antecedentes creados y expediente enviado a revisión"}), 201
 
@@ -571,45 +697,75 @@ def create_backgrounds():
 @api.route('/professional/approved_students', methods=['GET'])
 @professional_required
 def get_approved_students():
-    professional_id = get_jwt_identity()
-
-    students = ProfessionalStudentData.query.filter_by(
-        validated_by_id=professional_id).all()
-    result = []
-    for data in students:
-        student = User.query.get(data.user_id)
-        if student and student.status == UserStatus.approved:
-            result.append({
-                "id": student.id,
-                "full_name": f"{student.first_name} {student.first_surname}",
-                "email": student.email,
-                "career": data.career,
-                "academic_grade": data.academic_grade.value,
-                "validated_at": data.validated_at.isoformat() if data.validated_at else None
-            })
+    professional_id = int(get_jwt_identity())
+
+    rows = db.session.query(
+        User.id,
+        User.first_name,
+        User.first_surname,
+        User.email,
+        ProfessionalStudentData.career,
+        ProfessionalStudentData.academic_grade,
+        ProfessionalStudentData.validated_at
+    ).join(User, User.id == ProfessionalStudentData.user_id).filter(
+        ProfessionalStudentData.validated_by_id == professional_id,
+        User.status == UserStatus.approved
+    ).all()
+
+    result = [{
+        "id": row.id,
+        "full_name": f"{row.first_name} {row.first_surname}",
+        "email": row.email,
+        "career": row.career,
+        "academic_grade": row.academic_grade,
+        "validated_at": row.validated_at
+    } for row in rows]
 
     return jsonify(result), 200
 
 
 # 19 EPT para que el profesional obtenga archivos en revisión
+REVIEW_FILES_DEFAULT_LIMIT = 100
+REVIEW_FILES_MAX_LIMIT = 500
+
+
 @api.route('/professional/review_files', methods=['GET'])
 @professional_required
 def get_review_files():
-    files = MedicalFile.query.filter_by(file_status=FileStatus.review).all()
-    result = []
-
-    for file in files:
-        patient = User.query.get(file.user_id)
-        if not patient:
-            continue
-
-        student = User.query.get(file.selected_student_id)
-        result.append({
-            "id": file.id,
-            "patient_name": f"{patient.first_name} {patient.first_surname}",
-            "student_name": f"{student.first_name} {student.first_surname}" if student else "Sin asignar",
-            "file_status": file.file_status.name if file.file_status else "N/A"
-        })
+    """
+    Expedientes en revisión que el profesional puede tomar (?limit=): los libres, los de
+    reclamo vencido y los que él tiene reclamados; los más antiguos primero.
+    """
+    professional_id = int(get_jwt_identity())
+    limit = request.args.get("limit", REVIEW_FILES_DEFAULT_LIMIT, type=int)
+    limit = max(1, min(limit, REVIEW_FILES_MAX_LIMIT))
+    now = datetime.utcnow()
+    patient = aliased(User)
+    student = aliased(User)
+
+    # Paciente obligatorio (inner join), estudiante opcional (outer join)
+    rows = db.session.query(
+        MedicalFile.id,
+        MedicalFile.file_status,
+        MedicalFile.claimed_by_id,
+        patient.first_name,
+        patient.first_surname,
+        student.first_name,
+        student.first_surname
+    ).join(patient, patient.id == MedicalFile.user_id).outerjoin(
+        student, student.id == MedicalFile.selected_student_id).filter(
+        MedicalFile.file_status == FileStatus.review,
+        or_(MedicalFile.claimed_by_id.is_(None), MedicalFile.claimed_by_id == professional_id,
+            MedicalFile.lease_expires_at < now)
+    ).order_by(MedicalFile.reviewed_at, MedicalFile.id).limit(limit).all()
+
+    result = [{
+        "id": file_id,
+        "patient_name": f"{patient_first_name} {patient_first_surname}",
+        "student_name": f"{student_first_name} {student_first_surname}" if student_first_name else "Sin asignar",
+        "file_status": file_status.name if file_status else "N/A",
+        "claimed_by_me": claimed_by_id == professional_id
+    } for file_id, file_status, claimed_by_id, patient_first_name, patient_first_surname, student_first_name, student_first_surname in rows]
 
     return jsonify(result), 200
 
@@ -622,21 +778,44 @@ def get_medical_file(file_id):
     """
     Retorna el expediente clínico completo (MedicalFile) con todas sus secciones relacionadas
     para que el profesional pueda revisarlo en modo lectura.
+    El documento se cachea por (id, version) y se sirve con ETag: si el cliente ya tiene
+    la versión actual (If-None-Match) se responde 304 sin cuerpo.
     """
-    current_user_id = get_jwt_identity()
-
-    # Buscar el expediente
-    medical_file = db.session.get(MedicalFile, file_id)
-    if not medical_file:
-        raise APIException("Expediente no encontrado", 404)
-
     # Verificar si el usuario actual es profesional
-    current_user = db.session.get(User, current_user_id)
-    if current_user.role != UserRole.professional:
+    current_user = get_current_user()
+    if not current_user or current_user.role != UserRole.professional:
         raise APIException("Acceso no autorizado", 403)
 
-    # Obtener paciente
-    patient = db.session.get(User, medical_file.user_id)
+    # Solo la versión: basta para el 304 y para la clave de caché
+    version = db.session.query(MedicalFile.version).filter(MedicalFile.id == file_id).scalar()
+    if version is None:
+        raise APIException("Expediente no encontrado", 404)
+
+    etag = medical_file_etag(file_id, version)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        document = medical_file_cache.get(file_id, version)
+        if document is None:
+            document = build_medical_file_document(file_id)
+            medical_file_cache.set(file_id, version, document)
+        response = Response(document, mimetype="application/json")
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def build_medical_file_document(file_id):
+    # Expediente, paciente y las cuatro secciones en una sola consulta
+    medical_file = MedicalFile.query.options(
+        joinedload(MedicalFile.user),
+        joinedload(MedicalFile.non_pathological_background),
+        joinedload(MedicalFile.pathological_background),
+        joinedload(MedicalFile.family_background),
+        joinedload(MedicalFile.gynecological_background)
+    ).filter(MedicalFile.id == file_id).one()
+    patient = medical_file.user
 
     # Armar la respuesta tal como en tu endpoint original
     result = {
@@ -651,31 +830,449 @@ def get_medical_file(file_id):
         "gynecological_background": medical_file.gynecological_background.serialize() if medical_file.gynecological_background else None,
     }
 
-    return jsonify(result), 200
+    return current_app.json.dumps(result)
 
 # 21 EPT para que el estudiante actualice el snapshot del expediente
 @api.route('/student/update_snapshot/<int:medical_file_id>', methods=['PUT'])
 @student_required
 def update_snapshot(medical_file_id):
-    medical_file = MedicalFile.query.get(medical_file_id)
+    medical_file = load_medical_file_for_snapshot(medical_file_id)
     if not medical_file:
         return jsonify({"error": "Expediente no encontrado"}), 404
 
-    # Generar HTML snapshot
-    snapshot_html = f"""
-    <h2>Entrevista Médica</h2>
-    <p><strong>Motivo de consulta:</strong> {medical_file.reason_for_consultation or 'N/A'}</p>
-    <p><strong>Enfermedad actual:</strong> {medical_file.current_illness or 'N/A'}</p>
-    <p><strong>Datos No Patológicos:</strong> {medical_file.non_pathological_background.serialize() if medical_file.non_pathological_background else 'N/A'}</p>
-    <p><strong>Datos Patológicos:</strong> {medical_file.pathological_background.serialize() if medical_file.pathological_background else 'N/A'}</p>
-    <p><strong>Datos Familiares:</strong> {medical_file.family_background.serialize() if medical_file.family_background else 'N/A'}</p>
-    <p><strong>Datos Ginecológicos:</strong> {medical_file.gynecological_background.serialize() if medical_file.gynecological_background else 'N/A'}</p>
+    # Solo se re-renderizan las secciones cuyos datos cambiaron desde el último snapshot
+    rendered_sections = render_snapshot(medical_file)
+    commit_file(medical_file)
+
+    return jsonify({"message": "Snapshot actualizado exitosamente", "rendered_sections": rendered_sections}), 200
+
+
+# 22 EPT para exportar expedientes completos en streaming (admin)
+@api.route('/admin/medical_files/export', methods=['GET'])
+@admin_required
+def export_medical_files():
     """
-    
-    # Guardar snapshot
-    medical_file.review_html = snapshot_html
-    db.session.commit()
+    Exporta todos los expedientes con sus antecedentes como NDJSON (por defecto) o CSV.
+    Filtros opcionales: ?file_status=&date_from=&date_to=&date_field=progressed_at
+    """
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        raise APIException(f"Formato no soportado: {fmt}", status_code=400)
+
+    try:
+        filters = parse_export_filters(
+            file_status=request.args.get("file_status"),
+            date_from=request.args.get("date_from"),
+            date_to=request.args.get("date_to"),
+            date_field=request.args.get("date_field")
+        )
+    except ValueError as e:
+        raise APIException(f"Filtros inválidos: {str(e)}", status_code=400)
+
+    mimetype = "application/x-ndjson" if fmt == "ndjson" else "text/csv"
+    response = Response(
+        stream_with_context(generate_export(fmt, iter_medical_files(**filters))),
+        mimetype=mimetype
+    )
+    response.headers["Content-Disposition"] = f"attachment; filename=medical_files.{fmt}"
+    return response
 
-    return jsonify({"message": "Snapshot actualizado exitosamente"}), 200
 
+# 23 EPT con métricas del pool de conexiones de este worker (admin)
+@api.route('/_internal/pool', methods=['GET'])
+@admin_required
+def get_pool_metrics():
+    return jsonify(pool_metrics(db.engine)), 200
+
+
+# 24 EPT para registrar usuarios en bloque desde CSV o JSON (admin)
+@api.route('/admin/users/bulk', methods=['POST'])
+@admin_required
+def bulk_register_users():
+    """
+    Acepta un archivo CSV/JSON en el campo "file" (multipart), un cuerpo text/csv o un JSON
+    (lista o {"users": [...]}). Con ?partial=1 se registran las filas válidas aunque haya errores.
+    Hasta BULK_REGISTER_HTTP_MAX_ROWS filas; para más, `flask bulk-register-users`.
 
+    Si hay filas que registrar responde 201 con NDJSON: una línea {"created": n} tras el
+    commit de cada lote y al final {"created": n, "errors": [...], "done": true}. Si un lote
+    falla, la última línea es {"created": n, "error": "..."} (n = usuarios ya guardados).
+    """
+    try:
+        if "file" in request.files:
+            upload = request.files["file"]
+            fmt = "csv" if upload.filename.lower().endswith(".csv") else "json"
+            raw_rows = parse_users_file(upload.read().decode("utf-8-sig"), fmt)
+        elif request.mimetype == "text/csv":
+            raw_rows = parse_users_file(request.get_data(as_text=True), "csv")
+        else:
+            raw_rows = parse_users_file(request.get_data(as_text=True), "json")
+    except (ValueError, UnicodeDecodeError) as e:
+        raise APIException(f"Archivo inválido: {str(e)}", status_code=400)
+
+    if len(raw_rows) > BULK_REGISTER_HTTP_MAX_ROWS:
+        raise APIException(f"Máximo {BULK_REGISTER_HTTP_MAX_ROWS} usuarios por carga", status_code=400)
+
+    # Se valida todo antes de empezar a responder: los errores de validación siguen siendo un 400
+    partial = request.args.get("partial") in ("1", "true")
+    valid_rows, row_errors = validate_users(raw_rows)
+    if not valid_rows or (row_errors and not partial):
+        return jsonify({"created": 0, "errors": row_errors}), 400
+
+    def generate():
+        created = 0
+        try:
+            for created in iter_register_chunks(valid_rows):
+                yield json.dumps({"created": created}) + "\n"
+        except Exception:
+            current_app.logger.exception("Falló un lote del alta masiva")
+            yield json.dumps({"created": created, "error": "No se pudo registrar un lote; los anteriores se guardaron"}) + "\n"
+            return
+        yield json.dumps({"created": created, "errors": row_errors, "done": True}) + "\n"
+
+    return Response(stream_with_context(generate()), status=201, mimetype="application/x-ndjson")
+
+
+# 25 EPT para obtener el snapshot HTML del expediente (comprimido con gzip si el cliente lo acepta)
+@api.route('/medical_file/<int:file_id>/snapshot', methods=['GET'])
+@jwt_required()
+def get_medical_file_snapshot(file_id):
+    row = db.session.query(MedicalFile.review_html, MedicalFile.selected_student_id).filter(
+        MedicalFile.id == file_id).first()
+    if row is None:
+        raise APIException("Expediente no encontrado", 404)
+
+    review_html, selected_student_id = row
+    check_snapshot_access(selected_student_id)
+    if review_html is None:
+        raise APIException("El expediente aún no tiene snapshot", 404)
+    return snapshot_response(review_html)
+
+
+def check_snapshot_access(selected_student_id):
+    """Profesionales y admins ven cualquier snapshot; el estudiante, solo los de sus pacientes."""
+    current_user = get_current_user()
+    allowed = current_user and (
+        current_user.role in (UserRole.professional, UserRole.admin)
+        or (current_user.role == UserRole.student and current_user.id == selected_student_id)
+    )
+    if not allowed:
+        raise APIException("Acceso no autorizado", 403)
+
+
+def snapshot_response(html):
+    etag = snapshot_etag(html)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    elif "gzip" in request.accept_encodings:
+        response = Response(compress_snapshot(html), mimetype="text/html")
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = Response(html, mimetype="text/html")
+
+    response.set_etag(etag)
+    response.vary.add("Accept-Encoding")
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def get_snapshot_file_or_404(file_id):
+    selected_student_id = db.session.query(MedicalFile.selected_student_id).filter(MedicalFile.id == file_id).first()
+    if selected_student_id is None:
+        raise APIException("Expediente no encontrado", 404)
+    check_snapshot_access(selected_student_id[0])
+
+
+# 26 EPT para listar las versiones enviadas a revisión de un expediente
+@api.route('/medical_file/<int:file_id>/snapshots', methods=['GET'])
+@jwt_required()
+def list_snapshot_versions(file_id):
+    get_snapshot_file_or_404(file_id)
+    versions = MedicalFileSnapshot.query.filter_by(medical_file_id=file_id).order_by(
+        MedicalFileSnapshot.version.desc()).all()
+    return jsonify([version.serialize() for version in versions]), 200
+
+
+# 27 EPT para obtener el HTML de una versión del historial
+@api.route('/medical_file/<int:file_id>/snapshots/<int:version>', methods=['GET'])
+@jwt_required()
+def get_snapshot_version_html(file_id, version):
+    get_snapshot_file_or_404(file_id)
+    html = get_snapshot_version(file_id, version)
+    if html is None:
+        raise APIException("Versión no encontrada", 404)
+    return snapshot_response(html)
+
+
+# 28 EPT para comparar dos versiones (por defecto, la última contra la anterior)
+@api.route('/medical_file/<int:file_id>/snapshots/diff', methods=['GET'])
+@jwt_required()
+def diff_snapshot_version_html(file_id):
+    get_snapshot_file_or_404(file_id)
+    to_version = request.args.get("to", type=int) or latest_snapshot_version(file_id)
+    if to_version is None:
+        raise APIException("El expediente no tiene versiones", 404)
+    from_version = request.args.get("from", to_version - 1, type=int)
+
+    diff = diff_snapshot_versions(file_id, from_version, to_version)
+    if diff is None:
+        raise APIException("Versión no encontrada", 404)
+    return jsonify({"from": from_version, "to": to_version, "diff": diff}), 200
+
+
+# 29 EPT de notificaciones en tiempo real (Server-Sent Events)
+# EventSource no permite enviar headers: el cliente pide primero un token de stream (vida
+# corta, solo sirve aquí) con su JWT y abre /api/events?token=<token>
+SSE_KEEPALIVE_SECONDS = 15
+# Se cierra la conexión periódicamente; el cliente reconecta con un token nuevo
+SSE_MAX_DURATION = int(os.getenv("SSE_MAX_DURATION", 300))
+SSE_BUSY_RETRY_SECONDS = 30
+
+
+@api.route('/events/token', methods=['POST'])
+@jwt_required()
+def create_events_token():
+    return jsonify({"token": create_stream_token(), "expires_in": STREAM_TOKEN_MAX_AGE}), 200
+
+
+@api.route('/events', methods=['GET'])
+def stream_events():
+    """
+    Eventos: "patient_request" (al estudiante), "student_request" (al profesional) y
+    "file_review" (a todos los profesionales). El dashboard vuelve a pedir la lista
+    correspondiente al recibirlos en lugar de consultarla periódicamente.
+    """
+    current_user = load_stream_token(request.args.get("token", ""))
+    if current_user is None:
+        return jsonify({"error": "Token de eventos inválido o expirado"}), 401
+
+    if not acquire_stream_slot():
+        response = jsonify({"error": "Demasiadas conexiones de eventos, intenta más tarde"})
+        response.headers["Retry-After"] = str(SSE_BUSY_RETRY_SECONDS)
+        return response, 503
+
+    subscription = broker.subscribe([f"user:{current_user.id}", f"role:{current_user.role.value}"])
+
+    def generate():
+        deadline = time.monotonic() + SSE_MAX_DURATION
+        yield "retry: 3000\n\n"
+        while time.monotonic() < deadline:
+            message = subscription.get(timeout=SSE_KEEPALIVE_SECONDS)
+            if message is None:
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {message['type']}\ndata: {json.dumps(message['data'])}\n\n"
+
+    def close_stream():
+        subscription.close()
+        release_stream_slot()
+
+    response = Response(generate(), mimetype="text/event-stream")
+    # Se libera al cerrar la respuesta, aunque el cliente se desconecte antes de la primera línea
+    response.call_on_close(close_stream)
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # Sin buffer en proxies nginx
+    return response
+
+
+# 30 EPT para que el profesional tome el siguiente expediente de la cola de revisión
+@api.route('/professional/review_queue/claim', methods=['POST'])
+@professional_required
+def claim_review_file():
+    """
+    Asigna al profesional el expediente en revisión más antiguo libre (o le devuelve el que
+    ya tiene reclamado). 204 si la cola está vacía.
+    """
+    claim = claim_next_file(int(get_jwt_identity()))
+    if claim is None:
+        return "", 204
+    medical_file_id, lease_expires_at = claim
+    return jsonify({"medical_file_id": medical_file_id, "lease_expires_at": lease_expires_at}), 200
+
+
+# 31 EPT para renovar el reclamo mientras se revisa
+@api.route('/professional/review_queue/<int:medical_file_id>/renew', methods=['PUT'])
+@professional_required
+def renew_review_claim(medical_file_id):
+    lease_expires_at = renew_claim(medical_file_id, int(get_jwt_identity()))
+    if lease_expires_at is None:
+        return jsonify({"error": "No tienes un reclamo vigente sobre este expediente"}), 409
+    return jsonify({"medical_file_id": medical_file_id, "lease_expires_at": lease_expires_at}), 200
+
+
+# 32 EPT para devolver un expediente reclamado a la cola
+@api.route('/professional/review_queue/<int:medical_file_id>/release', methods=['PUT'])
+@professional_required
+def release_review_claim(medical_file_id):
+    if not release_claim(medical_file_id, int(get_jwt_identity())):
+        return jsonify({"error": "No tienes reclamado este expediente"}), 409
+    return jsonify({"message": "Expediente devuelto a la cola"}), 200
+
+
+# 33 EPT con el estado de la cola y las estadísticas del profesional
+@api.route('/professional/review_queue/stats', methods=['GET'])
+@professional_required
+def get_review_queue_stats():
+    return jsonify(queue_stats(int(get_jwt_identity()))), 200
+
+
+# 34 EPT con el estado de la cola y las estadísticas de todos los profesionales (admin)
+@api.route('/admin/review_queue/stats', methods=['GET'])
+@admin_required
+def get_admin_review_queue_stats():
+    return jsonify(queue_stats()), 200
+
+
+# 35 EPT para buscar usuarios por nombre o email (?q=&role=&limit=)
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+# Roles que cada rol puede encontrar (el student solo ve a sus pacientes)
+SEARCH_VISIBLE_ROLES = {
+    UserRole.admin: set(UserRole),
+    UserRole.professional: {UserRole.patient, UserRole.student},
+    UserRole.student: {UserRole.patient},
+}
+
+
+@api.route('/search/users', methods=['GET'])
+@jwt_required()
+def search_users_endpoint():
+    """
+    Búsqueda parcial, sin acentos y tolerante a errores sobre nombres y email (api/search.py).
+    Devuelve {"users": [...]} con los exactos primero por id o, si no hay, los más parecidos.
+    """
+    current_user = get_current_user()
+    roles = SEARCH_VISIBLE_ROLES.get(current_user.role)
+    if roles is None:
+        raise APIException("Acceso no autorizado", 403)
+
+    query_text = request.args.get("q", "")
+    if len(normalize_search_text(query_text).strip()) < 2:
+        raise APIException("La búsqueda requiere al menos 2 caracteres", 400)
+    try:
+        limit = request.args.get("limit", SEARCH_DEFAULT_LIMIT, type=int)
+        limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+        if "role" in request.args:
+            roles = roles & {UserRole(request.args["role"])}
+    except ValueError:
+        raise APIException("Parámetros de filtro inválidos", status_code=400)
+
+    allowed_ids = None
+    if current_user.role == UserRole.student:
+        allowed_ids = set(db.session.execute(
+            db.select(MedicalFile.user_id).where(or_(
+                MedicalFile.selected_student_id == current_user.id,
+                MedicalFile.patient_requested_student_id == current_user.id))
+        ).scalars())
+
+    ids = search_users(query_text, roles=roles, allowed_ids=allowed_ids, limit=limit)
+    if not ids:
+        return jsonify({"users": []}), 200
+
+    rows = db.session.query(
+        User.id, User.first_name, User.second_name, User.first_surname, User.second_surname,
+        User.email, User.role, User.status, MedicalFile.id
+    ).outerjoin(MedicalFile, MedicalFile.user_id == User.id).filter(User.id.in_(ids)).all()
+    by_id = {row[0]: row for row in rows}
+
+    users = [{
+        "id": user_id,
+        "full_name": " ".join(name for name in names if name),
+        "email": email,
+        "role": role,
+        "status": status,
+        "medical_file_id": medical_file_id,
+    } for user_id, *names, email, role, status, medical_file_id in (by_id[user_id] for user_id in ids if user_id in by_id)]
+
+    return jsonify({"users": users}), 200
+
+
+# 36 EPT con los campos disponibles para las consultas de cohortes (api/cohorts.py)
+COHORT_PAGE_DEFAULT_LIMIT = 100
+COHORT_PAGE_MAX_LIMIT = 1000
+
+
+@api.route('/cohorts/fields', methods=['GET'])
+@role_required("admin", "professional")
+def get_cohort_fields():
+    return jsonify(cohort_fields()), 200
+
+
+def get_cohort_filter():
+    data = request.get_json(silent=True) or {}
+    if "where" not in data:
+        raise APIException("where es requerido", 400)
+    return data["where"]
+
+
+# 37 EPT para contar los expedientes de una cohorte: {"where": <filtro>}
+@api.route('/cohorts/count', methods=['POST'])
+@role_required("admin", "professional")
+def count_cohort_files():
+    try:
+        count = count_cohort(get_cohort_filter())
+    except CohortQueryError as error:
+        raise APIException(str(error), 400)
+    return jsonify({"count": count}), 200
+
+
+# 38 EPT para obtener los ids de expedientes de una cohorte por páginas (?after_id=&limit=)
+@api.route('/cohorts/ids', methods=['POST'])
+@role_required("admin", "professional")
+def get_cohort_file_ids():
+    after_id = request.args.get("after_id", type=int)
+    limit = request.args.get("limit", COHORT_PAGE_DEFAULT_LIMIT, type=int)
+    limit = max(1, min(limit, COHORT_PAGE_MAX_LIMIT))
+    try:
+        ids, next_after_id = cohort_ids(get_cohort_filter(), after_id=after_id, limit=limit)
+    except CohortQueryError as error:
+        raise APIException(str(error), 400)
+    return jsonify({"medical_file_ids": ids, "next_after_id": next_after_id}), 200
+
+
+# 39 EPT con los conteos del dashboard (api/dashboard_stats.py)
+# Conteos globales que ve cada rol; "me" son siempre los del propio usuario
+DASHBOARD_GLOBAL_PREFIXES = {
+    UserRole.admin: ("users.", "files."),
+    UserRole.professional: ("files.",),
+    UserRole.student: (),
+}
+
+
+@api.route('/dashboard/stats', methods=['GET'])
+@jwt_required()
+def get_dashboard_stats():
+    """
+    Admin: usuarios por rol/estado y expedientes por estado. Professional: expedientes por
+    estado; en "me", solicitudes de estudiantes pendientes, usuarios validados y
+    expedientes aprobados/rechazados. Student: en "me", sus expedientes por estado y
+    solicitudes de pacientes pendientes.
+    """
+    current_user = get_current_user()
+    prefixes = DASHBOARD_GLOBAL_PREFIXES.get(current_user.role)
+    if prefixes is None:
+        raise APIException("Acceso no autorizado", 403)
+
+    return jsonify({
+        "global": dashboard_counts(prefixes=prefixes) if prefixes else {},
+        "me": dashboard_counts(current_user.id),
+    }), 200
+
+
+# 40 EPT con la bitácora de transiciones de estado de un expediente (?after_id=&limit=)
+TIMELINE_PAGE_DEFAULT_LIMIT = 50
+TIMELINE_PAGE_MAX_LIMIT = 200
+
+
+@api.route('/medical_file/<int:file_id>/timeline', methods=['GET'])
+@jwt_required()
+def get_medical_file_timeline(file_id):
+    get_snapshot_file_or_404(file_id)
+    after_id = request.args.get("after_id", type=int)
+    limit = request.args.get("limit", TIMELINE_PAGE_DEFAULT_LIMIT, type=int)
+    limit = max(1, min(limit, TIMELINE_PAGE_MAX_LIMIT))
+    transitions, next_after_id = file_timeline(file_id, after_id=after_id, limit=limit)
+    return jsonify({
+        "transitions": [transition.serialize() for transition in transitions],
+        "next_after_id": next_after_id,
+    }), 200
@@ -0,0 +1,258 @@
+# Búsqueda de usuarios por nombre o email (parcial, sin acentos y tolerante a errores).
+#
+# El texto buscable de un usuario es first_name, second_name, first_surname, second_surname
+# y email, en minúsculas y sin acentos ("José Pérez" -> "jose perez"). La consulta se parte
+# en palabras y cada una debe aparecer (como prefijo de palabra o como subcadena de 3+
+# letras); si nada coincide se intenta una búsqueda aproximada por trigramas
+# ("gonzales" encuentra "González").
+#
+# SEARCH_BACKEND elige la implementación:
+#   - "postgres": índices GIN sobre user_search_text(...) (función IMMUTABLE creada en la
+#     migración, con unaccent): tsvector para prefijos y gin_trgm_ops para subcadenas y
+#     similitud (pg_trgm). Todo escritor de users (ORM o inserts en bloque) queda indexado.
+#   - "memory": índice invertido de trigramas en memoria del proceso, para SQLite en
+#     desarrollo. Se carga en la primera búsqueda, después agrega los usuarios nuevos (id
+#     mayor al último visto) y vuelve a indexar los que este proceso editó o borró con el
+#     ORM (listeners de la sesión al final del módulo). Los cambios hechos por otros
+#     procesos o sin ORM se recogen al reconstruirlo, cada SEARCH_INDEX_MAX_AGE segundos.
+# Por defecto "postgres" si la base es PostgreSQL y "memory" en otro caso.
+
+import os
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import insort
+from collections import Counter
+
+from sqlalchemy import and_, event, func, inspect, literal, literal_column, or_, select
+
+from api.models import db, User
+
+SEARCH_INDEX_MAX_AGE = int(os.getenv("SEARCH_INDEX_MAX_AGE", 300))
+# Fracción mínima de trigramas de la consulta que debe tener un resultado aproximado
+# (equivalente a pg_trgm.word_similarity_threshold)
+FUZZY_THRESHOLD = 0.5
+
+SEARCH_COLUMNS = (User.first_name, User.second_name, User.first_surname, User.second_surname, User.email)
+# Atributos que cambian el documento indexado de un usuario (texto o rol)
+INDEXED_ATTRIBUTES = ("role",) + tuple(column.key for column in SEARCH_COLUMNS)
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def normalize_search_text(value):
+    """Minúsculas y sin acentos (NFKD sin marcas combinantes): "Peña" -> "pena"."""
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def search_tokens(value):
+    return _TOKEN.findall(normalize_search_text(value))
+
+
+class PostgresSearch:
+    def __init__(self):
+        self.document = func.user_search_text(*SEARCH_COLUMNS)
+        # 'simple' como literal: la expresión debe ser idéntica a la del índice
+        self.tsvector = func.to_tsvector(literal_column("'simple'::regconfig"), self.document)
+
+    def search(self, tokens, roles, allowed_ids, limit):
+        query_text = " ".join(tokens)
+        prefix_query = " & ".join(f"{token}:*" for token in tokens)
+        matches = self.tsvector.op("@@")(func.to_tsquery(literal_column("'simple'::regconfig"), prefix_query))
+        if all(len(token) >= 3 for token in tokens):
+            # Subcadenas ("erez", "seed.test"): las resuelve el índice de trigramas
+            matches = or_(matches, and_(*[self.document.like(f"%{token}%") for token in tokens]))
+
+        ids = self._ids(select(User.id).where(matches).order_by(User.id), roles, allowed_ids, limit)
+        if ids:
+            return ids
+
+        similarity = func.word_similarity(query_text, self.document)
+        fuzzy = select(User.id).where(literal(query_text).op("<%")(self.document)).order_by(
+            similarity.desc(), User.id)
+        return self._ids(fuzzy, roles, allowed_ids, limit)
+
+    @staticmethod
+    def _ids(query, roles, allowed_ids, limit):
+        if roles is not None:
+            query = query.where(User.role.in_(roles))
+        if allowed_ids is not None:
+            query = query.where(User.id.in_(allowed_ids))
+        return db.session.execute(query.limit(limit)).scalars().all()
+
+    def invalidate(self, user_ids):
+        pass  # Los índices de expresiones se actualizan con cada UPDATE
+
+
+def _word_trigrams(word):
+    # Como pg_trgm: dos espacios al inicio y uno al final ("  ju", " jua", ..., "an ")
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _query_trigrams(token):
+    # Subcadena de 3+ letras: sus trigramas internos; 1-2 letras: prefijo de palabra
+    if len(token) >= 3:
+        return {token[i:i + 3] for i in range(len(token) - 2)}
+    return {f"  {token}"[i:i + 3] for i in range(len(token))}
+
+
+class NgramIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.postings = {}  # trigrama -> array de ids (crecientes)
+        self.documents = {}  # id -> (texto normalizado, rol)
+        self.stale = set()  # ids editados o borrados desde que se indexaron
+        self.last_id = 0
+        self.built_at = time.monotonic()
+
+    @staticmethod
+    def _trigrams(text):
+        trigrams = set()
+        for word in _TOKEN.findall(text):
+            trigrams |= _word_trigrams(word)
+        return trigrams
+
+    def _add(self, user_id, role, values):
+        text = normalize_search_text(" ".join(value for value in values if value))
+        self.documents[user_id] = (text, role)
+        for trigram in self._trigrams(text):
+            posting = self.postings.setdefault(trigram, array("i"))
+            if user_id > self.last_id:
+                posting.append(user_id)
+            else:
+                insort(posting, user_id)
+        self.last_id = max(self.last_id, user_id)
+
+    def _remove(self, user_id):
+        document = self.documents.pop(user_id, None)
+        if document is None:
+            return
+        for trigram in self._trigrams(document[0]):
+            self.postings[trigram].remove(user_id)
+
+    def invalidate(self, user_ids):
+        with self._lock:
+            self.stale.update(user_ids)
+
+    def refresh(self):
+        with self._lock:
+            if time.monotonic() - self.built_at > SEARCH_INDEX_MAX_AGE:
+                self._reset()
+            stale = [user_id for user_id in self.stale if user_id in self.documents]
+            self.stale.clear()
+            for user_id in stale:
+                self._remove(user_id)
+            rows = db.session.execute(
+                select(User.id, User.role, *SEARCH_COLUMNS)
+                .where(or_(User.id > self.last_id, User.id.in_(stale))).order_by(User.id)
+            )
+            for user_id, role, *values in rows:
+                self._add(user_id, role, values)
+
+    def _candidates(self, trigrams):
+        postings = sorted((self.postings.get(trigram, ()) for trigram in trigrams), key=len)
+        if not postings or not postings[0]:
+            return set()
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(posting)
+        return candidates
+
+    def _matches(self, text, token):
+        if len(token) >= 3:
+            return token in text
+        return any(word.startswith(token) for word in _TOKEN.findall(text))
+
+    def _visible(self, user_id, roles, allowed_ids):
+        document = self.documents.get(user_id)
+        return (document is not None
+                and (roles is None or document[1] in roles)
+                and (allowed_ids is None or user_id in allowed_ids))
+
+    def search(self, tokens, roles, allowed_ids, limit):
+        with self._lock:
+            self.refresh()
+            return self._search(tokens, roles, allowed_ids, limit)
+
+    def _search(self, tokens, roles, allowed_ids, limit):
+        # Todas las palabras deben aparecer: se intersectan sus trigramas, los más raros primero
+        candidates = self._candidates(set().union(*(_query_trigrams(token) for token in tokens)))
+
+        # Los trigramas solo preseleccionan: se verifica cada candidato hasta juntar `limit`
+        ids = []
+        for user_id in sorted(candidates):
+            if (self._visible(user_id, roles, allowed_ids)
+                    and all(self._matches(self.documents[user_id][0], token) for token in tokens)):
+                ids.append(user_id)
+                if len(ids) == limit:
+                    break
+        if ids:
+            return ids
+
+        # Aproximada: fracción de trigramas de la consulta presentes en el usuario
+        query_trigrams = set()
+        for token in tokens:
+            query_trigrams |= _word_trigrams(token)
+        hits = Counter()
+        for trigram in query_trigrams:
+            hits.update(self.postings.get(trigram, ()))
+        minimum = FUZZY_THRESHOLD * len(query_trigrams)
+        ranked = sorted(
+            (user_id for user_id, count in hits.items()
+             if count >= minimum and self._visible(user_id, roles, allowed_ids)),
+            key=lambda user_id: (-hits[user_id], user_id))
+        return ranked[:limit]
+
+
+def _default_backend_name():
+    database_url = os.getenv("DATABASE_URL", "")
+    return "postgres" if database_url.startswith(("postgres://", "postgresql")) else "memory"
+
+
+SEARCH_BACKENDS = {"memory": NgramIndex, "postgres": PostgresSearch}
+search_backend = SEARCH_BACKENDS[os.getenv("SEARCH_BACKEND") or _default_backend_name()]()
+
+
+def _collect_stale(session, flush_context, instances):
+    user_ids = session.info.setdefault("search_stale_users", set())
+    for obj in session.dirty:
+        if isinstance(obj, User) and any(
+                inspect(obj).attrs[key].history.has_changes() for key in INDEXED_ATTRIBUTES):
+            user_ids.add(obj.id)
+    user_ids.update(obj.id for obj in session.deleted if isinstance(obj, User))
+
+
+def _invalidate_stale(session):
+    # Solo se marcan: en after_commit la sesión ya no puede consultar; se releen en la
+    # siguiente búsqueda
+    user_ids = session.info.pop("search_stale_users", None)
+    if user_ids:
+        search_backend.invalidate(user_ids)
+
+
+def _discard_stale(session):
+    session.info.pop("search_stale_users", None)
+
+
+event.listen(db.session, "before_flush", _collect_stale)
+event.listen(db.session, "after_commit", _invalidate_stale)
+event.listen(db.session, "after_rollback", _discard_stale)
+
+
+def search_users(query_text, roles=None, allowed_ids=None, limit=20):
+    """
+    Ids de usuarios que coinciden con `query_text`, los exactos por id y los aproximados
+    por similitud. `roles` y `allowed_ids` (None = sin restricción) acotan el resultado.
+    """
+    tokens = search_tokens(query_text)
+    if not tokens:
+        return []
+    return search_backend.search(tokens, roles, allowed_ids, limit)
@@ -0,0 +1,276 @@
+# Generador de datos sintéticos con integridad referencial para desarrollo y pruebas de carga.
+#
+# Crea admins, professionals, students y patients; datos académicos validados por quien
+# corresponde; un expediente por paciente repartido entre todos los FileStatus con los
+# actores y fechas coherentes con el flujo de la API; y las cuatro secciones de
+# antecedentes para los expedientes que ya pasaron de "empty".
+#
+# Todo se inserta por lotes (INSERT ... RETURNING / executemany) con un commit por lote,
+# así que escala de miles a millones de filas con memoria acotada.
+#
+# Cuentas conocidas (contraseña SEED_PASSWORD):
+#   admin{i}@seed.test, pr{i}@seed.test, st{i}@seed.test, pt{i}@seed.test
+# Los students y professionals con i % 10 == 9 quedan en pre_approved; el resto, aprobados.
+# Los emails son fijos, así que solo se puede sembrar una base sin cuentas de seed
+# (`has_seed_users`); para volver a sembrar hay que vaciarla antes.
+
+import random
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import exists, insert, select
+from werkzeug.security import generate_password_hash
+
+from api.dashboard_stats import rebuild_dashboard_counters
+from api.models import (
+    db, User, UserRole, UserStatus, SexType, AcademicGrade, ProfessionalStudentData, MedicalFile, FileStatus,
+    QualityLevel, YesNo, CivilStatus, HousingType, NonPathologicalBackground, PathologicalBackground,
+    FamilyBackground, GynecologicalBackground
+)
+
+SEED_PASSWORD = "seed1234"
+SEED_EMAIL_DOMAIN = "seed.test"
+SEED_BATCH_SIZE = 5000
+
+# Reparto de expedientes por estado (pesos)
+FILE_STATUS_WEIGHTS = {
+    FileStatus.empty: 30,
+    FileStatus.progress: 25,
+    FileStatus.review: 20,
+    FileStatus.approved: 15,
+    FileStatus.confirmed: 10,
+}
+
+FIRST_NAMES = ("María", "José", "Guadalupe", "Juan", "Ana", "Luis", "Sofía", "Carlos", "Lucía", "Miguel",
+               "Fernanda", "Jorge", "Valeria", "Andrés", "Camila", "Ramón", "Ximena", "Héctor")
+SURNAMES = ("Hernández", "García", "Martínez", "López", "González", "Pérez", "Rodríguez", "Sánchez",
+            "Ramírez", "Cruz", "Flores", "Gómez", "Morales", "Vázquez", "Jiménez", "Núñez", "Muñoz")
+INSTITUTIONS = ("UNAM", "IPN", "UAM", "UdeG", "BUAP")
+CAREERS = ("Medicina", "Enfermería", "Psicología", "Nutrición")
+
+
+def is_seed_user_approved(index):
+    return index % 10 != 9
+
+
+def _person(rng, index, prefix, role, status, password):
+    return {
+        "first_name": rng.choice(FIRST_NAMES),
+        "second_name": rng.choice(FIRST_NAMES) if rng.random() < 0.4 else None,
+        "first_surname": rng.choice(SURNAMES),
+        "second_surname": rng.choice(SURNAMES),
+        "birth_day": date(1950, 1, 1) + timedelta(days=rng.randrange(365 * 55)),
+        "phone": f"55{rng.randrange(10 ** 8):08d}",
+        "email": f"{prefix}{index}@{SEED_EMAIL_DOMAIN}",
+        "password": password,
+        "role": role,
+        "status": status,
+    }
+
+
+def _insert_users(rows):
+    inserted = db.session.execute(insert(User).returning(User.id, User.email), rows).all()
+    ids_by_email = {email: user_id for user_id, email in inserted}
+    return [ids_by_email[row["email"]] for row in rows]
+
+
+def _seed_staff(rng, role, prefix, count, password, validators, batch_size):
+    """Crea professionals o students con sus datos académicos; devuelve [(id, aprobado)]."""
+    created = []
+    for start in range(0, count, batch_size):
+        indexes = range(start, min(start + batch_size, count))
+        rows = [_person(rng, i, prefix, role,
+                        UserStatus.approved if is_seed_user_approved(i) else UserStatus.pre_approved, password)
+                for i in indexes]
+        user_ids = _insert_users(rows)
+
+        now = datetime.utcnow()
+        academic_rows = []
+        for i, user_id in zip(indexes, user_ids):
+            approved = is_seed_user_approved(i)
+            validator_id = rng.choice(validators)
+            academic_rows.append({
+                "user_id": user_id,
+                "institution": rng.choice(INSTITUTIONS),
+                "career": rng.choice(CAREERS),
+                "academic_grade": AcademicGrade.bachelor if role == UserRole.student else AcademicGrade.postgraduate_studies,
+                "register_number": f"{prefix.upper()}{i:08d}",
+                "requested_professional_id": validator_id if role == UserRole.student else None,
+                "requested_at": now - timedelta(days=rng.randrange(1, 365)) if role == UserRole.student else None,
+                "validated_by_id": validator_id if approved else None,
+                "validated_at": now - timedelta(days=rng.randrange(1, 365)) if approved else None,
+            })
+        db.session.execute(insert(ProfessionalStudentData), academic_rows)
+        db.session.commit()
+        created += [(user_id, is_seed_user_approved(i)) for i, user_id in zip(indexes, user_ids)]
+    return created
+
+
+def _medical_file_row(rng, patient_id, status, students, professionals, now):
+    student_id = rng.choice(students)
+    professional_id = rng.choice(professionals)
+    started = now - timedelta(days=rng.randrange(30, 720))
+    row = {"user_id": patient_id, "file_status": status}
+
+    if status == FileStatus.empty:
+        if rng.random() < 0.3:
+            row["patient_requested_student_id"] = student_id
+            row["patient_requested_student_at"] = started
+        return row
+
+    row.update({
+        "selected_student_id": student_id,
+        "student_validated_patient_id": student_id,
+        "student_validated_patient_at": started,
+        "progressed_by_id": student_id,
+        "progressed_at": started,
+    })
+    if status in (FileStatus.review, FileStatus.approved, FileStatus.confirmed):
+        row["reviewed_at"] = started + timedelta(days=rng.randrange(1, 15))
+    if status in (FileStatus.approved, FileStatus.confirmed):
+        row["approved_by_id"] = professional_id
+        row["approved_at"] = row["reviewed_at"] + timedelta(days=rng.randrange(1, 15))
+    if status == FileStatus.confirmed:
+        row["confirmed_by_id"] = professional_id
+        row["confirmed_at"] = row["approved_at"] + timedelta(days=rng.randrange(1, 15))
+    return row
+
+
+def _background_rows(rng, medical_file_id, sex):
+    def maybe(value, probability=0.3):
+        return value if rng.random() < probability else None
+
+    non_pathological = {
+        "medical_file_id": medical_file_id,
+        "sex": sex.value,
+        "nationality": "Mexicana",
+        "blood_type": rng.choice(("O+", "O-", "A+", "A-", "B+", "AB+")),
+        "civil_status": rng.choice(list(CivilStatus)),
+        "housing_type": rng.choice(list(HousingType)),
+        "address": f"Calle {rng.randrange(1, 500)} #{rng.randrange(1, 200)}",
+        "economic_activity": rng.choice(("Estudiante", "Empleado", "Comerciante", "Hogar", "Jubilado")),
+        "is_employer": rng.random() < 0.1,
+        "has_medical_insurance": rng.choice(list(YesNo)),
+        "diet_quality": rng.choice(list(QualityLevel)),
+        "meals_per_day": rng.randrange(1, 6),
+        "daily_liquid_intake_liters": round(rng.uniform(0.5, 3.5), 1),
+        "hygiene_quality": rng.choice(list(QualityLevel)),
+        "exercise_quality": rng.choice(list(QualityLevel)),
+        "sleep_quality": rng.choice(list(QualityLevel)),
+        "has_piercings": rng.choice(list(YesNo)),
+        "has_tattoos": rng.choice(list(YesNo)),
+        "alcohol_use": maybe("Social"),
+        "tobacco_use": maybe("5 cigarros al día", 0.2),
+    }
+    pathological = {
+        "medical_file_id": medical_file_id,
+        "visual_disability": rng.random() < 0.05,
+        "hearing_disability": rng.random() < 0.03,
+        "motor_disability": rng.random() < 0.03,
+        "intellectual_disability": rng.random() < 0.01,
+        "chronic_diseases": maybe(rng.choice(("Asma", "Hipertensión", "Diabetes tipo 2", "Hipotiroidismo"))),
+        "current_medications": maybe("Metformina 850 mg"),
+        "allergies": maybe(rng.choice(("Penicilina", "Polen", "Mariscos")), 0.2),
+        "surgeries": maybe("Apendicectomía", 0.15),
+    }
+    family = {
+        "medical_file_id": medical_file_id,
+        "hypertension": rng.random() < 0.35,
+        "diabetes": rng.random() < 0.3,
+        "cancer": rng.random() < 0.15,
+        "mental_illnesses": rng.random() < 0.1,
+        "congenital_diseases": rng.random() < 0.05,
+        "heart_diseases": rng.random() < 0.15,
+        "liver_diseases": rng.random() < 0.05,
+        "kidney_diseases": rng.random() < 0.07,
+    }
+    gynecological = None
+    if sex == SexType.female:
+        pregnancies = rng.randrange(0, 5)
+        births = rng.randrange(0, pregnancies + 1)
+        gynecological = {
+            "medical_file_id": medical_file_id,
+            "menarche_age": rng.randrange(9, 16),
+            "pregnancies": pregnancies,
+            "births": births,
+            "c_sections": pregnancies - births if rng.random() < 0.5 else 0,
+            "abortions": 0,
+            "contraceptive_methods": maybe("Ninguno", 0.5),
+        }
+    return non_pathological, pathological, family, gynecological
+
+
+def _seed_patients(rng, count, password, students, professionals, batch_size):
+    statuses = list(FILE_STATUS_WEIGHTS)
+    weights = list(FILE_STATUS_WEIGHTS.values())
+    created_files = 0
+
+    for start in range(0, count, batch_size):
+        indexes = range(start, min(start + batch_size, count))
+        file_statuses = rng.choices(statuses, weights=weights, k=len(indexes))
+        rows = [_person(rng, i, "pt", UserRole.patient,
+                        UserStatus.pre_approved if status == FileStatus.empty else UserStatus.approved, password)
+                for i, status in zip(indexes, file_statuses)]
+        patient_ids = _insert_users(rows)
+
+        now = datetime.utcnow()
+        file_rows = [_medical_file_row(rng, patient_id, status, students, professionals, now)
+                     for patient_id, status in zip(patient_ids, file_statuses)]
+        inserted = db.session.execute(
+            insert(MedicalFile).returning(MedicalFile.id, MedicalFile.user_id, MedicalFile.file_status), file_rows
+        ).all()
+
+        sections = ([], [], [], [])
+        for medical_file_id, _, status in inserted:
+            if status == FileStatus.empty:
+                continue
+            sex = rng.choice((SexType.female, SexType.male))
+            for rows_by_section, row in zip(sections, _background_rows(rng, medical_file_id, sex)):
+                if row is not None:
+                    rows_by_section.append(row)
+
+        for model, section_rows in zip(
+                (NonPathologicalBackground, PathologicalBackground, FamilyBackground, GynecologicalBackground),
+                sections):
+            if section_rows:
+                db.session.execute(insert(model), section_rows)
+
+        db.session.commit()
+        created_files += len(inserted)
+        print(f"  pacientes: {start + len(indexes)}/{count}")
+    return created_files
+
+
+def has_seed_users():
+    """True si la base ya tiene cuentas creadas por una siembra anterior."""
+    return db.session.scalar(select(exists().where(User.email.like(f"%@{SEED_EMAIL_DOMAIN}"))))
+
+
+def seed_database(patients, students, professionals, admins=1, batch_size=SEED_BATCH_SIZE, seed=None):
+    rng = random.Random(seed)
+    # Todas las cuentas sembradas comparten contraseña: se hashea una sola vez
+    password = generate_password_hash(SEED_PASSWORD)
+
+    admin_ids = _insert_users([_person(rng, i, "admin", UserRole.admin, UserStatus.approved, password)
+                               for i in range(admins)])
+    db.session.commit()
+
+    professionals_created = _seed_staff(rng, UserRole.professional, "pr", professionals, password,
+                                        admin_ids, batch_size)
+    approved_professionals = [user_id for user_id, approved in professionals_created if approved]
+
+    students_created = _seed_staff(rng, UserRole.student, "st", students, password,
+                                   approved_professionals, batch_size)
+    approved_students = [user_id for user_id, approved in students_created if approved]
+
+    files = _seed_patients(rng, patients, password, approved_students, approved_professionals, batch_size)
+
+    # Todo se insertó sin ORM: los conteos del dashboard se recalculan al final
+    rebuild_dashboard_counters()
+    db.session.commit()
+    return {
+        "admins": len(admin_ids),
+        "professionals": len(professionals_created),
+        "students": len(students_created),
+        "patients": patients,
+        "medical_files": files,
+    }
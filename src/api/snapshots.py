@@ -0,0 +1,285 @@
+# Snapshot HTML del expediente para la revisión del profesional.
+#
+# Cada sección (encabezado + los cuatro antecedentes) tiene su plantilla Jinja2 en
+# api/templates/snapshot/, cargadas y compiladas una sola vez al importar. Al regenerar
+# el snapshot se calcula un hash por sección (datos + plantilla) y solo se renderizan las
+# secciones cuyo hash cambió; los fragmentos se guardan en SnapshotFragment y el documento
+# armado en MedicalFile.review_html, que se sirve comprimido con gzip.
+#
+# Cada envío a revisión agrega una versión a MedicalFileSnapshot: un delta por líneas
+# contra la versión anterior (comprimido con zlib) o, cada SNAPSHOT_CHECKPOINT_INTERVAL
+# versiones, el documento completo. Reconstruir cualquier versión lee a lo sumo un
+# checkpoint y SNAPSHOT_CHECKPOINT_INTERVAL - 1 deltas, en una sola consulta.
+
+import difflib
+import gzip
+import hashlib
+import json
+import os
+import zlib
+from datetime import datetime
+
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, meta
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+
+from api.models import db, MedicalFile, SnapshotFragment, MedicalFileSnapshot, BACKGROUND_SECTIONS
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+SNAPSHOT_SECTIONS = ("header",) + tuple(section for section, _ in BACKGROUND_SECTIONS)
+SNAPSHOT_GZIP_LEVEL = 6
+SNAPSHOT_CHECKPOINT_INTERVAL = 10
+
+# Valores de enums y booleanos tal como se muestran al revisor
+VALUE_LABELS = {
+    True: "Sí", False: "No",
+    "yes": "Sí", "no": "No",
+    "good": "Buena", "regular": "Regular", "bad": "Mala",
+    "married": "Casado(a)", "single": "Soltero(a)", "divorced": "Divorciado(a)", "widowed": "Viudo(a)",
+    "owned": "Propia", "rented": "Rentada", "none": "Sin vivienda",
+    "female": "Femenino", "male": "Masculino", "other": "Otro",
+}
+
+
+def display(value):
+    if value is None or value == "":
+        return "N/A"
+    if isinstance(value, (bool, str)):
+        return VALUE_LABELS.get(value, value)
+    return value
+
+
+_env = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=True,
+    undefined=StrictUndefined,
+    trim_blocks=True,
+    lstrip_blocks=True,
+    auto_reload=False,
+)
+_env.filters["display"] = display
+
+
+def _template_sources(name, sources=None):
+    """Fuente de la plantilla y de todas las que importa, incluye o extiende (recursivo)."""
+    sources = {} if sources is None else sources
+    if name in sources:
+        return sources
+    source, _, _ = _env.loader.get_source(_env, name)
+    sources[name] = source
+    for referenced in meta.find_referenced_templates(_env.parse(source)):
+        if referenced is not None:  # None: nombre calculado en tiempo de ejecución
+            _template_sources(referenced, sources)
+    return sources
+
+
+def _template_digest(name):
+    # El hash de la plantilla entra en el de la sección: si cambia ella, una plantilla que
+    # importa (p. ej. snapshot/_fields.html) o las etiquetas del filtro display, se re-renderiza
+    digest = hashlib.sha256(repr(VALUE_LABELS).encode())
+    for template_name, source in sorted(_template_sources(name).items()):
+        digest.update(f"\0{template_name}\0{source}".encode())
+    return digest.hexdigest()
+
+
+def _load_templates():
+    templates = {}
+    for section in SNAPSHOT_SECTIONS:
+        name = f"snapshot/{section}.html"
+        templates[section] = (_env.get_template(name), _template_digest(name))
+    return templates
+
+
+SNAPSHOT_TEMPLATES = _load_templates()
+
+
+def _full_name(user):
+    if user is None:
+        return None
+    return " ".join(part for part in (user.first_name, user.second_name, user.first_surname, user.second_surname) if part)
+
+
+def section_contexts(medical_file):
+    """Datos de cada sección, en el orden del documento."""
+    yield "header", {
+        "medical_file_id": medical_file.id,
+        "patient_name": _full_name(medical_file.user),
+        "patient_birth_day": medical_file.user.birth_day.isoformat() if medical_file.user else None,
+        "student_name": _full_name(medical_file.selected_student),
+    }
+    for section, _ in BACKGROUND_SECTIONS:
+        background = getattr(medical_file, section)
+        data = background.serialize() if background else None
+        if data:
+            data.pop("id", None)
+            data.pop("medical_file_id", None)
+        yield section, data
+
+
+def _content_hash(data, template_digest):
+    payload = json.dumps(data, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(f"{template_digest}:{payload}".encode()).hexdigest()
+
+
+def load_medical_file_for_snapshot(medical_file_id):
+    return MedicalFile.query.options(
+        joinedload(MedicalFile.user),
+        joinedload(MedicalFile.selected_student),
+        *[joinedload(getattr(MedicalFile, section)) for section, _ in BACKGROUND_SECTIONS]
+    ).filter(MedicalFile.id == medical_file_id).one_or_none()
+
+
+def render_snapshot(medical_file):
+    """
+    Regenera MedicalFile.review_html renderizando solo las secciones que cambiaron.
+    Devuelve los nombres de las secciones re-renderizadas. No hace commit.
+    """
+    fragments = {
+        fragment.section: fragment
+        for fragment in SnapshotFragment.query.filter_by(medical_file_id=medical_file.id)
+    }
+    rendered = []
+    now = datetime.utcnow()
+
+    for section, data in section_contexts(medical_file):
+        template, template_digest = SNAPSHOT_TEMPLATES[section]
+        content_hash = _content_hash(data, template_digest)
+        fragment = fragments.get(section)
+        if fragment is not None and fragment.content_hash == content_hash:
+            continue
+
+        if fragment is None:
+            fragment = SnapshotFragment(medical_file_id=medical_file.id, section=section)
+            db.session.add(fragment)
+            fragments[section] = fragment
+        fragment.html = template.render(data=data)
+        fragment.content_hash = content_hash
+        fragment.rendered_at = now
+        rendered.append(section)
+
+    if rendered or medical_file.review_html is None:
+        medical_file.review_html = "\n".join(fragments[section].html for section in SNAPSHOT_SECTIONS)
+    return rendered
+
+
+def snapshot_etag(review_html):
+    return hashlib.sha256(review_html.encode()).hexdigest()[:32]
+
+
+def compress_snapshot(review_html):
+    return gzip.compress(review_html.encode(), compresslevel=SNAPSHOT_GZIP_LEVEL)
+
+
+# ---------------------------- Historial de versiones ----------------------------
+
+
+def _make_delta(old_lines, new_lines):
+    """Operaciones para pasar de old_lines a new_lines: ["c", i1, i2] copia, ["i", [líneas]] inserta."""
+    ops = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append(["c", i1, i2])
+        elif tag in ("replace", "insert"):
+            ops.append(["i", new_lines[j1:j2]])
+    return ops
+
+
+def _apply_delta(old_lines, ops):
+    lines = []
+    for op in ops:
+        if op[0] == "c":
+            lines.extend(old_lines[op[1]:op[2]])
+        else:
+            lines.extend(op[1])
+    return lines
+
+
+def _reconstruct(rows):
+    """Texto de la última fila a partir de un checkpoint seguido de sus deltas, en orden."""
+    lines = None
+    for row in rows:
+        data = zlib.decompress(row.payload)
+        if row.is_checkpoint:
+            lines = data.decode().splitlines(keepends=True)
+        else:
+            lines = _apply_delta(lines, json.loads(data))
+    return "".join(lines)
+
+
+def _version_chain(medical_file_id, version):
+    """El checkpoint más reciente <= version y los deltas hasta version (una consulta)."""
+    checkpoint = db.session.query(func.max(MedicalFileSnapshot.version)).filter(
+        MedicalFileSnapshot.medical_file_id == medical_file_id,
+        MedicalFileSnapshot.is_checkpoint.is_(True),
+        MedicalFileSnapshot.version <= version,
+    ).scalar_subquery()
+    return MedicalFileSnapshot.query.filter(
+        MedicalFileSnapshot.medical_file_id == medical_file_id,
+        MedicalFileSnapshot.version >= checkpoint,
+        MedicalFileSnapshot.version <= version,
+    ).order_by(MedicalFileSnapshot.version).all()
+
+
+def get_snapshot_version(medical_file_id, version):
+    """Documento HTML de una versión, o None si no existe."""
+    rows = _version_chain(medical_file_id, version)
+    if not rows or rows[-1].version != version:
+        return None
+    return _reconstruct(rows)
+
+
+def latest_snapshot_version(medical_file_id):
+    return db.session.query(func.max(MedicalFileSnapshot.version)).filter(
+        MedicalFileSnapshot.medical_file_id == medical_file_id).scalar()
+
+
+def record_snapshot_version(medical_file, created_by_id=None):
+    """
+    Agrega review_html como nueva versión del historial (sin commit). Si el contenido es
+    igual al de la última versión no se crea otra. Devuelve el número de versión vigente.
+    """
+    html = medical_file.review_html
+    content_hash = hashlib.sha256(html.encode()).hexdigest()
+
+    last = MedicalFileSnapshot.query.filter_by(medical_file_id=medical_file.id).order_by(
+        MedicalFileSnapshot.version.desc()).first()
+    if last is not None and last.content_hash == content_hash:
+        return last.version
+
+    version = last.version + 1 if last else 1
+    full_payload = zlib.compress(html.encode())
+    payload, is_checkpoint = full_payload, True
+
+    if last is not None:
+        chain = _version_chain(medical_file.id, last.version)
+        if version - chain[0].version < SNAPSHOT_CHECKPOINT_INTERVAL:
+            old_lines = _reconstruct(chain).splitlines(keepends=True)
+            ops = _make_delta(old_lines, html.splitlines(keepends=True))
+            delta_payload = zlib.compress(json.dumps(ops, ensure_ascii=False).encode())
+            # Un delta más grande que el documento completo no ahorra nada
+            if len(delta_payload) < len(full_payload):
+                payload, is_checkpoint = delta_payload, False
+
+    db.session.add(MedicalFileSnapshot(
+        medical_file_id=medical_file.id,
+        version=version,
+        is_checkpoint=is_checkpoint,
+        payload=payload,
+        content_hash=content_hash,
+        content_length=len(html),
+        created_by_id=created_by_id,
+    ))
+    return version
+
+
+def diff_snapshot_versions(medical_file_id, from_version, to_version):
+    """Diff unificado (lista de líneas) entre dos versions, o None si alguna no existe."""
+    old = get_snapshot_version(medical_file_id, from_version)
+    new = get_snapshot_version(medical_file_id, to_version)
+    if old is None or new is None:
+        return None
+    return list(difflib.unified_diff(
+        old.splitlines(), new.splitlines(),
+        fromfile=f"v{from_version}", tofile=f"v{to_version}", lineterm="",
+    ))
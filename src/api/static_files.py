@@ -0,0 +1,146 @@
+# Servidor de los archivos del frontend (dist/ generado por `vite build`).
+#
+# Al arrancar se recorre dist/ una sola vez y se arma un manifiesto en memoria: por cada
+# archivo su tipo MIME, tamaño, ETag (hash del contenido) y las variantes precomprimidas
+# .br / .gz que existan junto a él (`flask precompress-static` las genera). En cada
+# request solo se busca la ruta en el diccionario, se elige la mejor variante según
+# Accept-Encoding y se delega en send_file (ETag, If-None-Match y Range).
+#
+# Los assets con hash en el nombre (assets/index-3f9a1c2b.js) se cachean como immutable
+# por un año; index.html y el resto se revalidan en cada carga (no-cache + ETag).
+# Las variantes Brotli requieren el paquete opcional `brotli` al precomprimir.
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from flask import send_file
+
+try:
+    import brotli
+except ImportError:  # Dependencia opcional
+    brotli = None
+
+# (codificación en Content-Encoding, extensión del archivo precomprimido), por preferencia
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+COMPRESSIBLE_EXTENSIONS = (".js", ".mjs", ".css", ".html", ".svg", ".json", ".map", ".txt", ".xml", ".ico", ".webmanifest")
+PRECOMPRESS_MIN_SIZE = 1024
+
+# Vite nombra los assets como assets/<nombre>-<hash de 8+ caracteres>.<ext>
+HASHED_ASSET_RE = re.compile(r"^assets/.+-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+class StaticAsset:
+    def __init__(self, path, file_path, immutable):
+        self.path = path
+        self.file_path = file_path
+        self.immutable = immutable
+        self.mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.etag = _file_etag(file_path)
+        # {codificación: (ruta, etag)} de las variantes precomprimidas disponibles
+        self.variants = {}
+        for encoding, extension in ENCODINGS:
+            variant_path = file_path + extension
+            if os.path.isfile(variant_path):
+                self.variants[encoding] = (variant_path, f"{self.etag}-{encoding}")
+
+
+def _file_etag(file_path):
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:20]
+
+
+def _is_variant(name):
+    return any(name.endswith(extension) for _, extension in ENCODINGS)
+
+
+class StaticManifest:
+    def __init__(self, directory, index="index.html", auto_reload=False):
+        self.directory = directory
+        self.index = index
+        # En desarrollo dist/ cambia con cada build: se vuelve a escanear en cada request
+        self.auto_reload = auto_reload
+        self.assets = {}
+        self.scan()
+
+    def scan(self):
+        assets = {}
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if _is_variant(name):
+                    continue
+                file_path = os.path.join(root, name)
+                path = os.path.relpath(file_path, self.directory).replace(os.sep, "/")
+                assets[path] = StaticAsset(path, file_path, bool(HASHED_ASSET_RE.match(path)))
+        self.assets = assets
+
+    def get(self, path):
+        if self.auto_reload:
+            self.scan()
+        return self.assets.get(path)
+
+    def serve(self, path, request):
+        """Respuesta para `path`; las rutas desconocidas devuelven index.html (la SPA enruta)."""
+        asset = self.get(path) or self.assets.get(self.index)
+        if asset is None:
+            return None
+
+        file_path, etag, encoding = asset.file_path, asset.etag, None
+        for candidate in ("br", "gzip"):
+            if candidate in asset.variants and request.accept_encodings[candidate]:
+                file_path, etag = asset.variants[candidate]
+                encoding = candidate
+                break
+
+        # download_name: sin él, la variante .gz/.br saldría con su propio nombre en Content-Disposition
+        response = send_file(file_path, mimetype=asset.mimetype, etag=etag, conditional=True,
+                             download_name=os.path.basename(asset.path),
+                             max_age=IMMUTABLE_MAX_AGE if asset.immutable else None)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        if asset.variants:
+            response.vary.add("Accept-Encoding")
+
+        if asset.immutable:
+            response.cache_control.public = True
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+            response.cache_control.max_age = None
+        return response
+
+
+def precompress_directory(directory, min_size=PRECOMPRESS_MIN_SIZE):
+    """Genera las variantes .gz (y .br si está `brotli`) de los archivos comprimibles; devuelve cuántas escribió."""
+    written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if _is_variant(name) or not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            file_path = os.path.join(root, name)
+            if os.path.getsize(file_path) < min_size:
+                continue
+            with open(file_path, "rb") as f:
+                content = f.read()
+
+            compressors = [(".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                compressors.append((".br", lambda data: brotli.compress(data, quality=11)))
+
+            for extension, compress in compressors:
+                variant_path = file_path + extension
+                if os.path.isfile(variant_path) and os.path.getmtime(variant_path) >= os.path.getmtime(file_path):
+                    continue
+                compressed = compress(content)
+                # Solo vale la pena si ahorra bytes
+                if len(compressed) < len(content):
+                    with open(variant_path, "wb") as f:
+                        f.write(compressed)
+                    written += 1
+    return written
@@ -0,0 +1,140 @@
+# Validación de las secciones de antecedentes que llegan en los payloads.
+#
+# Para cada modelo de antecedentes se construye una sola vez (al importar) un esquema
+# a partir de los metadatos de sus columnas en api/models.py: un conversor por campo
+# según el tipo (Enum, Integer, Float, Boolean, String con longitud, Text). Validar un
+# payload es entonces una pasada sobre sus claves que devuelve los valores ya
+# convertidos o los errores por campo, antes de tocar la sesión de la base de datos.
+
+import enum
+import math
+
+from sqlalchemy import BigInteger, Boolean, Enum, Float, Integer, SmallInteger, String
+
+from api.models import BACKGROUND_SECTIONS
+
+# Columnas que nunca se aceptan desde el payload
+PROTECTED_COLUMNS = ("id", "medical_file_id")
+
+TRUE_VALUES = ("true", "1", "yes", "si", "sí")
+FALSE_VALUES = ("false", "0", "no")
+
+# Rango de cada tipo entero en la base (PostgreSQL rechaza al hacer commit lo que no cabe).
+# Las subclases van primero: BigInteger y SmallInteger también son Integer
+INTEGER_BITS = ((BigInteger, 64), (SmallInteger, 16), (Integer, 32))
+
+
+class FieldError(ValueError):
+    pass
+
+
+def _enum_coercer(enum_class):
+    choices = {member.value: member for member in enum_class}
+    choices.update({member.name: member for member in enum_class})
+    message = f"debe ser uno de: {', '.join(member.value for member in enum_class)}"
+
+    def coerce(value):
+        if isinstance(value, enum_class):
+            return value
+        try:
+            return choices[value]
+        except (KeyError, TypeError):
+            raise FieldError(message)
+    return coerce
+
+
+def _int_coercer(bits):
+    minimum, maximum = -2 ** (bits - 1), 2 ** (bits - 1) - 1
+
+    def coerce(value):
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            raise FieldError("debe ser un número entero")
+        try:
+            number = int(value)
+        except ValueError:
+            raise FieldError("debe ser un número entero")
+        if not minimum <= number <= maximum:
+            raise FieldError(f"debe estar entre {minimum} y {maximum}")
+        return number
+    return coerce
+
+
+def _float_coercer(value):
+    if isinstance(value, bool):
+        raise FieldError("debe ser un número")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise FieldError("debe ser un número")
+    if not math.isfinite(number):
+        raise FieldError("debe ser un número finito")
+    return number
+
+
+def _bool_coercer(value):
+    if isinstance(value, bool):
+        return value
+    normalized = str(value).strip().lower()
+    if normalized in TRUE_VALUES:
+        return True
+    if normalized in FALSE_VALUES:
+        return False
+    raise FieldError("debe ser verdadero o falso")
+
+
+def _string_coercer(length):
+    def coerce(value):
+        if not isinstance(value, str):
+            raise FieldError("debe ser texto")
+        if length is not None and len(value) > length:
+            raise FieldError(f"no puede superar {length} caracteres")
+        return value
+    return coerce
+
+
+def _column_coercer(column):
+    column_type = column.type
+    if isinstance(column_type, Enum) and column_type.enum_class is not None and issubclass(column_type.enum_class, enum.Enum):
+        return _enum_coercer(column_type.enum_class)
+    if isinstance(column_type, Boolean):
+        return _bool_coercer
+    if isinstance(column_type, Integer):
+        bits = next(bits for integer_type, bits in INTEGER_BITS if isinstance(column_type, integer_type))
+        return _int_coercer(bits)
+    if isinstance(column_type, Float):
+        return _float_coercer
+    if isinstance(column_type, String):  # Incluye Text (length None)
+        return _string_coercer(column_type.length)
+    raise TypeError(f"Tipo de columna sin conversor: {column.key} ({column_type!r})")
+
+
+class BackgroundSchema:
+    def __init__(self, model):
+        self.model = model
+        self.coercers = {
+            column.key: _column_coercer(column)
+            for column in model.__table__.columns
+            if column.key not in PROTECTED_COLUMNS
+        }
+
+    def validate(self, payload):
+        """Devuelve (valores convertidos, errores por campo). Las claves desconocidas se ignoran."""
+        if not isinstance(payload, dict):
+            return {}, {"_": "la sección debe ser un objeto"}
+
+        values, errors = {}, {}
+        for key, value in payload.items():
+            coerce = self.coercers.get(key)
+            if coerce is None:
+                continue
+            if value is None or value == "":
+                values[key] = None
+                continue
+            try:
+                values[key] = coerce(value)
+            except FieldError as e:
+                errors[key] = str(e)
+        return values, errors
+
+
+BACKGROUND_SCHEMAS = {section: BackgroundSchema(model) for section, model in BACKGROUND_SECTIONS}
@@ -2,25 +2,37 @@
 This module takes care of starting the API Server, Loading the DB and Adding the endpoints
 """
 import os
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify
 from flask_migrate import Migrate
 from api.utils import APIException, generate_sitemap
 from api.models import db
 from api.routes import api
 from api.admin import setup_admin
 from api.commands import setup_commands
+from api.auth import is_token_revoked
+from api.pool import engine_options
+from api.static_files import StaticManifest
+from api.json_provider import json_provider_class
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 
 app = Flask(__name__)
+# orjson si está instalado (JSON_PROVIDER=stdlib para forzar el encoder estándar)
+app.json = json_provider_class()(app)
 app.config["JWT_SECRET_KEY"] = "ZkV-hpLWLgVXEXmPu4I0gJY8NdW0cn4UK-ZOjQgoMR4"
 jwt = JWTManager(app)
+jwt.token_in_blocklist_loader(is_token_revoked)
+
+# Caché de identidad y versión de token entre requests (ver api/auth.py); 0 = sin caché
+app.config["IDENTITY_CACHE_TTL"] = int(os.getenv("IDENTITY_CACHE_TTL", 30))
 
 # ✅ SOLO UNA CONFIGURACIÓN DE CORS
 CORS(app, supports_credentials=True, resources={r"/api/*": {"origins": "*"}})
 
 ENV = "development" if os.getenv("FLASK_DEBUG") == "1" else "production"
 static_file_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), '../dist/')
+# Manifiesto en memoria de dist/ (variantes .br/.gz, ETag y caché por tipo de asset)
+static_manifest = StaticManifest(static_file_dir, auto_reload=ENV == "development")
 app.url_map.strict_slashes = False
 
 # Configuración base de datos
@@ -31,6 +43,7 @@ else:
     app.config['SQLALCHEMY_DATABASE_URI'] = "sqlite:////tmp/test.db"
 
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 MIGRATE = Migrate(app, db, compare_type=True)
 db.init_app(app)
 
@@ -51,21 +64,19 @@ def handle_invalid_usage(error):
 def sitemap():
     if ENV == "development":
         return generate_sitemap(app)
-    return send_from_directory(static_file_dir, 'index.html')
+    return serve_static('index.html')
 
 # Catch-all para frontend
 @app.route('/<path:path>', methods=['GET'])
 def serve_any_other_file(path):
     if path.startswith("api"):
         return jsonify({"error": "API endpoint not found"}), 404
+    return serve_static(path)
 
-    file_path = os.path.join(static_file_dir, path)
-    if os.path.isfile(file_path):
-        response = send_from_directory(static_file_dir, path)
-    else:
-        response = send_from_directory(static_file_dir, 'index.html')
-
-    response.cache_control.max_age = 0  # Evitar cache en desarrollo
+def serve_static(path):
+    response = static_manifest.serve(path, request)
+    if response is None:
+        return jsonify({"error": "Frontend no compilado (ejecuta npm run build)"}), 404
     return response
 
 # Solo si se ejecuta directamente
@@ -1,5 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
+import useServerEvents from '../hooks/useServerEvents';
 
 const StudentPatientRequests = () => {
   const [requests, setRequests] = useState([]);
@@ -37,6 +38,9 @@ const StudentPatientRequests = () => {
     fetchRequests();
   }, []);
 
+  // Nueva solicitud de un paciente: refrescar la lista
+  useServerEvents({ patient_request: () => fetchRequests() });
+
   // Manejar aceptar o rechazar
   const handleAction = async (patientId, action) => {
     setError(null);
@@ -0,0 +1,94 @@
+import { useEffect, useRef } from "react";
+
+const backendUrl = import.meta.env.VITE_BACKEND_URL;
+const RECONNECT_DELAY_MS = 3000;
+// También es el intervalo de refresco mientras el servidor no acepta el stream
+const MAX_RECONNECT_DELAY_MS = 30000;
+
+// Se suscribe a /api/events (Server-Sent Events) y llama al handler de cada tipo de evento.
+// EventSource no envía headers: antes de cada conexión se pide un token de stream de vida
+// corta con el JWT. Si la conexión se cae (el servidor la cierra periódicamente o responde
+// 503 por exceso de streams) se pide un token nuevo y se reconecta, esperando cada vez más
+// mientras los intentos sigan fallando.
+// Los eventos emitidos sin conexión se pierden: al reconectar, y en cada reintento mientras
+// el servidor rechace el stream, se llama a todos los handlers (sin datos) para que la vista
+// vuelva a pedir sus listas.
+export default function useServerEvents(handlers) {
+  const handlersRef = useRef(handlers);
+  handlersRef.current = handlers;
+
+  useEffect(() => {
+    const token = localStorage.getItem("token");
+    if (!token) return;
+
+    let source = null;
+    let timer = null;
+    let closed = false;
+    let failures = 0;
+    let missedEvents = false;
+
+    const refetchAll = () => {
+      Object.values(handlersRef.current).forEach((handler) => handler?.({}));
+    };
+
+    const scheduleConnect = () => {
+      if (closed) return;
+      const delay = Math.min(RECONNECT_DELAY_MS * 2 ** failures, MAX_RECONNECT_DELAY_MS);
+      failures += 1;
+      timer = setTimeout(connect, delay);
+    };
+
+    const connect = async () => {
+      let resp;
+      try {
+        resp = await fetch(`${backendUrl}/api/events/token`, {
+          method: "POST",
+          headers: { Authorization: `Bearer ${token}` },
+        });
+      } catch {
+        missedEvents = true;
+        scheduleConnect();
+        return;
+      }
+      if (!resp.ok) {
+        // JWT vencido o revocado: no tiene caso reintentar con el mismo
+        if (resp.status !== 401 && resp.status !== 422) {
+          missedEvents = true;
+          scheduleConnect();
+        }
+        return;
+      }
+      const { token: streamToken } = await resp.json();
+      if (closed) return;
+
+      let opened = false;
+      source = new EventSource(`${backendUrl}/api/events?token=${encodeURIComponent(streamToken)}`);
+      Object.keys(handlersRef.current).forEach((type) => {
+        source.addEventListener(type, (event) => handlersRef.current[type]?.(JSON.parse(event.data)));
+      });
+      source.onopen = () => {
+        opened = true;
+        failures = 0;
+        if (missedEvents) refetchAll();
+        missedEvents = false;
+      };
+      source.onerror = () => {
+        // No se deja reconectar a EventSource: reusaría el token ya expirado
+        source.close();
+        source = null;
+        // Stream rechazado (p. ej. 503): se refresca ya en lugar de esperar a que abra
+        if (!opened) refetchAll();
+        missedEvents = true;
+        scheduleConnect();
+      };
+    };
+
+    connect();
+
+    return () => {
+      closed = true;
+      clearTimeout(timer);
+      source?.close();
+    };
+  }, []);
+}
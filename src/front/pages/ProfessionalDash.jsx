@@ -1,5 +1,6 @@
 import React, { useEffect, useState } from "react";
 import { useNavigate } from "react-router-dom";
+import useServerEvents from "../hooks/useServerEvents";
 
 const backendUrl = import.meta.env.VITE_BACKEND_URL;
 
@@ -14,6 +15,12 @@ const ProfessionalDash = () => {
     fetchReviewFiles();
   }, []);
 
+  // Refrescar solo cuando el servidor avisa de cambios
+  useServerEvents({
+    student_request: () => fetchStudentRequests(),
+    file_review: () => fetchReviewFiles(),
+  });
+
   const fetchStudentRequests = async () => {
     try {
       const token = localStorage.getItem("token");
@@ -81,6 +88,26 @@ const ProfessionalDash = () => {
     }
   };
 
+  // Toma el siguiente expediente de la cola (el más antiguo sin reclamar) y abre la entrevista
+  const claimNextFile = async () => {
+    try {
+      const token = localStorage.getItem("token");
+      const res = await fetch(`${backendUrl}/api/professional/review_queue/claim`, {
+        method: "POST",
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      if (res.status === 204) {
+        alert("No hay expedientes pendientes en la cola.");
+        return;
+      }
+      if (!res.ok) throw new Error("Error tomando expediente de la cola");
+      const data = await res.json();
+      goToInterview(data.medical_file_id);
+    } catch (error) {
+      alert(error.message);
+    }
+  };
+
   const goToInterview = (medicalFileId) => {
     navigate(`/dashboard/professional/interview/${medicalFileId}`);
   };
@@ -135,6 +162,9 @@ const ProfessionalDash = () => {
 
       {/* ---------- Tabla de expedientes en revisión ---------- */}
       <h4 className="mt-5">Expedientes en revisión</h4>
+      <button onClick={claimNextFile} className="btn btn-primary mb-3">
+        Tomar siguiente expediente
+      </button>
       {reviewFiles.length === 0 ? (
         <p>No hay expedientes en revisión.</p>
       ) : (
@@ -151,7 +181,7 @@ const ProfessionalDash = () => {
           <tbody>
             {reviewFiles.map((file) => (
               <tr key={file.id}>
-                <td>{file.id}</td>
+                <td>{file.id}{file.claimed_by_me && " (asignado a ti)"}</td>
                 <td>{file.patient_name}</td>
                 <td>{file.student_name}</td>
                 <td>
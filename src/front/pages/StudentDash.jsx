@@ -1,5 +1,6 @@
 import React, { useEffect, useState } from "react";
 import { useNavigate } from "react-router-dom";
+import useServerEvents from "../hooks/useServerEvents";
 
 const backendUrl = import.meta.env.VITE_BACKEND_URL;
 
@@ -42,6 +43,21 @@ const StudentDash = () => {
     fetchData();
   }, []);
 
+  // Nueva solicitud de un paciente: volver a pedir solo esa lista
+  useServerEvents({
+    patient_request: async () => {
+      try {
+        const token = localStorage.getItem("token");
+        const requestsRes = await fetch(`${backendUrl}/api/student/patient_requests`, {
+          headers: { Authorization: `Bearer ${token}` },
+        });
+        setPatientRequests(await requestsRes.json());
+      } catch (error) {
+        console.error(error);
+      }
+    },
+  });
+
   const handleRequestApproval = async () => {
     if (!professionalId) {
       alert("Debes ingresar el ID del profesional");
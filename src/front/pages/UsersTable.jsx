@@ -1,30 +1,40 @@
 import React, { useEffect, useState } from 'react';
 
+// Solo las columnas que muestra la tabla
+const USER_FIELDS = "id,first_name,second_name,first_surname,second_surname,role,status";
+const PAGE_SIZE = 100;
+
 const UsersTable = () => {
   const [users, setUsers] = useState([]);
+  const [nextAfterId, setNextAfterId] = useState(null);
   const backendUrl = import.meta.env.VITE_BACKEND_URL;
 
-  useEffect(() => {
-    const fetchUsers = async () => {
-      try {
-        const response = await fetch(`${backendUrl}/api/users`, {
-          method: 'GET',
-          headers: {
-            "Authorization": `Bearer ${localStorage.getItem('token')}`
-          }
-        });
-
-        if (!response.ok) {
-          throw new Error('Network response was not ok');
+  const fetchUsers = async (afterId = null) => {
+    try {
+      const params = new URLSearchParams({ fields: USER_FIELDS, limit: PAGE_SIZE });
+      if (afterId !== null) params.append("after_id", afterId);
+
+      const response = await fetch(`${backendUrl}/api/users?${params}`, {
+        method: 'GET',
+        headers: {
+          "Authorization": `Bearer ${localStorage.getItem('token')}`
         }
+      });
 
-        const data = await response.json();
-        setUsers(Array.isArray(data) ? data : data.users);
-      } catch (error) {
-        console.error('Error fetching users:', error);
+      if (!response.ok) {
+        throw new Error('Network response was not ok');
       }
-    };
 
+      const data = await response.json();
+      const page = Array.isArray(data) ? data : data.users;
+      setUsers(prev => (afterId === null ? page : [...prev, ...page]));
+      setNextAfterId(data.next_after_id ?? null);
+    } catch (error) {
+      console.error('Error fetching users:', error);
+    }
+  };
+
+  useEffect(() => {
     fetchUsers();
   }, []);
 
@@ -73,44 +83,51 @@ const UsersTable = () => {
   };
 
   return (
-    <table className="table table-hover">
-      <thead>
-        <tr>
-          <th scope="col">ID</th>
-          <th scope="col">Nombre Completo</th>
-          <th scope="col">Rol</th>
-          <th scope="col">Status</th>
-          <th scope="col">Acciones</th>
-        </tr>
-      </thead>
-      <tbody>
-        {users.map((user) => (
-          <tr key={user.id}>
-            <th scope="row">{user.id}</th>
-            <td>
-              {`${user.first_name || ""} ${user.second_name || ""} ${user.first_surname || ""} ${user.second_surname || ""}`}
-            </td>
-            <td>{user.role}</td>
-            <td>{user.status}</td>
-            <td>
-              <button
-                className="btn btn-success me-2"
-                onClick={() => handleApprove(user.id)}
-                disabled={user.status === "approved" || user.role !== "professional"}
-              >
-                Aprobar
-              </button>
-              <button
-                className="btn btn-danger"
-                onClick={() => handleDelete(user.id)}
-              >
-                Eliminar
-              </button>
-            </td>
+    <>
+      <table className="table table-hover">
+        <thead>
+          <tr>
+            <th scope="col">ID</th>
+            <th scope="col">Nombre Completo</th>
+            <th scope="col">Rol</th>
+            <th scope="col">Status</th>
+            <th scope="col">Acciones</th>
           </tr>
-        ))}
-      </tbody>
-    </table>
+        </thead>
+        <tbody>
+          {users.map((user) => (
+            <tr key={user.id}>
+              <th scope="row">{user.id}</th>
+              <td>
+                {`${user.first_name || ""} ${user.second_name || ""} ${user.first_surname || ""} ${user.second_surname || ""}`}
+              </td>
+              <td>{user.role}</td>
+              <td>{user.status}</td>
+              <td>
+                <button
+                  className="btn btn-success me-2"
+                  onClick={() => handleApprove(user.id)}
+                  disabled={user.status === "approved" || user.role !== "professional"}
+                >
+                  Aprobar
+                </button>
+                <button
+                  className="btn btn-danger"
+                  onClick={() => handleDelete(user.id)}
+                >
+                  Eliminar
+                </button>
+              </td>
+            </tr>
+          ))}
+        </tbody>
+      </table>
+      {nextAfterId !== null && (
+        <button className="btn btn-outline-primary" onClick={() => fetchUsers(nextAfterId)}>
+          Cargar más
+        </button>
+      )}
+    </>
   );
 };
 
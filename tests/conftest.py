@@ -0,0 +1,62 @@
+# Configuración común de las pruebas: base SQLite temporal y la app con el esquema de los
+# modelos (db.create_all), sembrada con `seed_database`.
+import os
+import sys
+import tempfile
+
+import pytest
+
+_db_dir = tempfile.mkdtemp(prefix="docgus-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from app import app as flask_app  # noqa: E402
+from api import auth  # noqa: E402
+from api.models import db  # noqa: E402
+from api.seed import seed_database, SEED_PASSWORD  # noqa: E402
+
+
+def _reset_database():
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+
+
+# El contexto de la app solo se abre para preparar y limpiar: si quedara abierto durante
+# la prueba, cada request del test client heredaría su `flask.g` (p. ej. g.current_user)
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(auth, "identity_cache", auth.LocalIdentityCache())
+    with flask_app.app_context():
+        _reset_database()
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def seed(app, monkeypatch):
+    """Vacía la base y la siembra con `seed_database(**kwargs)`; devuelve su resumen."""
+    def run(**kwargs):
+        # Caché de identidades vacía: los ids se repiten al volver a sembrar
+        monkeypatch.setattr(auth, "identity_cache", auth.LocalIdentityCache())
+        with app.app_context():
+            _reset_database()
+            return seed_database(seed=1, **kwargs)
+    return run
+
+
+@pytest.fixture
+def login(client):
+    """Devuelve el header Authorization de una cuenta sembrada."""
+    def run(email):
+        response = client.post("/api/login", json={"email": email, "password": SEED_PASSWORD})
+        assert response.status_code == 200, response.json
+        return {"Authorization": f"Bearer {response.json['token']}"}
+    return run
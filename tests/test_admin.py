@@ -0,0 +1,91 @@
+# Vistas del panel de administración (api/admin.py). LargeTableView sobrescribe métodos
+# internos de ModelView (Flask-Admin 1.6, fijado en el Pipfile): estas pruebas recorren
+# get_list con cada uno de ellos para detectar si una actualización los cambia.
+import pytest
+from flask import g
+from sqlalchemy import select
+
+from api.admin import LargeTableView, UserView, MedicalFileView, GynecologicalBackgroundView
+from api.models import db, User, UserRole, MedicalFile, GynecologicalBackground
+
+PAGE_SIZE = 5
+
+
+def _view(app, view_class):
+    return next(view for view in app.extensions["admin"][0]._views if isinstance(view, view_class))
+
+
+def _ids(data):
+    return [row.id for row in data]
+
+
+@pytest.fixture
+def users_view(app, seed, monkeypatch):
+    seed(patients=12, students=2, professionals=1)
+    monkeypatch.setattr(LargeTableView, "page_size", PAGE_SIZE)
+    with app.app_context():
+        all_ids = db.session.scalars(select(User.id).order_by(User.id.desc())).all()
+    return _view(app, UserView), all_ids
+
+
+def test_keyset_pages_follow_offset_pages(app, users_view):
+    view, all_ids = users_view
+    with app.test_request_context("/admin/user/"):
+        count, first = view.get_list(0, None, False, None, [])
+    assert count == len(all_ids)
+    assert _ids(first) == all_ids[:PAGE_SIZE]
+
+    with app.test_request_context(f"/admin/user/?page=1&after={first[-1].id}"):
+        _, second = view.get_list(1, None, False, None, [])
+    assert _ids(second) == all_ids[PAGE_SIZE:2 * PAGE_SIZE]
+
+    with app.test_request_context(f"/admin/user/?page=0&before={second[0].id}"):
+        _, back = view.get_list(0, None, False, None, [])
+    assert _ids(back) == all_ids[:PAGE_SIZE]
+
+
+def test_filters_and_sorting(app, users_view):
+    view, _ = users_view
+    role_filter = next(i for i, flt in enumerate(view._filters) if flt.column is User.role)
+    with app.test_request_context("/admin/user/"):
+        count, data = view.get_list(0, "email", False, None, [(role_filter, None, UserRole.patient.value)])
+        expected = db.session.scalars(
+            select(User.email).where(User.role == UserRole.patient).order_by(User.email)).all()
+    assert count == len(expected)
+    assert [row.email for row in data] == expected[:PAGE_SIZE]
+
+
+def test_count_is_capped(app, users_view, monkeypatch):
+    view, all_ids = users_view
+    monkeypatch.setattr("api.admin.ADMIN_EXACT_COUNT_LIMIT", 3)
+    with app.test_request_context("/admin/user/"):
+        count, _ = view.get_list(0, None, False, None, [])
+        assert g.admin_count_label == "3+"
+    assert count == 4
+
+
+def test_list_page_renders_keyset_links(app, client, users_view):
+    response = client.get("/admin/user/")
+    assert response.status_code == 200
+    assert "after=" in response.get_data(as_text=True)
+
+
+def test_admin_edits_bump_file_version(app, seed):
+    seed(patients=8, students=1, professionals=1)
+    with app.test_request_context():
+        medical_file = db.session.scalars(
+            select(MedicalFile).where(MedicalFile.gynecological_background.has())).first()
+        version = medical_file.version
+
+        view = _view(app, MedicalFileView)
+        assert view.update_model(view.edit_form(obj=medical_file), medical_file)
+        assert db.session.get(MedicalFile, medical_file.id).version == version + 1
+
+        background = db.session.scalar(
+            select(GynecologicalBackground).filter_by(medical_file_id=medical_file.id))
+        view = _view(app, GynecologicalBackgroundView)
+        form = view.edit_form(obj=background)
+        form.pregnancies.data = 3
+        assert view.update_model(form, background)
+        assert db.session.get(MedicalFile, medical_file.id).version == version + 2
+        db.session.remove()
@@ -0,0 +1,35 @@
+# Identidad y revocación de tokens (api/auth.py).
+from sqlalchemy import select
+
+from api.admin import UserView
+from api.models import db, User, UserStatus
+
+from test_query_counts import count_statements
+
+SMALL = dict(patients=4, students=1, professionals=1)
+
+
+def test_cached_identity_skips_user_query(app, client, seed, login):
+    seed(**SMALL)
+    headers = login("pr0@seed.test")
+    assert client.get("/api/cohorts/fields", headers=headers).status_code == 200
+
+    with count_statements(app) as statements:
+        response = client.get("/api/cohorts/fields", headers=headers)
+    assert response.status_code == 200
+    assert statements == []
+
+
+def test_admin_status_change_revokes_tokens(app, client, seed, login):
+    seed(**SMALL)
+    headers = login("pr0@seed.test")
+    assert client.get("/api/cohorts/fields", headers=headers).status_code == 200
+
+    view = next(view for view in app.extensions["admin"][0]._views if isinstance(view, UserView))
+    with app.test_request_context():
+        user = db.session.scalar(select(User).filter_by(email="pr0@seed.test"))
+        form = view.edit_form(obj=user)
+        form.status.data = UserStatus.pre_approved
+        assert view.update_model(form, user)
+
+    assert client.get("/api/cohorts/fields", headers=headers).status_code == 401
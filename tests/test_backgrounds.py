@@ -0,0 +1,47 @@
+# Envío de antecedentes a revisión (POST /api/backgrounds y PUT /api/student/mark_review).
+import pytest
+from sqlalchemy import select
+
+from api.models import db, MedicalFile, FileStatus, FileTransition
+
+
+@pytest.fixture
+def progress_file(app, seed, login):
+    seed(patients=8, students=1, professionals=1)
+    with app.app_context():
+        file_id = db.session.execute(
+            select(MedicalFile.id).where(MedicalFile.file_status == FileStatus.progress)).scalars().first()
+    return file_id, login("st0@seed.test")
+
+
+def _transitions(app, file_id):
+    with app.app_context():
+        return db.session.execute(
+            select(FileTransition.from_status, FileTransition.to_status)
+            .where(FileTransition.medical_file_id == file_id)).all()
+
+
+def test_resubmitting_a_file_in_review_records_no_transition(app, client, progress_file):
+    file_id, headers = progress_file
+    body = {"medical_file_id": file_id, "gynecological_background": {"pregnancies": "2"}}
+    before = len(_transitions(app, file_id))
+
+    assert client.post("/api/backgrounds", json=body, headers=headers).status_code == 201
+    assert client.put(f"/api/student/mark_review/{file_id}", headers=headers).status_code == 200
+    assert client.post("/api/backgrounds", json=body, headers=headers).status_code == 201
+    assert client.put(f"/api/student/mark_review/{file_id}", headers=headers).status_code == 200
+
+    transitions = _transitions(app, file_id)
+    assert len(transitions) == before + 1
+    assert (FileStatus.review, FileStatus.review) not in transitions
+
+
+def test_invalid_background_value_is_rejected(app, client, progress_file):
+    file_id, headers = progress_file
+    body = {"medical_file_id": file_id, "gynecological_background": {"pregnancies": "dos"}}
+
+    response = client.post("/api/backgrounds", json=body, headers=headers)
+    assert response.status_code == 400
+    assert "pregnancies" in response.json["details"]["gynecological_background"]
+    with app.app_context():
+        assert db.session.get(MedicalFile, file_id).file_status == FileStatus.progress
@@ -0,0 +1,73 @@
+# Alta masiva por HTTP (POST /api/admin/users/bulk): validación previa y commit por lotes.
+import json
+
+from sqlalchemy import func, select
+
+from api import onboarding
+from api.models import db, User
+
+HEADER = "first_name,first_surname,birth_day,role,email,password,institution,career,academic_grade,register_number\n"
+
+
+def _csv(rows):
+    return HEADER + "".join(f"N{i},S,2000-01-01,patient,{email},pw{i},,,,\n" for i, email in enumerate(rows))
+
+
+def _bulk(client, headers, data, query=""):
+    return client.post(f"/api/admin/users/bulk{query}", data=data,
+                       headers={**headers, "Content-Type": "text/csv"})
+
+
+def _users_like(app, pattern):
+    with app.app_context():
+        return db.session.scalar(select(func.count(User.id)).where(User.email.like(pattern)))
+
+
+def test_bulk_register_streams_one_line_per_chunk(app, client, seed, login, monkeypatch):
+    seed(patients=2, students=1, professionals=1)
+    monkeypatch.setattr(onboarding, "BULK_REGISTER_CHUNK_SIZE", 4)
+    headers = login("admin0@seed.test")
+
+    response = _bulk(client, headers, _csv([f"bulk{i}@x" for i in range(10)]))
+    assert response.status_code == 201
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line["created"] for line in lines] == [4, 8, 10, 10]
+    assert lines[-1] == {"created": 10, "errors": [], "done": True}
+    assert _users_like(app, "bulk%@x") == 10
+
+
+def test_bulk_register_rejects_before_inserting(app, client, seed, login):
+    seed(patients=2, students=1, professionals=1)
+    headers = login("admin0@seed.test")
+    data = _csv(["ok1@x", "ok2@x", "ok1@x"])
+
+    response = _bulk(client, headers, data)
+    assert response.status_code == 400
+    assert response.json["errors"][0]["row"] == 3
+    assert _users_like(app, "ok%@x") == 0
+
+    response = _bulk(client, headers, data, "?partial=1")
+    assert response.status_code == 201
+    assert json.loads(response.get_data(as_text=True).splitlines()[-1])["created"] == 2
+    assert _users_like(app, "ok%@x") == 2
+
+
+def test_bulk_register_keeps_committed_chunks_when_one_fails(app, client, seed, login, monkeypatch):
+    seed(patients=2, students=1, professionals=1)
+    monkeypatch.setattr(onboarding, "BULK_REGISTER_CHUNK_SIZE", 4)
+    insert_users = onboarding.insert_users
+    calls = []
+
+    def failing_second_chunk(rows):
+        calls.append(rows)
+        if len(calls) == 2:
+            raise RuntimeError("falla simulada")
+        return insert_users(rows)
+
+    monkeypatch.setattr(onboarding, "insert_users", failing_second_chunk)
+    headers = login("admin0@seed.test")
+
+    response = _bulk(client, headers, _csv([f"bulk{i}@x" for i in range(10)]))
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines[-1]["created"] == 4 and "error" in lines[-1]
+    assert _users_like(app, "bulk%@x") == 4
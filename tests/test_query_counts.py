@@ -0,0 +1,60 @@
+# Las listas se cargan con un número fijo de consultas (sin N+1): se cuentan las sentencias
+# SQL de cada endpoint con dos tamaños de datos; el conteo no debe cambiar ni pasar del tope.
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from api.models import db
+
+# Más pacientes para las listas del estudiante, más estudiantes para las del profesional
+MORE_PATIENTS = (dict(patients=8, students=1, professionals=1), dict(patients=40, students=1, professionals=1))
+MORE_STUDENTS = (dict(patients=4, students=2, professionals=1), dict(patients=4, students=12, professionals=1))
+
+# (endpoint, cuenta que lo consulta, tamaños, tope de consultas, filas de la respuesta)
+LIST_ENDPOINTS = [
+    ("/api/users?limit=500", "admin0@seed.test", MORE_PATIENTS, 2, lambda body: body["users"]),
+    ("/api/professional/review_files?limit=500", "pr0@seed.test", MORE_PATIENTS, 2, lambda body: body),
+    ("/api/student/assigned_patients", "st0@seed.test", MORE_PATIENTS, 2, lambda body: body),
+    ("/api/student/patient_requests", "st0@seed.test", MORE_PATIENTS, 2, lambda body: body),
+    ("/api/professional/student_requests", "pr0@seed.test", MORE_STUDENTS, 2, lambda body: body),
+    ("/api/professional/approved_students", "pr0@seed.test", MORE_STUDENTS, 2, lambda body: body),
+]
+
+
+@contextmanager
+def count_statements(app):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _measure(app, client, seed, login, sizes, url, email, rows_of):
+    seed(**sizes)
+    headers = login(email)
+    with count_statements(app) as statements:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.json
+    return len(statements), len(rows_of(response.json))
+
+
+@pytest.mark.parametrize("url,email,sizes,max_queries,rows_of", LIST_ENDPOINTS,
+                         ids=[endpoint[0] for endpoint in LIST_ENDPOINTS])
+def test_list_endpoint_query_count_is_constant(app, client, seed, login, url, email, sizes, max_queries, rows_of):
+    small, large = sizes
+    small_queries, small_rows = _measure(app, client, seed, login, small, url, email, rows_of)
+    large_queries, large_rows = _measure(app, client, seed, login, large, url, email, rows_of)
+
+    assert large_rows > small_rows, "con más datos la lista debe traer más filas"
+    assert large_queries == small_queries, (
+        f"{url}: {small_queries} consultas con {small_rows} filas, {large_queries} con {large_rows}")
+    assert large_queries <= max_queries, f"{url}: {large_queries} consultas (tope {max_queries})"
@@ -0,0 +1,40 @@
+# Índice de búsqueda en memoria (api/search.py, backend de SQLite).
+import pytest
+from sqlalchemy import select
+
+from api import search
+from api.models import db, User
+
+
+@pytest.fixture
+def index(monkeypatch):
+    # Índice vacío: los ids se repiten al volver a sembrar
+    monkeypatch.setattr(search, "search_backend", search.NgramIndex())
+    return search.search_backend
+
+
+def test_renamed_user_is_reindexed(app, seed, index):
+    seed(patients=4, students=1, professionals=1)
+    with app.app_context():
+        user = db.session.scalar(select(User).filter_by(email="st0@seed.test"))
+        user.first_name, user.first_surname = "Zacarías", "Quintanilla"
+        db.session.commit()
+        assert search.search_users("zacarias") == [user.id]  # Primera carga del índice
+
+        user.first_name, user.first_surname = "Eustaquio", "Ñúñez"
+        db.session.commit()
+        assert search.search_users("zacarias quintanilla") == []
+        assert search.search_users("eustaquio nunez") == [user.id]
+        assert index.stale == set()
+        db.session.remove()
+
+
+def test_unrelated_changes_do_not_invalidate(app, seed, index):
+    seed(patients=4, students=1, professionals=1)
+    with app.app_context():
+        search.search_users("seed")
+        user = db.session.scalar(select(User).filter_by(email="st0@seed.test"))
+        user.phone = "5550000000"
+        db.session.commit()
+        assert index.stale == set()
+        db.session.remove()
@@ -0,0 +1,21 @@
+# Invalidación de los fragmentos del snapshot (api/snapshots.py).
+from jinja2 import DictLoader, Environment
+
+from api import snapshots
+
+SECTION = '{% from "snapshot/_fields.html" import fields %}{{ fields(data) }}'
+
+
+def _digest(monkeypatch, macro_source):
+    env = Environment(loader=DictLoader({
+        "snapshot/section.html": SECTION,
+        "snapshot/_fields.html": macro_source,
+    }))
+    monkeypatch.setattr(snapshots, "_env", env)
+    return snapshots._template_digest("snapshot/section.html")
+
+
+def test_section_digest_covers_imported_templates(monkeypatch):
+    before = _digest(monkeypatch, "{% macro fields(data) %}<dl></dl>{% endmacro %}")
+    after = _digest(monkeypatch, "{% macro fields(data) %}<dl class='x'></dl>{% endmacro %}")
+    assert before != after
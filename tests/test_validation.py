@@ -0,0 +1,29 @@
+# Conversión de los campos de antecedentes (api/validation.py).
+import pytest
+
+from api.validation import BACKGROUND_SCHEMAS
+
+
+@pytest.mark.parametrize("value,expected", [("12", 12), (" -5 ", -5), (7, 7), (2 ** 31 - 1, 2 ** 31 - 1)])
+def test_integer_field_accepts(value, expected):
+    values, errors = BACKGROUND_SCHEMAS["gynecological_background"].validate({"pregnancies": value})
+    assert errors == {}
+    assert values["pregnancies"] == expected
+
+
+@pytest.mark.parametrize("value", ["--5", "²", "x", 3.5, True, 99999999999, -2 ** 31 - 1])
+def test_integer_field_rejects(value):
+    _, errors = BACKGROUND_SCHEMAS["gynecological_background"].validate({"pregnancies": value})
+    assert "pregnancies" in errors
+
+
+@pytest.mark.parametrize("value", ["nan", "inf", "-inf", float("nan"), "1e400", "x", True])
+def test_float_field_rejects(value):
+    _, errors = BACKGROUND_SCHEMAS["non_pathological_background"].validate({"daily_liquid_intake_liters": value})
+    assert "daily_liquid_intake_liters" in errors
+
+
+def test_float_field_accepts():
+    values, errors = BACKGROUND_SCHEMAS["non_pathological_background"].validate({"daily_liquid_intake_liters": "1.5"})
+    assert errors == {}
+    assert values["daily_liquid_intake_liters"] == 1.5